@@ -1,25 +1,40 @@
 from requestbin import config
 import os
+import hashlib
 from io import BytesIO
+from tempfile import SpooledTemporaryFile
 
 from flask import Flask
 from flask_cors import CORS
 from flask_login import LoginManager
 from flask_socketio import SocketIO
+from werkzeug.http import parse_options_header
 
 
 class WSGIRawBody(object):
+    """Capture the head of every request body without buffering all of it.
+
+    The body is read from ``wsgi.input`` in ``RAW_CHUNK_SIZE`` chunks. Only the
+    first ``MAX_RAW_SIZE`` bytes are kept in ``environ['raw']``; the full length
+    ends up in ``environ['raw.length']`` and, when ``RAW_DIGEST`` names a hashlib
+    algorithm, the hex digest of the whole body in ``environ['raw.digest']``.
+    Form bodies are spooled whole (in memory up to ``RAW_SPOOL_SIZE``, on disk
+    beyond that) so Flask can still parse them from ``wsgi.input``; any other
+    body is only counted and hashed past its head, and Flask sees the head
+    when that is the whole body and an empty stream when it is not.
+    """
+    chunk_size = config.RAW_CHUNK_SIZE
+    max_raw_size = config.MAX_RAW_SIZE
+    spool_size = config.RAW_SPOOL_SIZE
+    digest = config.RAW_DIGEST
+
+    form_types = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
     def __init__(self, application):
         self.application = application
 
     def __call__(self, environ, start_response):
-
-        length = environ.get('CONTENT_LENGTH', '0')
-        length = 0 if length == '' else int(length)
-
-        body = environ['wsgi.input'].read(length)
-        environ['raw'] = body
-        environ['wsgi.input'] = BytesIO(body)
+        self.capture(environ)
 
         # Call the wrapped application
         app_iter = self.application(environ, self._sr_callback(start_response))
@@ -27,6 +42,48 @@ class WSGIRawBody(object):
         # Return modified response
         return app_iter
 
+    def capture(self, environ):
+        length = environ.get('CONTENT_LENGTH', '')
+        length = int(length) if length.strip().isdigit() else None
+        chunked = 'chunked' in environ.get('HTTP_TRANSFER_ENCODING', '').lower()
+
+        if length is None and not (chunked or environ.get('wsgi.input_terminated')):
+            # Nothing tells us where the body ends, so don't block reading it
+            length = 0
+
+        stream = environ['wsgi.input']
+        mimetype = parse_options_header(environ.get('CONTENT_TYPE', ''))[0]
+        spool = (SpooledTemporaryFile(max_size=self.spool_size)
+                 if mimetype in self.form_types else None)
+        hasher = hashlib.new(self.digest) if self.digest else None
+        head = bytearray()
+        total = 0
+
+        while length is None or total < length:
+            size = self.chunk_size if length is None else min(self.chunk_size, length - total)
+            chunk = stream.read(size)
+            if not chunk:
+                break
+            total += len(chunk)
+            if len(head) < self.max_raw_size:
+                head += chunk[:self.max_raw_size - len(head)]
+            if hasher:
+                hasher.update(chunk)
+            if spool is not None:
+                spool.write(chunk)
+
+        environ['raw'] = bytes(head)
+        environ['raw.length'] = total
+        environ['raw.digest'] = hasher.hexdigest() if hasher else None
+        if spool is not None:
+            spool.seek(0)
+            environ['wsgi.input'] = spool
+        else:
+            environ['wsgi.input'] = BytesIO(environ['raw'] if total == len(head) else b'')
+        # The replacement stream is finite, so Werkzeug may read it to EOF
+        # even for chunked requests that carry no Content-Length
+        environ['wsgi.input_terminated'] = True
+
     def _sr_callback(self, start_response):
         def callback(status, headers, exc_info=None):
 
@@ -52,6 +109,8 @@ def on_join(data):
     if bin_name:
         join_room(bin_name)
         print(f"Client joined room: {bin_name}")
+        from requestbin.views.main import watch_bin
+        watch_bin(bin_name)
 
 @socketio.on('leave')
 def on_leave(data):
@@ -153,6 +212,7 @@ app.add_url_rule('/auth/reset-password', 'auth.reset_password', methods=['GET',
 app.add_url_rule('/api/v1/bins', 'api.bins', methods=['POST'])
 app.add_url_rule('/api/v1/bins/<name>', 'api.bin', methods=['GET'])
 app.add_url_rule('/api/v1/bins/<bin>/requests', 'api.requests', methods=['GET'])
+app.add_url_rule('/api/v1/bins/<bin>/requests/tail', 'api.tail', methods=['GET'])
 app.add_url_rule('/api/v1/bins/<bin>/requests/<name>', 'api.request', methods=['GET'])
 
 app.add_url_rule('/api/v1/stats', 'api.stats')
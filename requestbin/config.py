@@ -1,5 +1,6 @@
 import os
 import json
+import tempfile
 from urllib import parse
 from dotenv import load_dotenv
 
@@ -23,9 +24,62 @@ BIN_TTL = 96*3600
 # Storage backend can be overridden by environment variable
 STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', "requestbin.storage.memory.MemoryStorage")
 MAX_RAW_SIZE = int(os.environ.get('MAX_RAW_SIZE', 1024*10))
+# Request bodies are read in chunks; only the first MAX_RAW_SIZE bytes are kept.
+# Form bodies beyond RAW_SPOOL_SIZE are spooled to a temp file for parsing.
+RAW_CHUNK_SIZE = 64*1024
+RAW_SPOOL_SIZE = int(os.environ.get('RAW_SPOOL_SIZE', 1024*1024))
+# Optional hashlib algorithm (e.g. "sha256") used to digest the full body
+RAW_DIGEST = os.environ.get('RAW_DIGEST', '')
+# Parse captured headers, query string and form data on first access
+LAZY_CAPTURE = os.environ.get('LAZY_CAPTURE', 'true').lower() == 'true'
 IGNORE_HEADERS = []
 MAX_REQUESTS = int(os.environ.get('MAX_REQUESTS', 100))
 CLEANUP_INTERVAL = 3600
+# Approximate byte budget for MemoryStorage (0 = unlimited). When exceeded,
+# whole bins are evicted by MEMORY_EVICTION_POLICY: "lru" (least recently
+# read or written), "oldest" (created first) or "largest"
+MEMORY_BUDGET = int(os.environ.get('MEMORY_BUDGET', 0))
+MEMORY_EVICTION_POLICY = os.environ.get('MEMORY_EVICTION_POLICY', 'lru').lower()
+# Optional MemoryStorage snapshot file, loaded at startup and rewritten every
+# MEMORY_SNAPSHOT_INTERVAL seconds (0 = only at shutdown)
+MEMORY_SNAPSHOT_PATH = os.environ.get('MEMORY_SNAPSHOT_PATH', '')
+MEMORY_SNAPSHOT_INTERVAL = int(os.environ.get('MEMORY_SNAPSHOT_INTERVAL', 300))
+
+# Shared memory storage (requestbin.storage.shared.SharedMemoryStorage): one
+# local storage process serves every worker on the host over a Unix socket
+SHARED_STORAGE_SOCKET = os.environ.get(
+    'SHARED_STORAGE_SOCKET', os.path.join(tempfile.gettempdir(), 'requestbin-storage.sock'))
+# Bins each worker keeps decoded and refreshes with deltas
+SHARED_STORAGE_CACHE_SIZE = int(os.environ.get('SHARED_STORAGE_CACHE_SIZE', 1000))
+SHARED_STORAGE_TIMEOUT = float(os.environ.get('SHARED_STORAGE_TIMEOUT', 10.0))
+# The storage process exits after this many seconds without any worker connected
+SHARED_STORAGE_IDLE_TIMEOUT = float(os.environ.get('SHARED_STORAGE_IDLE_TIMEOUT', 600))
+
+# SQLite storage (requestbin.storage.sqlite.SQLiteStorage): one WAL-mode
+# database file shared by every worker on the host
+SQLITE_PATH = os.environ.get('SQLITE_PATH', 'requestbin.sqlite3')
+# Seconds a writer waits for another process's write transaction to finish
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5.0))
+
+# Segment log storage (requestbin.storage.segmentlog.SegmentLogStorage):
+# requests appended to per-shard segment files under SEGMENT_LOG_PATH. A new
+# segment starts after SEGMENT_LOG_SEGMENT_BYTES or SEGMENT_LOG_SEGMENT_SECONDS;
+# whole segments are deleted once everything in them has expired.
+SEGMENT_LOG_PATH = os.environ.get('SEGMENT_LOG_PATH', 'requestbin-segments')
+SEGMENT_LOG_SHARDS = int(os.environ.get('SEGMENT_LOG_SHARDS', 8))
+SEGMENT_LOG_SEGMENT_BYTES = int(os.environ.get('SEGMENT_LOG_SEGMENT_BYTES', 64 * 1024 * 1024))
+SEGMENT_LOG_SEGMENT_SECONDS = int(os.environ.get('SEGMENT_LOG_SEGMENT_SECONDS', 600))
+
+# Write-behind ingest queue (see requestbin/ingest.py)
+# INGEST_ACK: "immediate", "enqueue" or "commit"
+INGEST_ACK = os.environ.get('INGEST_ACK', 'commit')
+INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', 1000))
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 4))
+INGEST_ENQUEUE_TIMEOUT = float(os.environ.get('INGEST_ENQUEUE_TIMEOUT', 1.0))
+INGEST_DRAIN_TIMEOUT = float(os.environ.get('INGEST_DRAIN_TIMEOUT', 10.0))
+# Group commit for backends with create_requests (PostgreSQL)
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 100))
+INGEST_BATCH_WINDOW = float(os.environ.get('INGEST_BATCH_WINDOW', 0.002))
 
 # Redis configuration defaults
 REDIS_URL = ""
@@ -37,6 +91,18 @@ REDIS_SSL = False
 REDIS_SSL_CERT_REQS = None
 
 REDIS_PREFIX = "requestbin"
+# Connections per worker process; callers block up to REDIS_POOL_TIMEOUT
+# seconds for a free one instead of opening more
+REDIS_POOL_SIZE = int(os.environ.get('REDIS_POOL_SIZE', 50))
+REDIS_POOL_TIMEOUT = float(os.environ.get('REDIS_POOL_TIMEOUT', 5.0))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 5.0))
+REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', 5.0))
+# Talk to a Redis Cluster through REDIS_HOST:REDIS_PORT; bins and counters
+# are spread over REDIS_CLUSTER_SHARDS hash-tagged shards
+REDIS_CLUSTER = os.environ.get('REDIS_CLUSTER', 'false').lower() == 'true'
+REDIS_CLUSTER_SHARDS = int(os.environ.get('REDIS_CLUSTER_SHARDS', 256))
+# Longest a RedisStreamsStorage tail read blocks waiting for new requests
+REDIS_STREAM_TAIL_TIMEOUT = float(os.environ.get('REDIS_STREAM_TAIL_TIMEOUT', 25.0))
 
 # PostgreSQL configuration defaults
 POSTGRES_HOST = os.environ.get('POSTGRES_HOST', 'localhost')
@@ -46,6 +112,10 @@ POSTGRES_SCHEMA = os.environ.get('POSTGRES_SCHEMA', 'requestbin_app')
 POSTGRES_USER = os.environ.get('POSTGRES_USER', 'postgres')
 POSTGRES_PASSWORD = os.environ.get('POSTGRES_PASSWORD', '')
 POSTGRES_SSLMODE = os.environ.get('POSTGRES_SSLMODE', 'prefer')
+# One worker, elected by an advisory lock, deletes expired bins every
+# POSTGRES_REAPER_INTERVAL seconds, POSTGRES_REAPER_BATCH bins per statement
+POSTGRES_REAPER_INTERVAL = float(os.environ.get('POSTGRES_REAPER_INTERVAL', 60))
+POSTGRES_REAPER_BATCH = int(os.environ.get('POSTGRES_REAPER_BATCH', 500))
 
 # Authentication configuration
 AUTO_APPROVE_DOMAINS = os.environ.get('AUTO_APPROVE_DOMAINS', 'tarento.com,ivolve.ai').split(',')
@@ -134,8 +204,9 @@ if STORAGE_BACKEND == "requestbin.storage.postgresql.PostgreSQLStorage":
         POSTGRES_PASSWORD = os.environ.get('POSTGRES_PASSWORD', POSTGRES_PASSWORD)
         POSTGRES_SSLMODE = os.environ.get('POSTGRES_SSLMODE', POSTGRES_SSLMODE)
 
-# Load Redis configuration from environment (works for both local and prod)
-if STORAGE_BACKEND == "requestbin.storage.redis.RedisStorage":
+# Load Redis configuration for RedisStorage and RedisStreamsStorage from the
+# environment (works for both local and prod)
+if STORAGE_BACKEND.startswith("requestbin.storage.redis."):
     vcap_redis_config = get_redis_config_from_vcap()
     
     if vcap_redis_config:
@@ -26,6 +26,15 @@ def lookup_bin(name) -> Bin:
     name=re.split(r"[/.]", name)[0]
     return db.lookup_bin(name)
 
+def lookup_bin_meta(name) -> Bin:
+    """Look up a bin and its request count without loading its requests"""
+    name=re.split(r"[/.]", name)[0]
+    return db.lookup_bin_meta(name)
+
+def get_requests(name, offset=0, limit=None):
+    """Get a page of a bin's requests, newest first"""
+    return db.get_requests(name, offset, limit)
+
 def count_bins():
     return db.count_bins()
 
@@ -35,6 +44,10 @@ def count_requests():
 def avg_req_size():
     return db.avg_req_size()
 
-def get_bins_by_owner(owner_email):
-    """Get all bins owned by a specific user"""
-    return db.get_bins_by_owner(owner_email)
+def get_bins_by_owner(owner_email, limit=None):
+    """Get bins owned by a specific user, most recent first"""
+    return db.get_bins_by_owner(owner_email, limit)
+
+def list_bins_by_owner(owner_email, limit=None, before=None):
+    """Get summaries of a user's bins, most recent first, without requests"""
+    return db.list_bins_by_owner(owner_email, limit, before)
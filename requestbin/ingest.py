@@ -0,0 +1,238 @@
+"""
+Write-behind ingest pipeline for captured requests
+
+Captured requests are put on a bounded in-process queue and written to the
+storage backend by background greenlets, so a bin POST can be acknowledged
+without waiting on storage round trips.
+
+Acknowledgement modes (``INGEST_ACK``):
+- ``immediate``: reply straight away; requests are dropped (and counted)
+  when the queue is full
+- ``enqueue``: reply once the request is on the queue, waiting up to
+  ``INGEST_ENQUEUE_TIMEOUT`` seconds for space
+- ``commit``: reply once storage has committed the request (default)
+
+When the backend can write several requests at once (``write_many``), each
+worker groups whatever arrives within ``INGEST_BATCH_WINDOW`` seconds, up to
+``INGEST_BATCH_SIZE`` requests, into a single storage call.
+"""
+
+import atexit
+import os
+import time
+import traceback
+
+import gevent
+from gevent.event import AsyncResult
+from gevent.queue import Queue, Empty, Full
+
+from requestbin import config
+
+ACK_IMMEDIATE = 'immediate'
+ACK_ENQUEUE = 'enqueue'
+ACK_COMMIT = 'commit'
+ACK_MODES = (ACK_IMMEDIATE, ACK_ENQUEUE, ACK_COMMIT)
+
+_STOP = object()
+
+
+class IngestQueueFull(Exception):
+    """Raised when a request can't be queued before the enqueue timeout"""
+
+
+class IngestQueue(object):
+    """Bounded queue drained by background greenlets into storage"""
+
+    def __init__(self, write, write_many=None, on_commit=None, ack=config.INGEST_ACK,
+                 maxsize=config.INGEST_QUEUE_SIZE, workers=config.INGEST_WORKERS,
+                 enqueue_timeout=config.INGEST_ENQUEUE_TIMEOUT,
+                 batch_size=config.INGEST_BATCH_SIZE, batch_window=config.INGEST_BATCH_WINDOW):
+        if ack not in ACK_MODES:
+            raise ValueError("Unknown ingest ack mode '{}'".format(ack))
+        self.write = write
+        self.write_many = write_many
+        self.batch_size = batch_size if write_many else 1
+        self.batch_window = batch_window
+        self.on_commit = on_commit
+        self.ack = ack
+        self.maxsize = maxsize
+        self.worker_count = workers
+        self.enqueue_timeout = enqueue_timeout
+
+        self.queue = Queue(maxsize)
+        self.workers = []
+        self.closed = False
+        self._pid = None
+
+        self.enqueued = 0
+        self.committed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.enqueue_wait = 0.0
+        self.max_enqueue_wait = 0.0
+        self.commit_time = 0.0
+        self.batches = 0
+
+        atexit.register(self.stop)
+
+    def _ensure_started(self):
+        # Workers are spawned lazily (and again after a fork) so gunicorn
+        # workers each get their own greenlets
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self.queue = Queue(self.maxsize)
+            self.workers = [gevent.spawn(self._worker) for _ in range(self.worker_count)]
+
+    def submit(self, bin, request):
+        """Queue a captured request for ``bin``
+
+        Returns the bin's request count in ``commit`` mode, otherwise None.
+        Raises IngestQueueFull when the request couldn't be queued in time.
+        """
+        if self.closed:
+            # Shutting down: write inline rather than lose the request
+            return self._commit(bin, request)
+
+        self._ensure_started()
+        result = AsyncResult() if self.ack == ACK_COMMIT else None
+        item = (bin, request, result)
+
+        if self.ack == ACK_IMMEDIATE:
+            try:
+                self.queue.put_nowait(item)
+            except Full:
+                self.dropped += 1
+                return None
+        else:
+            started = time.time()
+            try:
+                self.queue.put(item, timeout=self.enqueue_timeout)
+            except Full:
+                self.rejected += 1
+                raise IngestQueueFull("Ingest queue is full")
+            waited = time.time() - started
+            self.enqueue_wait += waited
+            self.max_enqueue_wait = max(self.max_enqueue_wait, waited)
+
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+        if result is not None:
+            return result.get()
+        return None
+
+    def _worker(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                try:
+                    remaining = deadline - time.time()
+                    if remaining > 0:
+                        item = self.queue.get(timeout=remaining)
+                    else:
+                        item = self.queue.get_nowait()
+                except Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if len(batch) == 1:
+                self._commit_one(*batch[0])
+            else:
+                self._commit_batch(batch)
+
+    def _commit_one(self, bin, request, result):
+        try:
+            count = self._commit(bin, request)
+            if result is not None:
+                result.set(count)
+        except Exception as e:
+            if result is not None:
+                result.set_exception(e)
+            else:
+                print(f"Error writing queued request: {e}")
+                traceback.print_exc()
+
+    def _commit_batch(self, batch):
+        started = time.time()
+        try:
+            counts = self.write_many([(bin, request) for bin, request, _ in batch])
+        except Exception as e:
+            self.failed += len(batch)
+            for _, _, result in batch:
+                if result is not None:
+                    result.set_exception(e)
+            if all(result is None for _, _, result in batch):
+                print(f"Error writing queued requests: {e}")
+                traceback.print_exc()
+            return
+        self.commit_time += time.time() - started
+        self.committed += len(batch)
+        self.batches += 1
+        for (bin, _, result), count in zip(batch, counts):
+            self._notify(bin, count)
+            if result is not None:
+                result.set(count)
+
+    def _commit(self, bin, request):
+        started = time.time()
+        try:
+            count = self.write(bin, request)
+        except Exception:
+            self.failed += 1
+            raise
+        self.commit_time += time.time() - started
+        self.committed += 1
+        self.batches += 1
+        self._notify(bin, count)
+        return count
+
+    def _notify(self, bin, count):
+        if self.on_commit:
+            try:
+                self.on_commit(bin, count)
+            except Exception as e:
+                print(f"Error notifying bin update: {e}")
+
+    def stop(self, timeout=config.INGEST_DRAIN_TIMEOUT):
+        """Stop accepting work and drain what's already queued"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._pid != os.getpid() or not self.workers:
+            return
+        for _ in self.workers:
+            self.queue.put(_STOP)
+        gevent.joinall(self.workers, timeout=timeout)
+        pending = self.queue.qsize()
+        if pending:
+            print(f"Ingest queue stopped with {pending} requests unwritten")
+
+    def stats(self):
+        """Queue depth, throughput and backpressure counters"""
+        waited = self.enqueued if self.ack != ACK_IMMEDIATE else 0
+        return {
+            'ack': self.ack,
+            'depth': self.queue.qsize(),
+            'capacity': self.maxsize,
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'committed': self.committed,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'rejected': self.rejected,
+            'avg_enqueue_wait_ms': round(self.enqueue_wait / waited * 1000, 3) if waited else 0,
+            'max_enqueue_wait_ms': round(self.max_enqueue_wait * 1000, 3),
+            'batches': self.batches,
+            'avg_batch_size': round(self.committed / self.batches, 2) if self.batches else 0,
+            'avg_commit_ms': round(self.commit_time / self.batches * 1000, 3) if self.batches else 0,
+        }
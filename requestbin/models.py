@@ -1,20 +1,111 @@
-import copy
 import json
 import time
 import datetime
 import os
 import re
 
+from io import BytesIO
+from itertools import chain
+from urllib.parse import parse_qsl
+
 import msgpack
+from werkzeug.formparser import FormDataParser
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.utils import get_current_url, get_host
 
 from .util import random_color
-from .util import tinyid
+from .util import ulid
 from .util import solid16x16gif_datauri
 
 from requestbin import config
 
+class RequestBuffer(object):
+    """Fixed-capacity ring buffer of requests, viewed newest first
+
+    Appending is O(1) and overwrites the oldest request once the buffer is
+    full. Indexing and slicing count from the newest request, so
+    ``buffer[0:20]`` is the first page. Storage grows with use up to
+    ``capacity`` rather than being allocated up front.
+    """
+
+    __slots__ = ('capacity', '_items', '_head')
+
+    def __init__(self, capacity, items=()):
+        self.capacity = max(int(capacity), 1)
+        # Physical order is oldest to newest, wrapping at _head
+        self._items = list(items)[:self.capacity]
+        self._items.reverse()
+        self._head = len(self._items) % self.capacity
+
+    def append(self, item):
+        """Add the newest item, returning the evicted oldest one (or None)"""
+        items = self._items
+        if len(items) < self.capacity:
+            items.append(item)
+            self._head = len(items) % self.capacity
+            return None
+        evicted = items[self._head]
+        items[self._head] = item
+        self._head = (self._head + 1) % self.capacity
+        return evicted
+
+    def resize(self, capacity):
+        """Change capacity, keeping the newest items; returns the evicted ones"""
+        items = list(self)
+        self.__init__(capacity, items)
+        return items[self.capacity:]
+
+    def clear(self):
+        self._items = []
+        self._head = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        size = len(self._items)
+        if isinstance(index, slice):
+            return [self._items[(self._head - 1 - i) % size]
+                    for i in range(*index.indices(size))]
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("request index out of range")
+        return self._items[(self._head - 1 - index) % size]
+
+    def __iter__(self):
+        items, head = self._items, self._head
+        if len(items) < self.capacity or not head:
+            return reversed(items)
+        return iter(items[head - 1::-1] + items[:head - 1:-1])
+
+    def __reversed__(self):
+        items, head = self._items, self._head
+        return iter(items[head:] + items[:head])
+
+    def __eq__(self, other):
+        if isinstance(other, (RequestBuffer, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return 'RequestBuffer({}, {!r})'.format(self.capacity, list(self))
+
+
 class Bin(object):
     max_requests = config.MAX_REQUESTS
+    # Approximate bytes held by a bin besides its requests
+    overhead = 1024
+
+    # ``size`` is the approximate footprint of the bin and its requests,
+    # kept up to date as requests are added and evicted. ``_request_count``
+    # is set by metadata-only lookups, which leave ``requests`` empty.
+    __slots__ = ('created', 'private', 'owner_email', 'color', 'name',
+                 'favicon_uri', '_requests', '_request_count', 'secret_key', 'size')
+
+    # Fields persisted by dump()/load(), besides the requests themselves
+    fields = ('created', 'private', 'owner_email', 'color', 'name',
+              'favicon_uri', 'secret_key')
 
     def __init__(self, private=False, custom_name=None, owner_email=None):
         self.created = time.time()
@@ -22,7 +113,9 @@ class Bin(object):
         self.owner_email = owner_email
         self.color = random_color()
         if custom_name is None:
-            self.name = tinyid(8)
+            # Bin names stay short enough for URLs; request IDs use the
+            # full 26 character ULID
+            self.name = ulid(16)
         else:
             self.name = custom_name
         self.favicon_uri = solid16x16gif_datauri(*self.color)
@@ -40,69 +133,274 @@ class Bin(object):
             request_count=self.request_count)
 
     def dump(self):
-        o = copy.copy(self.__dict__)
+        o = {field: getattr(self, field, None) for field in self.fields}
         o['requests'] = [r.dump() for r in self.requests]
         return msgpack.packb(o, use_bin_type=True)
 
     @staticmethod
     def load(data):
         o = msgpack.unpackb(data)
-        o['requests'] = [Request.load(r) for r in o['requests']]
-        b = Bin()
-        b.__dict__ = o
+        b = Bin.__new__(Bin)
+        for field in Bin.fields:
+            setattr(b, field, o.get(field))
+        b.color = tuple(b.color) if b.color else b.color
+        b.requests = [Request.load(r) for r in o['requests']]
         return b
 
+    @property
+    def requests(self):
+        """Newest-first RequestBuffer holding up to max_requests requests"""
+        return self._requests
+
+    @requests.setter
+    def requests(self, requests):
+        # Backends load newest-first lists; keep them in a ring buffer
+        if not isinstance(requests, RequestBuffer):
+            requests = RequestBuffer(self.max_requests, requests or ())
+        self._requests = requests
+        self._request_count = None
+        self.size = self.overhead + sum(r.size for r in requests)
+
     @property
     def request_count(self):
-        return len(self.requests)
+        """Requests held, or the stored count when they weren't loaded"""
+        if self._request_count is not None:
+            return self._request_count
+        return len(self._requests)
+
+    @request_count.setter
+    def request_count(self, count):
+        self._request_count = count
 
     def add(self, request):
-        self.requests.insert(0, Request(request))
-        if len(self.requests) > self.max_requests:
-            for _ in range(self.max_requests, len(self.requests)):
-                self.requests.pop(self.max_requests)
+        if not isinstance(request, Request):
+            request = Request(request)
+        if self._requests.capacity != self.max_requests:
+            for evicted in self._requests.resize(self.max_requests):
+                self.size -= evicted.size
+        evicted = self._requests.append(request)
+        self.size += request.size - (evicted.size if evicted is not None else 0)
+        return request
+
+
+class BinSummary(object):
+    """A bin as owner listings show it: no requests and no secret key
+
+    ``last_activity`` is when the newest request arrived, or when the bin
+    was created if it has none. Listings are newest first; pass a page's
+    last ``cursor`` as ``before`` to get the next one.
+    """
+
+    __slots__ = ('name', 'color', 'private', 'request_count', 'created', 'last_activity')
+
+    def __init__(self, name, color, private, request_count, created, last_activity=None):
+        self.name = name
+        self.color = tuple(color) if color else color
+        self.private = bool(private)
+        self.request_count = request_count
+        self.created = created
+        self.last_activity = created if last_activity is None else last_activity
+
+    @classmethod
+    def of(cls, bin):
+        """Summarize a Bin whose requests are loaded"""
+        last_activity = bin.requests[0].time if len(bin.requests) else None
+        return cls(bin.name, bin.color, bin.private, bin.request_count, bin.created, last_activity)
+
+    @property
+    def cursor(self):
+        return (self.created, self.name)
+
+    def to_dict(self):
+        return dict(
+            name=self.name,
+            color=self.color,
+            private=self.private,
+            request_count=self.request_count,
+            created=self.created,
+            last_activity=self.last_activity)
+
+    def __repr__(self):
+        return 'BinSummary({!r}, request_count={})'.format(self.name, self.request_count)
 
 
 class Request(object):
     ignore_headers = config.IGNORE_HEADERS
     max_raw_size = config.MAX_RAW_SIZE 
+    lazy = config.LAZY_CAPTURE
+    # Approximate bytes held by a request besides its body and header text
+    overhead = 512
+
+    form_types = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+    # At capture time only the request line, the raw WSGI header pairs and the
+    # body are copied. Headers, query string, form data and URL are parsed on
+    # first access and memoized in the underscored slots. ``body`` is the only
+    # stored copy of the payload; the ``raw`` text view is decoded from it on
+    # first access and cached, but never persisted.
+    __slots__ = ('id', 'time', 'remote_addr', 'method', 'path', 'body',
+                 'content_length', 'digest', '_line', '_raw_headers',
+                 '_headers', '_query_string', '_form_data', '_url', '_raw')
+
+    # Fields persisted by dump()/load() and pickle
+    fields = ('id', 'time', 'remote_addr', 'method', 'path', 'body',
+              'content_length', 'digest')
 
     def __init__(self, input=None):
+        self.digest = None
+        self._line = self._raw_headers = None
+        self._headers = self._query_string = self._form_data = self._url = None
+        self._raw = None
         if input:
-            self.id = tinyid(6)
-            self.url = input.url
+            environ = input.environ
+            self.id = ulid()
             self.time = time.time()
-            self.remote_addr = input.headers.get('X-Forwarded-For', input.remote_addr)
+            self.remote_addr = environ.get('HTTP_X_FORWARDED_FOR', input.remote_addr)
             self.method = input.method
-            self.headers = dict(input.headers)
+            self.path = input.path
+            server_name, server_port = input.server or (None, None)
+            self._line = (input.scheme, server_name, server_port,
+                          input.root_path, input.query_string)
+            self._raw_headers = tuple(
+                (key, value) for key, value in environ.items()
+                if key.startswith('HTTP_') or key in ('CONTENT_TYPE', 'CONTENT_LENGTH'))
+
+            # WSGIRawBody has already capped the captured body at MAX_RAW_SIZE
+            self.body = environ.get('raw', b'')[0:self.max_raw_size]
+            self.content_length = environ.get('raw.length', len(self.body))
+            self.digest = environ.get('raw.digest')
+
+            if not self.lazy or (self.content_length > len(self.body)
+                                 and self._mimetype() in self.form_types):
+                # A truncated form can't be re-parsed from the stored body
+                self._form_data = tuple((k, input.values[k]) for k in input.form)
+            if not self.lazy:
+                self._parse()
+        else:
+            # A blank request, filled in by hand: empty but complete, so
+            # size, to_dict() and dump() work before any field is set
+            self.id = ulid()
+            self.time = time.time()
+            self.remote_addr = None
+            self.method = 'GET'
+            self.path = ''
+            self.body = b''
+            self.content_length = 0
+            self._headers = self._form_data = ()
+            self._query_string = {}
+            self._url = ''
 
-            for header in self.ignore_headers:
-                self.headers.pop(header, None)
+    def _parse(self):
+        """Parse and memoize every lazily captured field"""
+        return self.url, self._header_pairs(), self.query_string, self.form_data
 
-            self.query_string = input.args.to_dict(flat=True)
-            self.form_data = []
+    @staticmethod
+    def _header_name(key):
+        # Same mapping as werkzeug's EnvironHeaders
+        if key.startswith('HTTP_'):
+            key = key[5:]
+        return key.replace('_', '-').title()
 
-            for k in input.form:
-                self.form_data.append([k, input.values[k]])
+    def _header_pairs(self):
+        if self._headers is None:
+            pairs = []
+            for key, value in self._raw_headers or ():
+                if key in ('HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH'):
+                    continue
+                if key in ('CONTENT_TYPE', 'CONTENT_LENGTH') and not value:
+                    continue
+                name = self._header_name(key)
+                if name not in self.ignore_headers:
+                    pairs.append((name, value))
+            self._headers = tuple(pairs)
+        return self._headers
 
-            self.body = input.data
-            self.path = input.path
-            self.content_type = self.headers.get("Content-Type", "")
+    def _mimetype(self):
+        return parse_options_header(self.content_type)[0]
+
+    @property
+    def headers(self):
+        return dict(self._header_pairs())
+
+    @headers.setter
+    def headers(self, headers):
+        if hasattr(headers, 'items'):
+            headers = headers.items()
+        self._headers = tuple((name, value) for name, value in headers or ())
+
+    @property
+    def content_type(self):
+        for name, value in self._header_pairs():
+            if name == 'Content-Type':
+                return value
+        return ""
+
+    @property
+    def url(self):
+        if self._url is None:
+            scheme, server_name, server_port, root_path, query = self._line
+            server = (server_name, server_port) if server_name else None
+            host = get_host(scheme, self.headers.get('Host'), server)
+            self._url = get_current_url(scheme, host, root_path, self.path, query)
+        return self._url
+
+    @url.setter
+    def url(self, url):
+        self._url = url
+
+    @property
+    def query_string(self):
+        if self._query_string is None:
+            query = {}
+            for k, v in parse_qsl(self._line[4].decode('utf-8', 'replace'), keep_blank_values=True):
+                query.setdefault(k, v)
+            self._query_string = query
+        return self._query_string
+
+    @query_string.setter
+    def query_string(self, query_string):
+        self._query_string = query_string
+
+    @property
+    def form_data(self):
+        if self._form_data is None:
+            mimetype, options = parse_options_header(self.content_type)
+            form = {}
+            if mimetype == 'application/x-www-form-urlencoded':
+                for k, v in parse_qsl(self.as_string(self.body), keep_blank_values=True):
+                    form.setdefault(k, v)
+            elif mimetype == 'multipart/form-data':
+                try:
+                    _, fields, _ = FormDataParser().parse(
+                        BytesIO(self.body), mimetype, len(self.body), options)
+                    form = fields.to_dict(flat=True)
+                except ValueError:
+                    pass
+            self._form_data = tuple(form.items())
+        return self._form_data
 
-            self.raw = self.as_string(input.environ.get('raw'))
-            self.content_length = len(self.raw)
+    @form_data.setter
+    def form_data(self, form_data):
+        self._form_data = tuple(tuple(pair) for pair in form_data or ())
 
-            # for header in self.ignore_headers:
-            #     self.raw = re.sub(r'{}: [^\n]+\n'.format(header), 
-            #                         '', self.raw, flags=re.IGNORECASE)
-            if self.raw and len(self.raw) > self.max_raw_size:
-                self.raw = self.raw[0:self.max_raw_size]
+    @property
+    def raw(self):
+        if self._raw is None:
+            self._raw = self.as_string(self.body)
+        return self._raw
     
     def as_string(self, bytes):
+        if not bytes:
+            return ""
         try:
             return str(bytes, "utf-8")
-        except (UnicodeDecodeError, AttributeError):
-            return "".join(chr(x) for x in bytes) #old format
+        except UnicodeDecodeError as e:
+            if e.reason == 'unexpected end of data' and e.start >= len(bytes) - 3:
+                # Body was capped in the middle of a multi-byte character
+                return str(bytes[:e.start], "utf-8")
+            # Binary payloads map byte-for-byte onto code points (the old
+            # per-byte chr() format, done in C)
+            return str(bytes, "latin-1")
 
     def to_dict(self):
         return dict(
@@ -119,6 +417,7 @@ class Request(object):
             path=self.path,
             content_length=self.content_length,
             content_type=self.content_type,
+            digest=self.digest,
         )
 
     @property
@@ -126,26 +425,78 @@ class Request(object):
         curl_command = f"curl -X {self.method} '{self.url}'"
         curl_headers = "\\\n".join([
             f"  -H '{header}: {value}'"
-            for header, value in self.headers.items()
+            for header, value in self._header_pairs()
             if header.lower() not in ['host', 'content-length']
         ])
         if curl_headers:
             curl_command += f"\\\n{curl_headers}"
-        if self.raw:
-            curl_command += f"\\\n  -d '{self.raw}'"
+        raw = self.raw
+        if raw:
+            curl_command += f"\\\n  -d '{raw}'"
         return curl_command
 
     @property
     def created(self):
         return datetime.datetime.fromtimestamp(self.time)
 
+    @property
+    def size(self):
+        """Approximate bytes held by this request, for memory budgeting"""
+        pairs = self._raw_headers if self._raw_headers is not None else self._header_pairs()
+        return (self.overhead + len(self.body or b'') + len(self.path or '')
+                + sum(map(len, chain.from_iterable(pairs))))
+
+    def __getstate__(self):
+        state = {field: getattr(self, field, None) for field in self.fields}
+        if self._raw_headers is not None:
+            # Persist the raw capture so loaded requests stay lazy too
+            state['line'] = list(self._line)
+            state['raw_headers'] = [list(pair) for pair in self._raw_headers]
+        else:
+            state['url'] = self.url
+            state['headers'] = [list(pair) for pair in self._header_pairs()]
+            state['query_string'] = self.query_string
+        if self._form_data is not None and (
+                self._raw_headers is None or self.content_length > len(self.body)):
+            state['form_data'] = [list(pair) for pair in self._form_data]
+        return state
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            # Default slots pickling: (dict state, slots state)
+            state = dict(state[0] or {}, **(state[1] or {}))
+        state = dict(state)
+        if not state.get('body') and state.get('raw'):
+            # Older records kept the payload only as decoded text
+            state['body'] = state['raw'].encode('utf-8', 'surrogatepass')
+        state.setdefault('body', b'')
+        if isinstance(state['body'], str):
+            state['body'] = state['body'].encode('utf-8', 'surrogatepass')
+        for field in self.fields:
+            setattr(self, field, state.get(field))
+
+        line = state.get('line')
+        self._line = tuple(line) if line is not None else None
+        raw_headers = state.get('raw_headers')
+        self._raw_headers = tuple(map(tuple, raw_headers)) if raw_headers is not None else None
+        self._headers = self._query_string = self._form_data = self._url = None
+        self._raw = None
+        if 'headers' in state:
+            # Records captured before lazy parsing carry parsed fields
+            self.headers = state['headers']
+            self._url = state.get('url')
+            self._query_string = state.get('query_string') or {}
+        if state.get('form_data') is not None or self._raw_headers is None:
+            self.form_data = state.get('form_data')
+
     def dump(self):
-        return msgpack.packb(self.__dict__)
+        return msgpack.packb(self.__getstate__(), use_bin_type=True)
 
     @staticmethod
     def load(data):
-        r = Request()
-        r.__dict__ = msgpack.unpackb(data)
+        r = Request.__new__(Request)
+        # Arrays decode as tuples, the form the lazy fields keep them in
+        r.__setstate__(msgpack.unpackb(data, use_list=False))
         return r
 
     # def __iter__(self):
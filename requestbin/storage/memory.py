@@ -1,43 +1,189 @@
+import gc
+import os
+import mmap
 import time
+import heapq
+import bisect
+import atexit
+import struct
 import operator
+import traceback
 import gevent   
+import msgpack
+from collections import OrderedDict
 
-from requestbin.models import Bin
+from requestbin.models import Bin, BinSummary
 
 from requestbin import config
 
+EVICTION_POLICIES = ('lru', 'oldest', 'largest')
+
+# Snapshot file: magic, then length-prefixed records. The first record is a
+# msgpack header, each following record is one Bin.dump().
+SNAPSHOT_MAGIC = b'RBSNAP1\n'
+_record_length = struct.Struct('>I')
+
 class MemoryStorage():
     cleanup_interval = config.CLEANUP_INTERVAL
+    # Approximate byte budget for all bins (0 disables eviction)
+    memory_budget = config.MEMORY_BUDGET
+    eviction_policy = config.MEMORY_EVICTION_POLICY
+    snapshot_path = config.MEMORY_SNAPSHOT_PATH
+    snapshot_interval = config.MEMORY_SNAPSHOT_INTERVAL
+    # Called with each bin that leaves the storage (expired, evicted or
+    # replaced), for state kept alongside it
+    on_remove = None
 
     def __init__(self, bin_ttl):
+        if self.eviction_policy not in EVICTION_POLICIES:
+            raise ValueError("Unknown memory eviction policy '{}'".format(self.eviction_policy))
         self.bin_ttl = bin_ttl
-        self.bins = {}
+        # Ordered least recently used first
+        self.bins = OrderedDict()
         self.request_count = 0
+        self.bytes_used = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        # Max-heap of (-size, name) for the "largest" policy, pushed whenever
+        # a bin's size changes; stale entries are skipped when they surface
+        self._largest = []
+        # Min-heap of (expires_at, name); entries for bins that were deleted
+        # or replaced are skipped when they surface
+        self._expiry = []
+        # owner_email -> [(created, name), ...] kept sorted oldest first
+        self._owners = {}
+        self._reaper = None
+        self._snapshotter = None
+        self._pid = None
+        # Bumped on every write; snapshots are skipped when nothing changed
+        self._changes = 0
+        self._snapshot_changes = 0
+        if self.snapshot_path:
+            self.load_snapshot()
+            atexit.register(self.save_snapshot)
 
     def do_start(self):
-        self.spawn(self._cleanup_loop)
+        """Start the expiry and snapshot greenlets (once per process)"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._reaper = gevent.spawn(self._cleanup_loop)
+            if self.snapshot_path and self.snapshot_interval:
+                self._snapshotter = gevent.spawn(self._snapshot_loop)
+
+    def _snapshot_loop(self):
+        while True:
+            gevent.sleep(self.snapshot_interval)
+            self.save_snapshot()
 
     def _cleanup_loop(self):
         while True:
             gevent.sleep(self.cleanup_interval)
-            self._expire_bins()
+            try:
+                self._expire_bins()
+            except Exception as e:
+                print(f"Error expiring bins: {e}")
+
+    def _expires_at(self, bin):
+        return bin.created + self.bin_ttl
+
+    def _expire_bins(self, now=None):
+        """Drop bins whose TTL has passed; costs O(expired), not O(bins)"""
+        now = time.time() if now is None else now
+        expired = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, name = heapq.heappop(self._expiry)
+            bin = self.bins.get(name)
+            if bin is not None and self._expires_at(bin) <= now:
+                self._remove_bin(bin)
+                expired += 1
+        return expired
 
-    def _expire_bins(self):
-        expiry = time.time() - self.bin_ttl
-        for name, bin in self.bins.items():
-            if bin.created < expiry:
-                self.bins.pop(name)
+    def _remove_bin(self, bin):
+        """Drop a bin and its owner index entry"""
+        if self.bins.get(bin.name) is bin:
+            del self.bins[bin.name]
+            self.bytes_used -= bin.size
+            self._changes += 1
+            if self.on_remove:
+                self.on_remove(bin)
+        owned = self._owners.get(bin.owner_email)
+        if owned:
+            entry = (bin.created, bin.name)
+            i = bisect.bisect_left(owned, entry)
+            if i < len(owned) and owned[i] == entry:
+                del owned[i]
+            if not owned:
+                del self._owners[bin.owner_email]
 
     def create_bin(self, private=False, custom_name=None, owner_email=None) -> Bin:
+        self.do_start()
         bin = Bin(private, custom_name, owner_email)
+        self._insert_bin(bin)
+        self._enforce_budget()
+        return bin
+
+    def _insert_bin(self, bin):
+        """Add a bin to the dict and every index"""
+        if bin.name in self.bins:
+            self._remove_bin(self.bins[bin.name])
         self.bins[bin.name] = bin
-        return self.bins[bin.name]
+        if bin.owner_email:
+            bisect.insort(self._owners.setdefault(bin.owner_email, []), (bin.created, bin.name))
+        heapq.heappush(self._expiry, (self._expires_at(bin), bin.name))
+        self.bytes_used += bin.size
+        if self.eviction_policy == 'largest':
+            heapq.heappush(self._largest, (-bin.size, bin.name))
+        self._changes += 1
 
     def create_request(self, bin, request):
+        stored = self.bins.get(bin.name) is bin
+        before = bin.size
         bin.add(request)
         self.request_count += 1
+        self._changes += 1
+        if stored:
+            self.bytes_used += bin.size - before
+            self.bins.move_to_end(bin.name)
+            if self.eviction_policy == 'largest':
+                heapq.heappush(self._largest, (-bin.size, bin.name))
+            self._enforce_budget()
+        return bin.request_count
+
+    def _enforce_budget(self):
+        """Evict bins by the configured policy until under the byte budget"""
+        if not self.memory_budget:
+            return
+        while self.bytes_used > self.memory_budget and self.bins:
+            bin = self._eviction_candidate()
+            if bin is None:
+                break
+            self.evicted_bytes += bin.size
+            self.evictions += 1
+            self._remove_bin(bin)
+
+    def _eviction_candidate(self):
+        if self.eviction_policy == 'lru':
+            return next(iter(self.bins.values()))
+        if self.eviction_policy == 'oldest':
+            # Bins share one TTL, so the expiry heap is in creation order
+            while self._expiry:
+                expires_at, name = heapq.heappop(self._expiry)
+                bin = self.bins.get(name)
+                if bin is not None and self._expires_at(bin) == expires_at:
+                    return bin
+            return None
+        if len(self._largest) > 2 * len(self.bins) + 64:
+            self._largest = [(-bin.size, name) for name, bin in self.bins.items()]
+            heapq.heapify(self._largest)
+        while self._largest:
+            size, name = heapq.heappop(self._largest)
+            bin = self.bins.get(name)
+            if bin is not None and bin.size == -size:
+                return bin
+        return None
 
     def count_bins(self):
+        self._expire_bins()
         return len(self.bins)
 
     def count_requests(self):
@@ -46,20 +192,150 @@ class MemoryStorage():
     def avg_req_size(self):
         return None
 
+    def storage_stats(self):
+        """Memory footprint and eviction counters"""
+        return {
+            'bytes_used': self.bytes_used,
+            'memory_budget': self.memory_budget,
+            'eviction_policy': self.eviction_policy,
+            'evictions': self.evictions,
+            'evicted_bytes': self.evicted_bytes,
+        }
+
     def lookup_bin(self, name) -> Bin:
-        return self.bins[name]
+        bin = self.bins[name]
+        if self._expires_at(bin) <= time.time():
+            # Not reaped yet; callers never see an expired bin
+            self._remove_bin(bin)
+            raise KeyError(name)
+        self.bins.move_to_end(name)
+        return bin
 
-    def get_bins_by_owner(self, owner_email):
-        """Retrieve all bins owned by a specific user"""
+    def lookup_bin_meta(self, name) -> Bin:
+        """The bin without loading its requests; here that is the bin itself"""
+        return self.lookup_bin(name)
+
+    def get_requests(self, name, offset=0, limit=None):
+        """A page of the bin's requests, newest first"""
+        limit = config.MAX_REQUESTS if limit is None else limit
+        return self.lookup_bin(name).requests[offset:offset + limit]
+
+    def get_bins_by_owner(self, owner_email, limit=None):
+        """Retrieve bins owned by a specific user, most recent first"""
         bins = []
+        now = time.time()
+        for created, name in reversed(self._owners.get(owner_email, ())):
+            bin = self.bins.get(name)
+            if bin is None or self._expires_at(bin) <= now:
+                continue
+            bins.append(bin)
+            if limit is not None and len(bins) >= limit:
+                break
+        return bins
+
+    def list_bins_by_owner(self, owner_email, limit=None, before=None):
+        """Summaries of a user's bins, most recent first
+
+        ``before`` is the cursor of the last summary on the previous page.
+        """
+        owned = self._owners.get(owner_email, ())
+        end = bisect.bisect_left(owned, tuple(before)) if before else len(owned)
+        summaries = []
+        now = time.time()
+        for created, name in reversed(owned[:end]):
+            bin = self.bins.get(name)
+            if bin is None or self._expires_at(bin) <= now:
+                continue
+            summaries.append(BinSummary.of(bin))
+            if limit is not None and len(summaries) >= limit:
+                break
+        return summaries
+
+    def save_snapshot(self, path=None):
+        """Write every live bin to the snapshot file
+
+        The file is written next to the target and renamed over it, so a
+        crash mid-write leaves the previous snapshot intact. Returns the
+        number of bins written, or None when nothing changed.
+        """
+        path = path or self.snapshot_path
+        if not path or self._changes == self._snapshot_changes:
+            return None
+        changes = self._changes
+        now = time.time()
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            header = msgpack.packb({'saved': now, 'request_count': self.request_count})
+            written = 0
+            with open(tmp_path, 'wb') as f:
+                f.write(SNAPSHOT_MAGIC)
+                f.write(_record_length.pack(len(header)))
+                f.write(header)
+                for bin in list(self.bins.values()):
+                    if self._expires_at(bin) <= now:
+                        continue
+                    data = bin.dump()
+                    f.write(_record_length.pack(len(data)))
+                    f.write(data)
+                    written += 1
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            self._snapshot_changes = changes
+            return written
+        except Exception as e:
+            print(f"Error saving memory snapshot: {e}")
+            traceback.print_exc()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    def load_snapshot(self, path=None):
+        """Load bins from a snapshot file, skipping expired ones
+
+        Returns the number of bins loaded.
+        """
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path) or not os.path.getsize(path):
+            return 0
+        loaded = 0
+        # Bulk-loading allocates many small objects at once; pausing the
+        # cyclic GC avoids repeated full collections over them
+        gc_enabled = gc.isenabled()
+        gc.disable()
         try:
-            for bin in self.bins.values():
-                if hasattr(bin, 'owner_email') and bin.owner_email == owner_email:
-                    bins.append(bin)
-            
-            # Sort by created time (most recent first)
-            bins.sort(key=lambda b: b.created, reverse=True)
-            return bins
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                if m[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                    raise ValueError("not a RequestBin snapshot")
+                header = None
+                now = time.time()
+                offset, end = len(SNAPSHOT_MAGIC), len(m)
+                with memoryview(m) as view:
+                    while offset < end:
+                        length, = _record_length.unpack_from(m, offset)
+                        offset += _record_length.size
+                        if offset + length > end:
+                            raise ValueError("truncated snapshot record")
+                        # Records are decoded straight from the mapping
+                        with view[offset:offset + length] as record:
+                            if header is None:
+                                header = msgpack.unpackb(record)
+                            else:
+                                bin = Bin.load(record)
+                                if self._expires_at(bin) > now:
+                                    self._insert_bin(bin)
+                                    loaded += 1
+                        offset += length
+                self.request_count = max(self.request_count, (header or {}).get('request_count', 0))
+        except ValueError as e:
+            # Bad or partly written file: keep the bins read so far
+            print(f"Error loading memory snapshot {path}: {e} ({loaded} bins loaded)")
         except Exception as e:
-            print(f"Error getting bins by owner: {e}")
-            return []
+            print(f"Error loading memory snapshot {path}: {e}")
+            traceback.print_exc()
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self._enforce_budget()
+        self._snapshot_changes = self._changes
+        return loaded
@@ -1,23 +1,154 @@
 from __future__ import absolute_import
 
+import os
 import time
 import pickle
 import traceback
 import json
+import gevent
 import psycopg2
 from psycopg2 import pool
 from psycopg2.extras import RealDictCursor
 
-from requestbin.models import Bin
+from requestbin.models import Bin, BinSummary, Request
 
 from requestbin import config
 
+
+# Store a batch of requests in one call: bump each bin's request_count, insert
+# the rows, trim each bin to the newest `keep` and bump the global counter.
+# Returns the request_order of each bin's first new request; bins that do not
+# exist are left out.
+# Requests are ordered by id. Rows get their ids while the bin's row is
+# locked, so within a bin ids increase in commit order, and trimming is a
+# range delete below the newest ids. A batch whose snapshot predates rows
+# committed by the batch it waited on leaves those rows for the next trim:
+# a bin can briefly hold a few extra rows, but never loses a newer one.
+# As a function the plan is cached per connection, where a CTE sent as text
+# would be planned on every call, and it is generic from the first call:
+# planning each batch costs more than it saves. Every CTE sees the same
+# snapshot, so the trim cannot see this batch's rows; rows it would trim are
+# never inserted instead. Bins are locked in name order so concurrent batches
+# touching the same bins cannot deadlock.
+ADD_REQUESTS_FUNCTION = """
+CREATE OR REPLACE FUNCTION add_requests(
+    names TEXT[], payloads BYTEA[], positions INTEGER[], keep INTEGER
+) RETURNS TABLE (bin TEXT, first_order BIGINT) AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    WITH data AS (
+        SELECT * FROM unnest(names, payloads, positions) AS d (name, request_data, position)
+    ),
+    added AS (
+        SELECT name, COUNT(*) AS added FROM data GROUP BY name
+    ),
+    locked AS (
+        SELECT bins.name FROM bins JOIN added ON bins.name = added.name
+        ORDER BY bins.name
+        FOR UPDATE OF bins
+    ),
+    bumped AS (
+        UPDATE bins SET request_count = bins.request_count + added.added,
+                        last_request_at = NOW()
+        FROM added, locked
+        WHERE bins.name = added.name AND locked.name = added.name
+        RETURNING bins.name, bins.request_count AS total, added.added
+    ),
+    inserted AS (
+        INSERT INTO requests (bin_name, request_data, request_order)
+        SELECT data.name, data.request_data, bumped.total - bumped.added + data.position
+        FROM data JOIN bumped ON data.name = bumped.name
+        WHERE data.position >= bumped.added - keep
+    ),
+    cutoff AS (
+        -- Newest stored row past the ones to keep, found by walking the
+        -- (bin_name, id DESC) index
+        SELECT bumped.name, oldest.id FROM bumped
+        CROSS JOIN LATERAL (
+            SELECT requests.id FROM requests
+            WHERE requests.bin_name = bumped.name
+            ORDER BY requests.id DESC
+            OFFSET keep - LEAST(bumped.added, keep) LIMIT 1
+        ) AS oldest
+    ),
+    trimmed AS (
+        DELETE FROM requests USING cutoff
+        WHERE requests.bin_name = cutoff.name AND requests.id <= cutoff.id
+    ),
+    counted AS (
+        UPDATE stats SET value = value + (SELECT COALESCE(SUM(added), 0) FROM bumped)
+        WHERE key = 'total_requests'
+    )
+    SELECT bumped.name::TEXT, bumped.total - bumped.added FROM bumped;
+END;
+$$ LANGUAGE plpgsql
+SET plan_cache_mode = force_generic_plan
+"""
+
+
+# Delete up to a batch of expired bins (their requests go by cascade).
+# Oldest first along idx_bins_expires_at; rows another transaction holds,
+# such as a bin taking a request, are skipped rather than waited for.
+REAP_EXPIRED_BINS = """
+    DELETE FROM bins WHERE name IN (
+        SELECT name FROM bins
+        WHERE expires_at < NOW()
+        ORDER BY expires_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+
+def _load_request(data):
+    """Decode a stored request_data value
+
+    Rows are written as Request.dump() msgpack; rows from older releases hold
+    a pickled Request, whose stream always opens with the PROTO opcode (0x80).
+    msgpack never starts that way for a request, whose state map has at least
+    eight keys.
+    """
+    data = bytes(data)
+    if data[:1] == b'\x80':
+        return pickle.loads(data)
+    return Request.load(data)
+
+
+def _load_bin(row):
+    """Rebuild a Bin from a bins row fetched with RealDictCursor"""
+    bin = Bin.__new__(Bin)
+    bin.name = row['name']
+    bin.created = row['created_at'].timestamp()
+    bin.private = row['private']
+    bin.color = (row['color_r'], row['color_g'], row['color_b'])
+    bin.secret_key = bytes(row['secret_key']) if row['secret_key'] else None
+    bin.favicon_uri = row['favicon_uri']
+    bin.owner_email = row.get('owner_email')
+    return bin
+
+
 class PostgreSQLStorage():
-    """PostgreSQL storage backend for RequestBin"""
-    
+    """PostgreSQL storage backend for RequestBin
+
+    Reads skip expired bins; deleting them is left to a reaper greenlet.
+    Every worker runs one, but only the worker holding the reaper advisory
+    lock deletes anything, so workers never contend on the same rows.
+    """
+    reaper_interval = config.POSTGRES_REAPER_INTERVAL
+    reaper_batch = config.POSTGRES_REAPER_BATCH
+
     def __init__(self, bin_ttl):
         self.bin_ttl = bin_ttl
         self.connection_pool = None
+        self._pid = None
+        self._reaper = None
+        # Kept out of the pool while it holds the reaper lock
+        self._reaper_conn = None
+        self.reaper_leader = False
+        self.reaped_bins = 0
+        self.reaper_batches = 0
+        self.reaper_last_sweep = None
         self._initialize_connection_pool()
         self._create_tables()
 
@@ -57,6 +188,10 @@ class PostgreSQLStorage():
             conn = self._get_connection()
             cursor = conn.cursor()
             
+            # Workers start together; only one of them creates the schema
+            # at a time
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('requestbin_create_tables'))")
+            
             # Create bins table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS bins (
@@ -73,16 +208,27 @@ class PostgreSQLStorage():
                 )
             """)
             
+            # Columns added since the table was first created
+            cursor.execute("ALTER TABLE bins ADD COLUMN IF NOT EXISTS owner_email VARCHAR(255)")
+            cursor.execute("ALTER TABLE bins ADD COLUMN IF NOT EXISTS last_request_at TIMESTAMP")
+            
             # Create index on expires_at for cleanup
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_bins_expires_at 
                 ON bins(expires_at)
             """)
             
+            # Owner listings walk this newest first, keyset paged
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_bins_owner_created 
+                ON bins(owner_email, created_at, name)
+            """)
+            cursor.execute("DROP INDEX IF EXISTS idx_bins_owner_email")
+            
             # Create requests table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS requests (
-                    id SERIAL PRIMARY KEY,
+                    id BIGSERIAL PRIMARY KEY,
                     bin_name VARCHAR(255) NOT NULL REFERENCES bins(name) ON DELETE CASCADE,
                     request_data BYTEA NOT NULL,
                     created_at TIMESTAMP NOT NULL DEFAULT NOW(),
@@ -90,11 +236,35 @@ class PostgreSQLStorage():
                 )
             """)
             
+            # Requests are ordered by id; tables from older releases have a
+            # 32-bit one
+            cursor.execute("""
+                SELECT data_type, pg_get_serial_sequence('requests', 'id')
+                FROM information_schema.columns
+                WHERE table_schema = current_schema()
+                AND table_name = 'requests' AND column_name = 'id'
+            """)
+            data_type, sequence = cursor.fetchone()
+            if data_type == 'integer':
+                # The bin_stats view from schema.sql pins the column type
+                cursor.execute("""
+                    SELECT pg_get_viewdef(to_regclass('bin_stats'))
+                    WHERE to_regclass('bin_stats') IS NOT NULL
+                """)
+                view = cursor.fetchone()
+                if view:
+                    cursor.execute("DROP VIEW bin_stats")
+                cursor.execute("ALTER TABLE requests ALTER COLUMN id TYPE BIGINT")
+                cursor.execute(f"ALTER SEQUENCE {sequence} AS BIGINT")
+                if view:
+                    cursor.execute("CREATE VIEW bin_stats AS " + view[0])
+            
             # Create indexes for requests
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_requests_bin_name 
-                ON requests(bin_name, request_order DESC)
+                CREATE INDEX IF NOT EXISTS idx_requests_bin_id 
+                ON requests(bin_name, id DESC)
             """)
+            cursor.execute("DROP INDEX IF EXISTS idx_requests_bin_name")
             
             # Create stats table for global counters
             cursor.execute("""
@@ -111,6 +281,8 @@ class PostgreSQLStorage():
                 ON CONFLICT (key) DO NOTHING
             """)
             
+            cursor.execute(ADD_REQUESTS_FUNCTION)
+            
             conn.commit()
             cursor.close()
         except Exception as e:
@@ -123,25 +295,81 @@ class PostgreSQLStorage():
             if conn:
                 self._put_connection(conn)
 
-    def _cleanup_expired_bins(self):
-        """Remove expired bins from database"""
-        conn = None
+    def do_start(self):
+        """Start the reaper greenlet (once per process)"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._reaper = gevent.spawn(self._reaper_loop)
+
+    def _reaper_loop(self):
+        while True:
+            gevent.sleep(self.reaper_interval)
+            try:
+                if self._lead():
+                    self._reap()
+            except Exception as e:
+                print(f"Error reaping expired bins: {e}")
+                self._resign()
+
+    def _lead(self):
+        """Try to take the reaper lock; True while this worker holds it
+
+        The lock is a session lock on a connection kept for the reaper, so
+        it passes to another worker as soon as this one exits.
+        """
+        if self.reaper_leader:
+            return True
+        conn = self._reaper_conn = self.connection_pool.getconn(key='reaper')
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext('requestbin_reaper'))")
+            self.reaper_leader = cursor.fetchone()[0]
+        conn.commit()
+        if not self.reaper_leader:
+            self._reaper_conn = None
+            self.connection_pool.putconn(conn, key='reaper')
+        return self.reaper_leader
+
+    def _resign(self):
+        """Release the lock and drop the reaper connection
+
+        The unlock is explicit so another worker can lead at once; closing
+        alone frees the lock only when the server notices the disconnect.
+        """
+        conn, self._reaper_conn, self.reaper_leader = self._reaper_conn, None, False
+        if conn is None:
+            return
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM bins WHERE expires_at < NOW()")
-            conn.commit()
-            cursor.close()
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            print(f"Error cleaning up expired bins: {e}")
+            conn.rollback()
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(hashtext('requestbin_reaper'))")
+        except Exception:
+            pass
         finally:
-            if conn:
-                self._put_connection(conn)
+            self.connection_pool.putconn(conn, key='reaper', close=True)
+
+    def _reap(self):
+        """Delete expired bins, one committed batch at a time, until a
+        batch comes back short; returns the number of bins deleted"""
+        conn = self._reaper_conn
+        deleted = 0
+        while True:
+            with conn.cursor() as cursor:
+                cursor.execute(REAP_EXPIRED_BINS, (self.reaper_batch,))
+                batch = cursor.rowcount
+            conn.commit()
+            deleted += batch
+            self.reaped_bins += batch
+            self.reaper_batches += 1
+            if batch < self.reaper_batch:
+                break
+            # Let requests in before the next batch
+            gevent.sleep(0)
+        self.reaper_last_sweep = time.time()
+        return deleted
 
     def create_bin(self, private=False, custom_name=None, owner_email=None) -> Bin:
         """Create a new bin"""
+        self.do_start()
         bin = Bin(private, custom_name, owner_email)
         conn = None
         
@@ -150,7 +378,13 @@ class PostgreSQLStorage():
             cursor = conn.cursor()
             
             expires_at = time.time() + self.bin_ttl
-            
+
+            if custom_name:
+                # An expired bin may still hold the name until the reaper
+                # reaches it; its requests go with it
+                cursor.execute("DELETE FROM bins WHERE name = %s AND expires_at <= NOW()",
+                               (bin.name,))
+
             cursor.execute("""
                 INSERT INTO bins (
                     name, created_at, expires_at, private, 
@@ -188,65 +422,59 @@ class PostgreSQLStorage():
 
     def create_request(self, bin: Bin, request):
         """Add a request to a bin"""
+        return self.create_requests([(bin, request)])[0]
+
+    def create_requests(self, items):
+        """Add a batch of (bin, request) pairs in one statement
+
+        The add_requests() function bumps each bin's request_count, writes
+        the rows, trims each bin to MAX_REQUESTS and bumps the global
+        counter, so a request costs one round trip and nothing of the bin
+        needs loading first. Returns each item's bin request count (None
+        for bins that no longer exist).
+        """
+        self.do_start()
         conn = None
         
         try:
-            # bin.add() creates a Request object and inserts it at position 0
-            bin.add(request)
+            rows = []
+            positions = []
+            added = {}
+            for bin, request in items:
+                if not isinstance(request, Request):
+                    request = Request(request)
+                # Position of the request among its bin's in this batch
+                position = added.get(bin.name, 0)
+                added[bin.name] = position + 1
+                positions.append((bin.name, position))
+                # Serialize the Request model object (not the Flask request);
+                # the body is the only copy of the payload in the record
+                rows.append((bin.name, request.dump(), position))
             
             conn = self._get_connection()
             cursor = conn.cursor()
             
-            # Get current request count for this bin
-            cursor.execute(
-                "SELECT request_count FROM bins WHERE name = %s",
-                (bin.name,)
-            )
-            result = cursor.fetchone()
-            current_count = result[0] if result else 0
-            
-            # Serialize the Request model object (not the Flask request)
-            # The Request object is at bin.requests[0] after bin.add()
-            request_obj = bin.requests[0]
-            request_data = pickle.dumps(request_obj)
-            request_order = len(bin.requests) - 1
-            
-            # Insert the new request
-            cursor.execute("""
-                INSERT INTO requests (bin_name, request_data, request_order)
-                VALUES (%s, %s, %s)
-            """, (bin.name, request_data, request_order))
-            
-            # Update bin request count
-            cursor.execute("""
-                UPDATE bins SET request_count = request_count + 1
-                WHERE name = %s
-            """, (bin.name,))
-            
-            # Keep only the last MAX_REQUESTS
+            keep = int(config.MAX_REQUESTS)
             cursor.execute("""
-                DELETE FROM requests 
-                WHERE bin_name = %s 
-                AND request_order < (
-                    SELECT request_order 
-                    FROM requests 
-                    WHERE bin_name = %s 
-                    ORDER BY request_order DESC 
-                    LIMIT 1 OFFSET %s
-                )
-            """, (bin.name, bin.name, config.MAX_REQUESTS - 1))
-            
-            # Update global request counter
-            cursor.execute("""
-                UPDATE stats SET value = value + 1 WHERE key = 'total_requests'
-            """)
+                SELECT bin, first_order
+                FROM add_requests(%s::text[], %s::bytea[], %s::integer[], %s)
+            """, ([row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows], keep))
+            first_order = dict(cursor.fetchall())
+            
+            counts = []
+            for name, position in positions:
+                if name not in first_order:
+                    counts.append(None)
+                    continue
+                counts.append(min(first_order[name] + position + 1, keep))
             
             conn.commit()
             cursor.close()
+            return counts
         except Exception as e:
             if conn:
                 conn.rollback()
-            print(f"Error creating request: {e}")
+            print(f"Error creating requests: {e}")
             traceback.print_exc()
             raise
         finally:
@@ -258,9 +486,6 @@ class PostgreSQLStorage():
         conn = None
         
         try:
-            # Clean up expired bins first
-            self._cleanup_expired_bins()
-            
             conn = self._get_connection()
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
@@ -278,28 +503,19 @@ class PostgreSQLStorage():
                 cursor.close()
                 raise KeyError("Bin not found")
             
-            # Reconstruct the Bin object
-            bin = Bin()
-            bin.name = bin_data['name']
-            bin.created = bin_data['created_at'].timestamp()
-            bin.private = bin_data['private']
-            bin.color = (bin_data['color_r'], bin_data['color_g'], bin_data['color_b'])
-            bin.secret_key = bytes(bin_data['secret_key']) if bin_data['secret_key'] else None
-            bin.favicon_uri = bin_data['favicon_uri']
-            bin.owner_email = bin_data.get('owner_email')
-            # Note: request_count is a @property, calculated from len(bin.requests)
-            
+            bin = _load_bin(bin_data)
+
             # Get all requests for this bin
             cursor.execute("""
                 SELECT request_data
                 FROM requests
                 WHERE bin_name = %s
-                ORDER BY request_order DESC
+                ORDER BY id DESC
                 LIMIT %s
             """, (name, config.MAX_REQUESTS))
             
             requests = cursor.fetchall()
-            bin.requests = [pickle.loads(bytes(r['request_data'])) for r in requests]
+            bin.requests = [_load_request(r['request_data']) for r in requests]
             
             cursor.close()
             return bin
@@ -314,53 +530,151 @@ class PostgreSQLStorage():
             if conn:
                 self._put_connection(conn)
 
-    def get_bins_by_owner(self, owner_email):
-        """Retrieve all bins owned by a specific user"""
+    def lookup_bin_meta(self, name):
+        """Retrieve a bin by name without its requests
+
+        Reads the bins row alone. Its request_count counts every request
+        ever added; only the newest MAX_REQUESTS rows are kept.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT name, created_at, private, color_r, color_g, color_b,
+                           secret_key, favicon_uri, owner_email,
+                           LEAST(request_count, %s) AS request_count
+                    FROM bins
+                    WHERE name = %s AND expires_at > NOW()
+                """, (config.MAX_REQUESTS, name))
+                bin_data = cursor.fetchone()
+        except Exception as e:
+            print(f"Error looking up bin: {e}")
+            traceback.print_exc()
+            raise KeyError("Bin not found")
+        finally:
+            if conn:
+                self._put_connection(conn)
+        if not bin_data:
+            raise KeyError("Bin not found")
+        bin = _load_bin(bin_data)
+        bin.requests = []
+        bin.request_count = bin_data['request_count']
+        return bin
+
+    def get_requests(self, name, offset=0, limit=None):
+        """A page of a bin's requests, newest first
+
+        One statement: the lateral join yields no row for a missing bin and
+        a single NULL row for an empty one.
+        """
+        limit = config.MAX_REQUESTS if limit is None else limit
+        conn = None
+        try:
+            conn = self._get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT r.request_data
+                    FROM bins b
+                    LEFT JOIN LATERAL (
+                        SELECT request_data FROM requests
+                        WHERE bin_name = b.name
+                        ORDER BY id DESC
+                        LIMIT %s OFFSET %s
+                    ) r ON TRUE
+                    WHERE b.name = %s AND b.expires_at > NOW()
+                """, (limit, offset, name))
+                rows = cursor.fetchall()
+        except Exception as e:
+            print(f"Error reading requests: {e}")
+            traceback.print_exc()
+            raise KeyError("Bin not found")
+        finally:
+            if conn:
+                self._put_connection(conn)
+        if not rows:
+            raise KeyError("Bin not found")
+        return [_load_request(data) for data, in rows if data is not None]
+
+    def list_bins_by_owner(self, owner_email, limit=None, before=None):
+        """Summaries of a user's bins, most recent first
+
+        One query along idx_bins_owner_created that reads the bins rows
+        alone; ``before`` is the cursor of the last summary on the previous
+        page.
+        """
+        keyset, args = "", [config.MAX_REQUESTS, owner_email]
+        if before:
+            keyset = "AND (created_at, name) < (to_timestamp(%s)::timestamp, %s)"
+            args.extend(before)
+        args.append(limit)
+        conn = None
+        try:
+            conn = self._get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT name, color_r, color_g, color_b, private,
+                           LEAST(request_count, %s), created_at,
+                           COALESCE(last_request_at, created_at)
+                    FROM bins
+                    WHERE owner_email = %s AND expires_at > NOW() {}
+                    ORDER BY created_at DESC, name DESC
+                    LIMIT %s
+                """.format(keyset), args)
+                rows = cursor.fetchall()
+        except Exception as e:
+            print(f"Error listing bins by owner: {e}")
+            traceback.print_exc()
+            return []
+        finally:
+            if conn:
+                self._put_connection(conn)
+        return [BinSummary(name, (r, g, b), private, count, created.timestamp(), active.timestamp())
+                for name, r, g, b, private, count, created, active in rows]
+
+    def get_bins_by_owner(self, owner_email, limit=None):
+        """Retrieve bins owned by a specific user, most recent first, with
+        their requests
+
+        One query: the owner's bins joined laterally to each one's newest
+        requests. Listings that only need names and counts should use
+        list_bins_by_owner, which reads no requests at all.
+        """
         conn = None
         bins = []
         
         try:
-            # Clean up expired bins first
-            self._cleanup_expired_bins()
-            
             conn = self._get_connection()
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
-            # Get all bins for this owner that haven't expired
             cursor.execute("""
-                SELECT name, created_at, private, color_r, color_g, color_b,
-                       secret_key, favicon_uri, owner_email
-                FROM bins
-                WHERE owner_email = %s AND expires_at > NOW()
-                ORDER BY created_at DESC
-            """, (owner_email,))
-            
-            bin_rows = cursor.fetchall()
-            
-            for bin_data in bin_rows:
-                # Reconstruct each Bin object
-                bin = Bin()
-                bin.name = bin_data['name']
-                bin.created = bin_data['created_at'].timestamp()
-                bin.private = bin_data['private']
-                bin.color = (bin_data['color_r'], bin_data['color_g'], bin_data['color_b'])
-                bin.secret_key = bytes(bin_data['secret_key']) if bin_data['secret_key'] else None
-                bin.favicon_uri = bin_data['favicon_uri']
-                bin.owner_email = bin_data['owner_email']
-                
-                # Get requests for this bin (limit to recent ones for performance)
-                cursor.execute("""
-                    SELECT request_data
-                    FROM requests
-                    WHERE bin_name = %s
-                    ORDER BY request_order DESC
+                SELECT b.*, r.request_data
+                FROM (
+                    SELECT name, created_at, private, color_r, color_g, color_b,
+                           secret_key, favicon_uri, owner_email
+                    FROM bins
+                    WHERE owner_email = %s AND expires_at > NOW()
+                    ORDER BY created_at DESC, name DESC
                     LIMIT %s
-                """, (bin.name, config.MAX_REQUESTS))
-                
-                requests = cursor.fetchall()
-                bin.requests = [pickle.loads(bytes(r['request_data'])) for r in requests]
-                
-                bins.append(bin)
+                ) b
+                LEFT JOIN LATERAL (
+                    SELECT id, request_data FROM requests
+                    WHERE bin_name = b.name
+                    ORDER BY id DESC
+                    LIMIT %s
+                ) r ON TRUE
+                ORDER BY b.created_at DESC, b.name DESC, r.id DESC
+            """, (owner_email, limit, config.MAX_REQUESTS))
+            
+            requests = {}
+            for row in cursor.fetchall():
+                if row['name'] not in requests:
+                    bins.append(_load_bin(row))
+                    requests[row['name']] = []
+                if row['request_data'] is not None:
+                    requests[row['name']].append(_load_request(row['request_data']))
+            for bin in bins:
+                bin.requests = requests[bin.name]
             
             cursor.close()
             return bins
@@ -377,7 +691,6 @@ class PostgreSQLStorage():
         """Count total number of active bins"""
         conn = None
         try:
-            self._cleanup_expired_bins()
             conn = self._get_connection()
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM bins WHERE expires_at > NOW()")
@@ -428,6 +741,36 @@ class PostgreSQLStorage():
             if conn:
                 self._put_connection(conn)
 
+    def storage_stats(self):
+        """Reaper leadership and throughput for this worker, and the reaper
+        lag: how long the oldest expired bin has been waiting"""
+        conn = None
+        lag = None
+        try:
+            conn = self._get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT EXTRACT(EPOCH FROM NOW() - MIN(expires_at))
+                    FROM bins WHERE expires_at < NOW()
+                """)
+                lag = cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Error reading reaper lag: {e}")
+        finally:
+            if conn:
+                self._put_connection(conn)
+        return {
+            'reaper': {
+                'leader': self.reaper_leader,
+                'interval': self.reaper_interval,
+                'batch_size': self.reaper_batch,
+                'bins_deleted': self.reaped_bins,
+                'batches': self.reaper_batches,
+                'last_sweep': self.reaper_last_sweep,
+                'lag_seconds': float(lag) if lag is not None else 0,
+            },
+        }
+
     def __del__(self):
         """Cleanup connection pool on deletion"""
         if self.connection_pool:
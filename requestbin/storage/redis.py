@@ -1,110 +1,627 @@
 from __future__ import absolute_import
 
 import time
+import zlib
 import pickle
 import traceback
+import msgpack
 import redis
 import ssl
 
-from requestbin.models import Bin
+from requestbin.models import Bin, BinSummary, Request
 
 from requestbin import config
 
+# Append one packed request to a bin's capped list. Runs atomically, so
+# concurrent writers to one bin never overwrite each other; requests for a
+# bin that has expired (or never existed) are dropped and nil returned, and
+# -1 is returned for a bin still in the old single-string layout. The
+# write time is kept in the bin hash's 'last' field for owner listings.
+# KEYS: bin hash, request list, global request and byte counters
+# ARGV: packed request, MAX_REQUESTS, expiry (unix time), now (unix time)
+PUSH_REQUEST = """
+local kind = redis.call('TYPE', KEYS[1])['ok']
+if kind == 'none' then
+    return false
+elseif kind ~= 'hash' then
+    return -1
+end
+redis.call('LPUSH', KEYS[2], ARGV[1])
+redis.call('LTRIM', KEYS[2], 0, tonumber(ARGV[2]) - 1)
+redis.call('EXPIREAT', KEYS[2], ARGV[3])
+redis.call('HSET', KEYS[1], 'last', ARGV[4])
+redis.call('INCR', KEYS[3])
+redis.call('INCRBY', KEYS[4], string.len(ARGV[1]))
+return redis.call('LLEN', KEYS[2])
+"""
+
+
+# Streams variant of PUSH_REQUEST: XADD with approximate MAXLEN trimming,
+# and the same nil and -1 replies.
+# Each entry carries the packed request (r) and the bin's request count
+# after it (n), so tailing readers need no extra lookup.
+XADD_REQUEST = """
+-- Redis 5 refuses writes after the non-deterministic XADD * otherwise
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+local kind = redis.call('TYPE', KEYS[1])['ok']
+if kind == 'none' then
+    return false
+elseif kind ~= 'hash' then
+    return -1
+end
+local count = math.min(redis.call('XLEN', KEYS[2]) + 1, tonumber(ARGV[2]))
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], '*', 'r', ARGV[1], 'n', count)
+redis.call('EXPIREAT', KEYS[2], ARGV[3])
+redis.call('HSET', KEYS[1], 'last', ARGV[4])
+redis.call('INCR', KEYS[3])
+redis.call('INCRBY', KEYS[4], string.len(ARGV[1]))
+return count
+"""
+
+
+class MeteredConnectionPool(redis.BlockingConnectionPool):
+    """Blocking pool that records how long callers wait for a connection"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            connection = super().get_connection(*args, **kwargs)
+        except redis.ConnectionError:
+            if time.perf_counter() - started >= self.timeout:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        self.checkouts += 1
+        self.wait_time += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return connection
+
+    def release(self, connection):
+        self.in_use = max(self.in_use - 1, 0)
+        super().release(connection)
+
+    def stats(self):
+        return {
+            'max_connections': self.max_connections,
+            'in_use': self.in_use,
+            'peak_in_use': self.peak_in_use,
+            'saturation': self.in_use / self.max_connections,
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': self.wait_time / self.checkouts * 1000 if self.checkouts else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+
 class RedisStorage():
+    """Redis storage backend for RequestBin
+
+    Each bin is a hash holding its packed fields, plus a list of packed
+    requests, newest first and capped at MAX_REQUESTS. Capturing a request
+    costs one script call that pushes just that request. Bins written by
+    older releases as a single Bin.dump() string are still read, and are
+    converted on their first new request.
+
+    With REDIS_CLUSTER set, keys carry a hash tag for one of
+    REDIS_CLUSTER_SHARDS shards: a bin's keys share its shard's slot, and
+    the request and byte counters and the bin registry are kept per shard
+    and summed on read.
+    """
     prefix = config.REDIS_PREFIX
+    push_script = PUSH_REQUEST
+    cluster = config.REDIS_CLUSTER
+    cluster_shards = config.REDIS_CLUSTER_SHARDS
 
     def __init__(self, bin_ttl):
         self.bin_ttl = bin_ttl
-        
+        self.redis = self._connect()
+        # Standalone only; in a cluster each node has its own pool
+        self.pool = getattr(self.redis, 'connection_pool', None)
+        self._push_request = self.redis.register_script(self.push_script)
+
+    def _connect(self, **settings):
+        """A client on its own connection pool(s); keyword arguments
+        override the connection settings"""
         # Configure Redis connection with SSL support for SAP BTP
-        redis_kwargs = {
-            'host': config.REDIS_HOST,
-            'port': config.REDIS_PORT,
-            'db': config.REDIS_DB,
+        connection_kwargs = {
             'password': config.REDIS_PASSWORD,
             'decode_responses': False,  # Keep binary for pickle compatibility
-            'socket_connect_timeout': 30,
-            'socket_timeout': 30
+            'socket_connect_timeout': config.REDIS_CONNECT_TIMEOUT,
+            'socket_timeout': config.REDIS_SOCKET_TIMEOUT,
+            'socket_keepalive': True,
         }
+        connection_kwargs.update(settings)
+        ssl_kwargs = {}
         
         # Add SSL configuration if enabled
         if getattr(config, 'REDIS_SSL', False):
-            redis_kwargs['ssl'] = True
-            redis_kwargs['ssl_cert_reqs'] = getattr(config, 'REDIS_SSL_CERT_REQS', ssl.CERT_REQUIRED)
-            redis_kwargs['ssl_check_hostname'] = False  # SAP BTP Redis may not have matching hostname
-        
-        # Initialize Redis client
-        self.redis = redis.StrictRedis(**redis_kwargs)
+            ssl_kwargs['ssl_cert_reqs'] = getattr(config, 'REDIS_SSL_CERT_REQS', ssl.CERT_REQUIRED)
+            ssl_kwargs['ssl_check_hostname'] = False  # SAP BTP Redis may not have matching hostname
+
+        if self.cluster:
+            # Slots are discovered from the configured node; clusters have
+            # no numbered databases
+            if ssl_kwargs:
+                ssl_kwargs['ssl'] = True
+            return redis.RedisCluster(
+                host=config.REDIS_HOST, port=config.REDIS_PORT,
+                max_connections=config.REDIS_POOL_SIZE,
+                **connection_kwargs, **ssl_kwargs)
+
+        # Initialize Redis client. redis-py parses replies with hiredis
+        # when it is installed.
+        pool = MeteredConnectionPool(
+            max_connections=config.REDIS_POOL_SIZE,
+            timeout=config.REDIS_POOL_TIMEOUT,
+            connection_class=redis.SSLConnection if ssl_kwargs else redis.Connection,
+            host=config.REDIS_HOST, port=config.REDIS_PORT, db=config.REDIS_DB,
+            **connection_kwargs, **ssl_kwargs)
+        return redis.StrictRedis(connection_pool=pool)
+
+    def _tag(self, name):
+        """Hash tag shared by a bin's keys and its shard's counters
+
+        Empty on a single node. In a cluster a bin's keys all hash to its
+        shard's slot, so the per-bin script stays single-slot and can bump
+        that shard's counters too.
+        """
+        if not self.cluster:
+            return ''
+        return '{%d}' % (zlib.crc32(name.encode('utf-8')) % self.cluster_shards)
+
+    def _tags(self):
+        """Every shard's hash tag, for reads summed across shards"""
+        if not self.cluster:
+            return ['']
+        return ['{%d}' % shard for shard in range(self.cluster_shards)]
 
     def _key(self, name):
-        return '{}_{}'.format(self.prefix, name)
+        return '{}{}_{}'.format(self.prefix, self._tag(name), name)
 
-    def _request_count_key(self):
-        return '{}-requests'.format(self.prefix)
+    def _requests_key(self, name):
+        # Outside the '{prefix}_*' bin keyspace
+        return '{}{}-requests-{}'.format(self.prefix, self._tag(name), name)
+
+    def _request_count_key(self, tag=''):
+        return '{}{}-requests'.format(self.prefix, tag)
+
+    def _request_bytes_key(self, tag=''):
+        return '{}{}-request-bytes'.format(self.prefix, tag)
+
+    def _bins_key(self, tag=''):
+        # Registry of live bins: a sorted set of names scored by expiry
+        return '{}{}-bins'.format(self.prefix, tag)
+
+    def _owner_key(self, owner_email):
+        # Sorted set of bin names scored by created time. The '-' separator
+        # keeps it out of the '{prefix}_*' bin keyspace.
+        return '{}-owner-{}'.format(self.prefix, owner_email)
 
     def create_bin(self, private=False, custom_name=None, owner_email=None) -> Bin:
         bin = Bin(private, custom_name, owner_email)
         key = self._key(bin.name)
-        self.redis.set(key, bin.dump())
-        self.redis.expireat(key, int(bin.created+self.bin_ttl))
+        expires_at = int(bin.created+self.bin_ttl)
+        fields = {field: getattr(bin, field) for field in Bin.fields}
+        # A custom name may still belong to another owner's live bin
+        previous_owner = self._stored_owner(key) if custom_name else None
+        # The owner index is in another slot, so no MULTI on a cluster
+        pipe = self.redis.pipeline(transaction=not self.cluster)
+        # A custom name may be reused; start from an empty bin
+        pipe.delete(key, self._requests_key(bin.name))
+        if previous_owner and previous_owner != owner_email:
+            pipe.zrem(self._owner_key(previous_owner), bin.name)
+        pipe.hset(key, 'bin', msgpack.packb(fields, use_bin_type=True))
+        pipe.expireat(key, expires_at)
+        pipe.zadd(self._bins_key(self._tag(bin.name)), {bin.name: expires_at})
+        if owner_email:
+            # The index lives as long as the owner's newest bin
+            owner_key = self._owner_key(owner_email)
+            pipe.zadd(owner_key, {bin.name: bin.created})
+            pipe.expireat(owner_key, expires_at)
+        pipe.execute()
         return bin
 
+    def _stored_owner(self, key):
+        """owner_email of the bin stored at ``key``, if there is one"""
+        try:
+            data = self.redis.hget(key, 'bin')
+            return msgpack.unpackb(data).get('owner_email') if data else None
+        except redis.ResponseError:
+            # Stored by an older release as a Bin.dump() string
+            data = self.redis.get(key)
+            return Bin.load(data).owner_email if data else None
+
     def create_request(self, bin: Bin, request):
-        bin.add(request)
-        key = self._key(bin.name)
-        self.redis.set(key, bin.dump())
-        self.redis.expireat(key, int(bin.created+self.bin_ttl))
+        return self.create_requests([(bin, request)])[0]
+
+    def create_requests(self, items):
+        """Push a batch of (bin, request) pairs in one round trip
+
+        Returns each item's bin request count (None for bins that no longer
+        exist).
+        """
+        calls = []
+        now = time.time()
+        for bin, request in items:
+            if not isinstance(request, Request):
+                request = Request(request)
+            tag = self._tag(bin.name)
+            calls.append((
+                [self._key(bin.name), self._requests_key(bin.name),
+                 self._request_count_key(tag), self._request_bytes_key(tag)],
+                [request.dump(), config.MAX_REQUESTS, int(bin.created+self.bin_ttl), now]))
+        counts = self._push_requests(calls)
+        legacy = [i for i, count in enumerate(counts) if count == -1]
+        if legacy:
+            # Bins stored by an older release; convert them and retry
+            for name in {items[i][0].name for i in legacy}:
+                self._convert_bin(name)
+            for i, count in zip(legacy, self._push_requests([calls[i] for i in legacy])):
+                counts[i] = count
+        return counts
+
+    def _push_requests(self, calls):
+        # EVALSHA straight on the pipeline: redis-py's Script objects would
+        # add a SCRIPT EXISTS round trip to every batch
+        pipe = self.redis.pipeline(transaction=False)
+        for keys, args in calls:
+            pipe.evalsha(self._push_request.sha, len(keys), *keys, *args)
+        try:
+            return pipe.execute()
+        except redis.exceptions.NoScriptError:
+            # Server restarted or flushed its script cache; nothing ran
+            self.redis.script_load(self.push_script)
+            for keys, args in calls:
+                pipe.evalsha(self._push_request.sha, len(keys), *keys, *args)
+            return pipe.execute()
 
-        self.redis.setnx(self._request_count_key(), 0)
-        self.redis.incr(self._request_count_key())
+    def _convert_bin(self, name):
+        """Rewrite a bin stored as one Bin.dump() string in the hash and
+        list layout, adding it to the registry and its owner's index"""
+        key = self._key(name)
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                data, ttl = pipe.get(key), pipe.pttl(key)
+                if data is None:
+                    return
+                bin = Bin.load(data)
+                fields = {field: getattr(bin, field) for field in Bin.fields}
+                owner_key = self._owner_key(bin.owner_email) if bin.owner_email else None
+                owner_ttl = pipe.pttl(owner_key) if owner_key else None
+                pipe.multi()
+                pipe.delete(key)
+                pipe.hset(key, 'bin', msgpack.packb(fields, use_bin_type=True))
+                if bin.requests:
+                    self._store_requests(pipe, name, [r.dump() for r in bin.requests])
+                if ttl > 0:
+                    pipe.pexpire(key, ttl)
+                    pipe.pexpire(self._requests_key(name), ttl)
+                    pipe.zadd(self._bins_key(self._tag(name)), {name: int(time.time() + ttl / 1000)})
+                pipe.execute()
+                if owner_key and ttl > 0:
+                    # Older releases kept no owner index. It is in another
+                    # slot, so it is written after the transaction, and it
+                    # expires with the owner's newest bin.
+                    with self.redis.pipeline(transaction=False) as index:
+                        index.zadd(owner_key, {name: bin.created})
+                        if owner_ttl < ttl:
+                            index.expireat(owner_key, int(time.time() + ttl / 1000))
+                        index.execute()
+            except redis.WatchError:
+                # Another worker converted it first
+                pass
+
+    def _store_requests(self, pipe, name, packed):
+        # Newest first, as lookups read the list
+        pipe.rpush(self._requests_key(name), *packed)
+
+    def _load_bin(self, data, requests=()):
+        fields = msgpack.unpackb(data)
+        bin = Bin.__new__(Bin)
+        for field in Bin.fields:
+            setattr(bin, field, fields.get(field))
+        bin.color = tuple(bin.color) if bin.color else bin.color
+        bin.requests = [Request.load(r) for r in self._packed_requests(requests)]
+        return bin
 
     def count_bins(self):
-        keys = self.redis.keys("{}_*".format(self.prefix))
-        return len(keys)
+        pipe = self.redis.pipeline(transaction=False)
+        now = time.time()
+        for tag in self._tags():
+            # Expired bins leave the registry as they are counted
+            pipe.zremrangebyscore(self._bins_key(tag), '-inf', now)
+            pipe.zcard(self._bins_key(tag))
+        return sum(pipe.execute()[1::2])
+
+    def storage_stats(self):
+        """Connection pool usage and wait times for this worker"""
+        stats = {}
+        if self.pool is not None:
+            stats['pool'] = self.pool.stats()
+        else:
+            stats['cluster'] = {
+                'primaries': [node.name for node in self.redis.get_primaries()],
+                'shards': self.cluster_shards,
+            }
+        stats['hiredis'] = redis.utils.HIREDIS_AVAILABLE
+        return stats
+
+    def _sum_counters(self, *keys):
+        """Sum each counter over every shard"""
+        pipe = self.redis.pipeline(transaction=False)
+        for tag in self._tags():
+            for key in keys:
+                pipe.get(key(tag))
+        values = pipe.execute()
+        return [sum(int(value or 0) for value in values[i::len(keys)]) for i in range(len(keys))]
 
     def count_requests(self):
-        return int(self.redis.get(self._request_count_key()) or 0)
+        return self._sum_counters(self._request_count_key)[0]
 
     def avg_req_size(self):
-        info = self.redis.info()
-        return info['used_memory'] / info['db0']['keys'] / 1024
+        """Average packed request size in KB, from the write-time counters"""
+        requests, size = self._sum_counters(self._request_count_key, self._request_bytes_key)
+        if not requests or not size:
+            return 0
+        return size / requests / 1024
+
+    def _range_requests(self, pipe, name, offset=0, limit=None):
+        """Queue the read of a page of a bin's requests, newest first, on a
+        pipeline"""
+        limit = config.MAX_REQUESTS if limit is None else limit
+        pipe.lrange(self._requests_key(name), offset, offset + limit - 1)
+
+    def _packed_requests(self, reply, offset=0):
+        return reply
+
+    def _count_requests(self, pipe, name):
+        """Queue the read of a bin's request count on a pipeline"""
+        pipe.llen(self._requests_key(name))
+
+    def _read_bins(self, names):
+        """Fetch bins in one round trip; None for bins that are missing
+
+        On a cluster the pipeline is split by node and each node's commands
+        are sent together, so this is one round trip per node.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for name in names:
+            pipe.hget(self._key(name), 'bin')
+            self._range_requests(pipe, name)
+        replies = pipe.execute(raise_on_error=False)
+        bins = []
+        for name, data, requests in zip(names, replies[::2], replies[1::2]):
+            if isinstance(data, redis.ResponseError):
+                # Stored by an older release as a Bin.dump() string
+                data = self.redis.get(self._key(name))
+                bins.append(Bin.load(data) if data else None)
+            elif data is None:
+                bins.append(None)
+            else:
+                bins.append(self._load_bin(data, requests))
+        return bins
 
     def lookup_bin(self, name):
-        key = self._key(name)
-        serialized_bin = self.redis.get(key)
         try:
-            bin = Bin.load(serialized_bin)
-            return bin
-        except TypeError as e:
-            self.redis.delete(key) # clear bad data
+            bin = self._read_bins([name])[0]
+        except Exception as e:
+            traceback.print_exc()
+            raise KeyError("Bin not found")
+        if bin is None:
+            raise KeyError("Bin not found")
+        return bin
+
+    def lookup_bin_meta(self, name):
+        """Retrieve a bin and its request count without reading requests"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hget(self._key(name), 'bin')
+        self._count_requests(pipe, name)
+        try:
+            data, count = pipe.execute(raise_on_error=False)
+        except Exception as e:
+            traceback.print_exc()
+            raise KeyError("Bin not found")
+        if isinstance(data, redis.ResponseError):
+            # Stored by an older release; its requests are in the same string
+            return self.lookup_bin(name)
+        if data is None:
             raise KeyError("Bin not found")
+        bin = self._load_bin(data)
+        bin.request_count = min(count, config.MAX_REQUESTS)
+        return bin
+
+    def get_requests(self, name, offset=0, limit=None):
+        """A page of a bin's requests, newest first"""
+        limit = config.MAX_REQUESTS if limit is None else limit
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.type(self._key(name))
+        self._range_requests(pipe, name, offset, limit)
+        try:
+            kind, requests = pipe.execute()
         except Exception as e:
             traceback.print_exc()
             raise KeyError("Bin not found")
+        if kind == b'none':
+            raise KeyError("Bin not found")
+        if kind != b'hash':
+            return self.lookup_bin(name).requests[offset:offset + limit]
+        return [Request.load(r) for r in self._packed_requests(requests, offset)]
 
-    def get_bins_by_owner(self, owner_email):
-        """Retrieve all bins owned by a specific user"""
-        bins = []
+    def list_bins_by_owner(self, owner_email, limit=None, before=None):
+        """Summaries of a user's bins, most recent first
+
+        Reads each bin's hash and list (or stream) length, never its
+        requests. ``before`` is the cursor of the last summary on the
+        previous page.
+        """
         try:
-            # Get all bin keys
-            keys = self.redis.keys("{}_*".format(self.prefix))
-            
-            for key in keys:
-                try:
-                    serialized_bin = self.redis.get(key)
-                    if serialized_bin:
-                        bin = Bin.load(serialized_bin)
-                        # Filter by owner_email
-                        if hasattr(bin, 'owner_email') and bin.owner_email == owner_email:
-                            bins.append(bin)
-                except Exception as e:
-                    # Skip bins that can't be loaded
+            owner_key = self._owner_key(owner_email)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zremrangebyscore(owner_key, '-inf', time.time() - self.bin_ttl)
+            created = '{!r}'.format(before[0]) if before else '+inf'
+            # Members sharing the cursor's creation time, which may come
+            # before it in the range and are skipped below
+            pipe.zcount(owner_key, created, created)
+            ties = pipe.execute()[1] if before else 0
+            # Scores are creation times; equal scores come back by member
+            # name, descending, so the order is that of (created, name)
+            page = {} if limit is None else {'start': 0, 'num': limit + ties}
+            entries = self.redis.zrevrangebyscore(owner_key, created, '-inf',
+                                                  withscores=True, **page)
+            names = [name.decode() for name, score in entries]
+            if before:
+                names = [name for name, (_, score) in zip(names, entries)
+                         if score < before[0] or name < before[1]]
+            names = names[:limit]
+            if not names:
+                return []
+
+            pipe = self.redis.pipeline(transaction=False)
+            for name in names:
+                pipe.hmget(self._key(name), 'bin', 'last')
+                self._count_requests(pipe, name)
+            replies = pipe.execute(raise_on_error=False)
+            summaries, missing = [], []
+            for name, fields, count in zip(names, replies[::2], replies[1::2]):
+                if isinstance(fields, redis.ResponseError):
+                    # Stored by an older release as a Bin.dump() string
+                    data = self.redis.get(self._key(name))
+                    bin = Bin.load(data) if data else None
+                    if bin is not None and bin.owner_email == owner_email:
+                        summaries.append(BinSummary.of(bin))
                     continue
+                data, last = fields
+                bin = self._load_bin(data) if data is not None else None
+                if bin is None or bin.owner_email != owner_email:
+                    missing.append(name)
+                    continue
+                summaries.append(BinSummary(
+                    bin.name, bin.color, bin.private, min(count, config.MAX_REQUESTS),
+                    bin.created, float(last) if last is not None else None))
+            if missing:
+                # Bin was deleted before its TTL, or its name taken by
+                # another owner
+                self.redis.zrem(owner_key, *missing)
+            return summaries
+        except Exception as e:
+            print(f"Error listing bins by owner: {e}")
+            traceback.print_exc()
+            return []
+
+    def get_bins_by_owner(self, owner_email, limit=None):
+        """Retrieve bins owned by a specific user, most recent first"""
+        try:
+            owner_key = self._owner_key(owner_email)
+            end = -1 if limit is None else limit - 1
+            pipe = self.redis.pipeline(transaction=False)
+            # Drop index entries for bins past their TTL
+            pipe.zremrangebyscore(owner_key, '-inf', time.time() - self.bin_ttl)
+            pipe.zrevrange(owner_key, 0, end)
+            names = [name.decode() for name in pipe.execute()[1]]
+            if not names:
+                return []
             
-            # Sort by created time (most recent first)
-            bins.sort(key=lambda b: b.created, reverse=True)
-            return bins
+            bins = self._read_bins(names)
+            missing = [name for name, bin in zip(names, bins)
+                       if bin is None or bin.owner_email != owner_email]
+            if missing:
+                # Bin was deleted before its TTL, or its name taken by
+                # another owner
+                self.redis.zrem(owner_key, *missing)
+            return [bin for bin in bins if bin is not None and bin.owner_email == owner_email]
         except Exception as e:
             print(f"Error getting bins by owner: {e}")
             traceback.print_exc()
             return []
+
+
+class RedisStreamsStorage(RedisStorage):
+    """Redis storage backend keeping each bin's requests in a stream
+
+    Bins, the owner index, the registry and counters are as in
+    RedisStorage; requests are appended with XADD MAXLEN ~ MAX_REQUESTS.
+    Stream entry IDs are cursors: read_requests pages back through a bin
+    and tail_requests blocks until requests newer than a cursor arrive, so
+    readers in any worker see new requests without polling.
+    """
+    push_script = XADD_REQUEST
+    tail_timeout = config.REDIS_STREAM_TAIL_TIMEOUT
+
+    def __init__(self, bin_ttl):
+        super().__init__(bin_ttl)
+        self._tail_redis = None
+
+    def _requests_key(self, name):
+        return '{}{}-stream-{}'.format(self.prefix, self._tag(name), name)
+
+    def _range_requests(self, pipe, name, offset=0, limit=None):
+        # XREVRANGE can't skip entries; _packed_requests drops the first offset
+        limit = config.MAX_REQUESTS if limit is None else limit
+        pipe.xrevrange(self._requests_key(name), count=offset + limit)
+
+    def _packed_requests(self, reply, offset=0):
+        return [fields[b'r'] for _, fields in reply[offset:]]
+
+    def _store_requests(self, pipe, name, packed):
+        # Appended oldest first, with the count each entry would have had
+        for count, request in enumerate(reversed(packed), 1):
+            pipe.xadd(self._requests_key(name), {'r': request, 'n': count})
+
+    def _count_requests(self, pipe, name):
+        # MAXLEN ~ trims in whole nodes, so XLEN may run past MAX_REQUESTS
+        pipe.xlen(self._requests_key(name))
+
+    def _tail_client(self):
+        """Client for blocking reads, on its own pool so long waits never
+        hold connections needed for ingest, and without a socket timeout"""
+        if self._tail_redis is None:
+            self._tail_redis = self._connect(socket_timeout=None)
+        return self._tail_redis
+
+    def read_requests(self, name, before=None, count=None):
+        """Page through a bin's requests, newest first
+
+        Returns (cursor, Request) pairs; pass the last cursor as ``before``
+        to get the next page.
+        """
+        start = '+' if before is None else '(' + before
+        entries = self.redis.xrevrange(self._requests_key(name), start, '-',
+                                       count=count or config.MAX_REQUESTS)
+        return [(entry_id.decode(), Request.load(fields[b'r'])) for entry_id, fields in entries]
+
+    def last_cursor(self, name):
+        """Cursor of the bin's newest request ('0-0' when it has none)"""
+        entries = self.redis.xrevrange(self._requests_key(name), count=1)
+        return entries[0][0].decode() if entries else '0-0'
+
+    def tail_requests(self, name, after, timeout=None):
+        """Wait up to ``timeout`` seconds for requests newer than ``after``
+
+        Returns (cursor, request_count, requests): the newest cursor, the
+        bin's request count after it and the new requests, oldest first.
+        Nothing new returns ``after`` unchanged, a None count and [].
+        """
+        timeout = self.tail_timeout if timeout is None else timeout
+        reply = self._tail_client().xread({self._requests_key(name): after},
+                                          count=config.MAX_REQUESTS,
+                                          block=max(int(timeout * 1000), 1))
+        if not reply:
+            return after, None, []
+        entries = reply[0][1]
+        requests = [Request.load(fields[b'r']) for _, fields in entries]
+        last_id, fields = entries[-1]
+        return last_id.decode(), int(fields[b'n']), requests
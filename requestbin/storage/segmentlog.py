@@ -0,0 +1,368 @@
+import os
+import glob
+import mmap
+import time
+import zlib
+import heapq
+import bisect
+import struct
+import threading
+import traceback
+from collections import deque
+from itertools import islice
+
+import gevent
+import msgpack
+
+from requestbin.models import Bin, BinSummary, Request
+from requestbin.util import ulid
+
+from requestbin import config
+
+
+# Record: kind, bin name length, payload length, then the name and payload.
+# BIN payloads are the bin's fields as msgpack; REQUEST payloads are
+# Request.dump().
+BIN, REQUEST = 1, 2
+_record_header = struct.Struct('>BHI')
+
+
+class Segment(object):
+    """One append-only log file, read through a memory map"""
+    __slots__ = ('path', 'size', 'last_write', '_fd', '_map')
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644) if writable else None
+        self.size = os.path.getsize(path)
+        self.last_write = os.path.getmtime(path) if self.size else time.time()
+        self._map = None
+
+    @property
+    def writable(self):
+        return self._fd is not None
+
+    def append(self, kind, name, payload):
+        """Write one record; returns the payload's offset"""
+        header = _record_header.pack(kind, len(name), len(payload))
+        os.write(self._fd, b''.join((header, name, payload)))
+        offset = self.size + _record_header.size + len(name)
+        self.size += _record_header.size + len(name) + len(payload)
+        self.last_write = time.time()
+        return offset
+
+    def view(self, offset, length):
+        """A memoryview of the mapped bytes; release it when done"""
+        if self._map is None or len(self._map) < offset + length:
+            # The active segment outgrew its map; views still held on the
+            # old one keep it alive until they are released
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._map)[offset:offset + length]
+
+    def records(self):
+        """Yield (kind, name, offset, length) up to the first incomplete record"""
+        offset = 0
+        while offset + _record_header.size <= self.size:
+            with self.view(offset, _record_header.size) as header:
+                kind, name_length, length = _record_header.unpack(header)
+            start = offset + _record_header.size
+            if start + name_length + length > self.size:
+                break
+            with self.view(start, name_length) as name:
+                name = bytes(name).decode('utf-8')
+            yield kind, name, start + name_length, length
+            offset = start + name_length + length
+
+    def seal(self):
+        """Stop appending; the file is only read from now on"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def delete(self):
+        self.seal()
+        self._map = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class BinEntry(object):
+    """In-memory index of one bin: its fields and where its requests are"""
+    __slots__ = ('bin', 'records', 'last_request')
+
+    def __init__(self, bin):
+        self.bin = bin
+        # (segment, offset, length) of each request, oldest first
+        self.records = deque(maxlen=Bin.max_requests)
+        # Time of the newest request, decoded when the bin is listed and
+        # cleared by each write
+        self.last_request = None
+
+
+class SegmentLogStorage():
+    """Log-structured local storage for high-volume bins
+
+    Bins and requests are appended to segment files, spread over shard
+    directories by bin name, and only an offset index lives in memory.
+    lookup_bin decodes requests straight from memory-mapped segments.
+    Every record in a segment belongs to a bin created before the segment's
+    last write, so a segment is deleted as a whole file once that write is
+    older than the bin TTL. The index is rebuilt from the segments at
+    startup. Each process appends to its own segments, so workers do not
+    share bins, as with MemoryStorage.
+    """
+    path = config.SEGMENT_LOG_PATH
+    shards = config.SEGMENT_LOG_SHARDS
+    segment_bytes = config.SEGMENT_LOG_SEGMENT_BYTES
+    segment_seconds = config.SEGMENT_LOG_SEGMENT_SECONDS
+    cleanup_interval = config.CLEANUP_INTERVAL
+
+    def __init__(self, bin_ttl):
+        self.bin_ttl = bin_ttl
+        self.bins = {}
+        self.request_count = 0
+        # Min-heap of (expires_at, name), as in MemoryStorage
+        self._expiry = []
+        # owner_email -> [(created, name), ...] kept sorted oldest first
+        self._owners = {}
+        # All segments oldest first, and each shard's open segment
+        self._segments = []
+        self._active = {}
+        self._locks = [threading.Lock() for _ in range(self.shards)]
+        self._reaper = None
+        self._pid = os.getpid()
+        for shard in range(self.shards):
+            os.makedirs(self._shard_path(shard), exist_ok=True)
+        self._replay()
+
+    def _shard_path(self, shard):
+        return os.path.join(self.path, 'shard-%02d' % shard)
+
+    def _shard(self, name):
+        # Stable across processes, unlike hash()
+        return zlib.crc32(name.encode('utf-8')) % self.shards
+
+    def do_start(self):
+        """Start the expiry greenlet (once per process)"""
+        if self._reaper is None or self._reaper.dead:
+            self._reaper = gevent.spawn(self._cleanup_loop)
+
+    def _cleanup_loop(self):
+        while True:
+            gevent.sleep(min(self.cleanup_interval, self.segment_seconds))
+            try:
+                self._expire()
+            except Exception as e:
+                print(f"Error expiring segments: {e}")
+
+    def _expire(self, now=None):
+        """Drop expired bins from the index, then delete whole segments
+        whose last write is older than the TTL; returns segments deleted"""
+        now = time.time() if now is None else now
+        while self._expiry and self._expiry[0][0] <= now:
+            _, name = heapq.heappop(self._expiry)
+            entry = self.bins.get(name)
+            if entry is not None and entry.bin.created + self.bin_ttl <= now:
+                self._remove_bin(entry)
+        for shard, segment in list(self._active.items()):
+            if segment.size and segment.last_write + self.segment_seconds <= now:
+                self._roll(shard)
+        expired = [segment for segment in self._segments
+                   if not segment.writable and segment.last_write + self.bin_ttl <= now]
+        for segment in expired:
+            self._segments.remove(segment)
+            segment.delete()
+        return len(expired)
+
+    def _remove_bin(self, entry):
+        bin = entry.bin
+        if self.bins.get(bin.name) is entry:
+            del self.bins[bin.name]
+        owned = self._owners.get(bin.owner_email)
+        if owned:
+            i = bisect.bisect_left(owned, (bin.created, bin.name))
+            if i < len(owned) and owned[i] == (bin.created, bin.name):
+                del owned[i]
+            if not owned:
+                del self._owners[bin.owner_email]
+
+    def _index_bin(self, bin):
+        entry = self.bins.get(bin.name)
+        if entry is not None:
+            self._remove_bin(entry)
+        entry = self.bins[bin.name] = BinEntry(bin)
+        if bin.owner_email:
+            bisect.insort(self._owners.setdefault(bin.owner_email, []), (bin.created, bin.name))
+        heapq.heappush(self._expiry, (bin.created + self.bin_ttl, bin.name))
+        return entry
+
+    def _roll(self, shard):
+        """Seal the shard's open segment; the next write starts a new one"""
+        segment = self._active.pop(shard, None)
+        if segment is not None:
+            segment.seal()
+
+    def _append(self, name, kind, payload):
+        shard = self._shard(name)
+        with self._locks[shard]:
+            if self._pid != os.getpid():
+                # Forked: the parent's open segments are not ours to append to
+                self._active, self._pid = {}, os.getpid()
+            segment = self._active.get(shard)
+            if segment is not None and segment.size >= self.segment_bytes:
+                self._roll(shard)
+                segment = None
+            if segment is None:
+                # ULIDs sort by creation time and never repeat in a process
+                path = os.path.join(self._shard_path(shard), '%s-%d.log' % (ulid(), os.getpid()))
+                segment = self._active[shard] = Segment(path, writable=True)
+                self._segments.append(segment)
+            return segment, segment.append(kind, name.encode('utf-8'), payload)
+
+    def _replay(self):
+        """Rebuild the index from the segments on disk, oldest first"""
+        paths = glob.glob(os.path.join(self.path, 'shard-*', '*.log'))
+        # Segment names start with a ULID, so this is creation order
+        paths.sort(key=os.path.basename)
+        segments = [Segment(path) for path in paths]
+        now = time.time()
+        for segment in segments:
+            if segment.last_write + self.bin_ttl <= now:
+                segment.delete()
+                continue
+            self._segments.append(segment)
+            try:
+                for kind, name, offset, length in segment.records():
+                    if kind == BIN:
+                        with segment.view(offset, length) as data:
+                            fields = msgpack.unpackb(data)
+                        bin = Bin.__new__(Bin)
+                        for field in Bin.fields:
+                            setattr(bin, field, fields.get(field))
+                        bin.color = tuple(bin.color) if bin.color else bin.color
+                        bin.requests = []
+                        if bin.created + self.bin_ttl > now:
+                            self._index_bin(bin)
+                    elif kind == REQUEST and name in self.bins:
+                        self.bins[name].records.append((segment, offset, length))
+                        self.request_count += 1
+            except Exception as e:
+                print(f"Error replaying segment {segment.path}: {e}")
+                traceback.print_exc()
+
+    def create_bin(self, private=False, custom_name=None, owner_email=None) -> Bin:
+        self.do_start()
+        bin = Bin(private, custom_name, owner_email)
+        fields = {field: getattr(bin, field) for field in Bin.fields}
+        self._append(bin.name, BIN, msgpack.packb(fields, use_bin_type=True))
+        self._index_bin(bin)
+        return bin
+
+    def create_request(self, bin, request):
+        if not isinstance(request, Request):
+            request = Request(request)
+        entry = self.bins.get(bin.name)
+        if entry is None:
+            return None
+        payload = request.dump()
+        segment, offset = self._append(bin.name, REQUEST, payload)
+        entry.records.append((segment, offset, len(payload)))
+        entry.last_request = None
+        self.request_count += 1
+        return len(entry.records)
+
+    def _load_requests(self, entry, offset=0, limit=None):
+        """Decode a bin's requests, newest first, from the mapped segments"""
+        requests = []
+        stop = None if limit is None else offset + limit
+        for segment, position, length in islice(reversed(entry.records), offset, stop):
+            with segment.view(position, length) as data:
+                requests.append(Request.load(data))
+        return requests
+
+    def _load_bin(self, entry, requests=True):
+        bin = Bin.__new__(Bin)
+        for field in Bin.fields:
+            setattr(bin, field, getattr(entry.bin, field))
+        if requests:
+            bin.requests = self._load_requests(entry)
+        else:
+            bin.requests = []
+            bin.request_count = len(entry.records)
+        return bin
+
+    def count_bins(self):
+        self._expire()
+        return len(self.bins)
+
+    def count_requests(self):
+        return self.request_count
+
+    def avg_req_size(self):
+        return None
+
+    def storage_stats(self):
+        """Segment files and their bytes on disk"""
+        return {
+            'path': self.path,
+            'segments': len(self._segments),
+            'bytes_used': sum(segment.size for segment in self._segments),
+        }
+
+    def _entry(self, name):
+        entry = self.bins[name]
+        if entry.bin.created + self.bin_ttl <= time.time():
+            self._remove_bin(entry)
+            raise KeyError(name)
+        return entry
+
+    def lookup_bin(self, name) -> Bin:
+        return self._load_bin(self._entry(name))
+
+    def lookup_bin_meta(self, name) -> Bin:
+        """The bin and its request count, decoding no requests"""
+        return self._load_bin(self._entry(name), requests=False)
+
+    def get_requests(self, name, offset=0, limit=None):
+        """A page of the bin's requests, newest first"""
+        limit = config.MAX_REQUESTS if limit is None else limit
+        return self._load_requests(self._entry(name), offset, limit)
+
+    def list_bins_by_owner(self, owner_email, limit=None, before=None):
+        """Summaries of a user's bins, most recent first
+
+        ``before`` is the cursor of the last summary on the previous page.
+        A bin's newest request is decoded for its time at most once per write.
+        """
+        owned = self._owners.get(owner_email, ())
+        end = bisect.bisect_left(owned, tuple(before)) if before else len(owned)
+        summaries = []
+        now = time.time()
+        for created, name in reversed(owned[:end]):
+            entry = self.bins.get(name)
+            if entry is None or created + self.bin_ttl <= now:
+                continue
+            if entry.last_request is None and entry.records:
+                entry.last_request = self._load_requests(entry, 0, 1)[0].time
+            bin = entry.bin
+            summaries.append(BinSummary(bin.name, bin.color, bin.private, len(entry.records),
+                                        bin.created, entry.last_request))
+            if limit is not None and len(summaries) >= limit:
+                break
+        return summaries
+
+    def get_bins_by_owner(self, owner_email, limit=None):
+        """Retrieve bins owned by a specific user, most recent first"""
+        bins = []
+        now = time.time()
+        for created, name in reversed(self._owners.get(owner_email, ())):
+            entry = self.bins.get(name)
+            if entry is None or created + self.bin_ttl <= now:
+                continue
+            bins.append(self._load_bin(entry))
+            if limit is not None and len(bins) >= limit:
+                break
+        return bins
@@ -0,0 +1,485 @@
+"""
+Shared in-memory storage for every worker process on one host
+
+Each gunicorn worker running MemoryStorage has its own bins, so a request
+captured by one worker can't be seen from another. SharedMemoryStorage keeps
+the bins in a single local storage process instead, reached over a Unix
+socket (``SHARED_STORAGE_SOCKET``). That process holds a regular
+MemoryStorage, so expiry, ``MEMORY_BUDGET`` and ``MEMORY_SNAPSHOT_PATH``
+apply as usual, and bins survive worker recycles.
+
+The first worker that finds no server running starts one; an flock on
+``<socket>.lock`` makes sure only one is spawned. The server exits once no
+worker has been connected for ``SHARED_STORAGE_IDLE_TIMEOUT`` seconds.
+
+Workers keep an LRU cache of decoded bins. A lookup sends the cached bin's
+version and gets back only the requests added since, so a busy bin isn't
+deserialized in full on every page view.
+
+Frames on the socket are a 4-byte big-endian length followed by msgpack:
+``[method, args]`` from the client, ``[True, result]`` or
+``[False, error_type, message]`` from the server.
+"""
+
+import os
+import sys
+import time
+import fcntl
+import signal
+import struct
+import traceback
+import subprocess
+from collections import OrderedDict
+
+import gevent
+import msgpack
+from gevent import socket
+
+from requestbin.models import Bin, BinSummary, Request
+from requestbin.util import ulid
+
+from requestbin import config
+
+_frame_length = struct.Struct('>I')
+
+
+def _send_frame(sock, data):
+    sock.sendall(_frame_length.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    """``size`` bytes, or None if the peer closed before sending any"""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if not n:
+            if received:
+                raise ConnectionError("connection closed mid-frame")
+            return None
+        received += n
+    return bytes(buf)
+
+
+def _recv_frame(sock):
+    """The next frame, or None if the peer closed before sending any of it"""
+    head = _recv_exact(sock, _frame_length.size)
+    if head is None:
+        return None
+    size, = _frame_length.unpack(head)
+    data = _recv_exact(sock, size) if size else b''
+    if data is None:
+        raise ConnectionError("connection closed mid-frame")
+    return data
+
+
+class StorageServer(object):
+    """Serves a MemoryStorage to SharedMemoryStorage clients"""
+
+    def __init__(self, storage, idle_timeout=config.SHARED_STORAGE_IDLE_TIMEOUT):
+        self.storage = storage
+        self.idle_timeout = idle_timeout
+        # Changes whenever the server restarts, invalidating client caches
+        self.epoch = ulid()
+        # name -> number of requests ever added, the bin's version
+        self.versions = {}
+        storage.on_remove = self._forget
+        self.clients = 0
+        self.last_active = time.time()
+
+    def handle(self, sock, address):
+        self.clients += 1
+        try:
+            while True:
+                frame = _recv_frame(sock)
+                if frame is None:
+                    break
+                method, args = msgpack.unpackb(frame)
+                try:
+                    reply = [True, getattr(self, 'rpc_' + method)(*args)]
+                except KeyError as e:
+                    reply = [False, 'KeyError', str(e)]
+                except Exception as e:
+                    traceback.print_exc()
+                    reply = [False, type(e).__name__, str(e)]
+                _send_frame(sock, msgpack.packb(reply, use_bin_type=True))
+        except (OSError, ValueError) as e:
+            print(f"Storage client connection dropped: {e}")
+        finally:
+            self.clients -= 1
+            self.last_active = time.time()
+            sock.close()
+
+    def watch_idle(self, stream_server):
+        while True:
+            gevent.sleep(min(self.idle_timeout, 5))
+            if not self.clients and time.time() - self.last_active > self.idle_timeout:
+                print("Shared storage idle, shutting down")
+                stream_server.stop()
+                return
+
+    def _version(self, bin):
+        return self.versions.setdefault(bin.name, bin.request_count)
+
+    def _forget(self, bin):
+        self.versions.pop(bin.name, None)
+
+    def rpc_ping(self):
+        return self.epoch
+
+    def rpc_create_bin(self, private, custom_name, owner_email):
+        bin = self.storage.create_bin(private, custom_name, owner_email)
+        self.versions[bin.name] = 0
+        return [self.epoch, bin.dump(), 0]
+
+    def rpc_create_requests(self, items):
+        counts = []
+        for name, created, data in items:
+            bin = self.storage.bins.get(name)
+            if bin is None or bin.created != created:
+                counts.append(None)
+                continue
+            # Read before the write, which a derived version would count
+            version = self._version(bin)
+            counts.append(self.storage.create_request(bin, Request.load(data)))
+            if self.storage.bins.get(name) is bin:
+                self.versions[name] = version + 1
+        return counts
+
+    def rpc_lookup(self, epoch, items):
+        """Bins by name, as deltas against the versions the client holds
+
+        Each result is None (not found), ['same', version],
+        ['delta', version, [request dumps, newest first]] or
+        ['full', version, bin dump].
+        """
+        results = []
+        for name, created, version in items:
+            try:
+                bin = self.storage.lookup_bin(name)
+            except KeyError:
+                self.versions.pop(name, None)
+                results.append(None)
+                continue
+            current = self._version(bin)
+            added = current - version if version is not None else -1
+            if epoch != self.epoch or created != bin.created or added < 0 \
+                    or added > bin.request_count:
+                results.append(['full', current, bin.dump()])
+            elif added == 0:
+                results.append(['same', current])
+            else:
+                results.append(['delta', current, [r.dump() for r in bin.requests[0:added]]])
+        return [self.epoch, results]
+
+    def rpc_lookup_meta(self, name):
+        """A bin's fields and request count, without its requests"""
+        bin = self.storage.lookup_bin(name)
+        return [{field: getattr(bin, field) for field in Bin.fields}, bin.request_count]
+
+    def rpc_requests(self, name, offset, limit):
+        """Dumps of a page of a bin's requests, newest first"""
+        bin = self.storage.lookup_bin(name)
+        return [r.dump() for r in bin.requests[offset:offset + limit]]
+
+    def rpc_bins_by_owner(self, owner_email, limit):
+        return [bin.name for bin in self.storage.get_bins_by_owner(owner_email, limit)]
+
+    def rpc_list_bins_by_owner(self, owner_email, limit, before):
+        return [[summary.name, summary.color, summary.private, summary.request_count,
+                 summary.created, summary.last_activity]
+                for summary in self.storage.list_bins_by_owner(owner_email, limit, before)]
+
+    def rpc_count_bins(self):
+        return self.storage.count_bins()
+
+    def rpc_count_requests(self):
+        return self.storage.count_requests()
+
+    def rpc_avg_req_size(self):
+        return self.storage.avg_req_size()
+
+    def rpc_storage_stats(self):
+        stats = self.storage.storage_stats()
+        stats['clients'] = self.clients
+        return stats
+
+
+def serve(path=config.SHARED_STORAGE_SOCKET):
+    """Run the storage server on ``path`` until it goes idle"""
+    from gevent.server import StreamServer
+    from requestbin.database import db as storage
+
+    # Only one server per socket, even if two workers race to start it
+    lock = open(path + '.server.lock', 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        print(f"Shared storage already running on {path}")
+        return
+
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    os.chmod(path, 0o600)
+    listener.listen(128)
+
+    server = StorageServer(storage)
+    stream_server = StreamServer(listener, server.handle)
+    gevent.signal_handler(signal.SIGTERM, stream_server.stop)
+    gevent.spawn(server.watch_idle, stream_server)
+    print(f"Shared storage serving on {path} (pid {os.getpid()})")
+    try:
+        stream_server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        lock.close()
+
+
+class SharedMemoryStorage():
+    """Storage backend client for the shared storage process"""
+    socket_path = config.SHARED_STORAGE_SOCKET
+    cache_size = config.SHARED_STORAGE_CACHE_SIZE
+    timeout = config.SHARED_STORAGE_TIMEOUT
+
+    def __init__(self, bin_ttl):
+        self.bin_ttl = bin_ttl
+        self._pid = None
+        self._pool = []
+        self._server = None
+        # name -> (bin, version), least recently used first
+        self._cache = OrderedDict()
+        self._epoch = None
+        self.cache_hits = 0
+        self.cache_deltas = 0
+        self.cache_misses = 0
+
+    def _open(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _spawn_server(self):
+        package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env = dict(os.environ, STORAGE_BACKEND='requestbin.storage.memory.MemoryStorage')
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root, env.get('PYTHONPATH')]))
+        if self._server is not None:
+            self._server.poll()
+        self._server = subprocess.Popen(
+            [sys.executable, '-m', 'requestbin.storage.shared', self.socket_path],
+            env=env, stdin=subprocess.DEVNULL, start_new_session=True)
+
+    def _connect(self):
+        try:
+            return self._open()
+        except OSError:
+            pass
+        with open(self.socket_path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    return self._open()
+                except OSError:
+                    self._spawn_server()
+                deadline = time.time() + self.timeout
+                while True:
+                    try:
+                        return self._open()
+                    except OSError:
+                        if time.time() > deadline:
+                            raise
+                        gevent.sleep(0.05)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _call(self, method, *args):
+        if self._pid != os.getpid():
+            # Never share sockets or cached bins with a parent process
+            self._pid = os.getpid()
+            self._pool = []
+            self._cache.clear()
+        frame = msgpack.packb([method, args], use_bin_type=True)
+        while True:
+            pooled = bool(self._pool)
+            sock = self._pool.pop() if pooled else self._connect()
+            try:
+                _send_frame(sock, frame)
+            except OSError:
+                sock.close()
+                if pooled:
+                    # Server restarted since this socket was opened
+                    self._pool = []
+                    continue
+                raise
+            try:
+                reply = _recv_frame(sock)
+            except OSError:
+                # A timeout, or a reset part way through the reply: the
+                # server may have applied the call, so it is never resent
+                sock.close()
+                raise
+            if reply is None:
+                sock.close()
+                if pooled:
+                    # Closed without a byte of reply, as the sockets of a
+                    # restarted server are
+                    self._pool = []
+                    continue
+                raise ConnectionError("shared storage closed the connection")
+            self._pool.append(sock)
+            break
+        reply = msgpack.unpackb(reply)
+        if reply[0]:
+            return reply[1]
+        if reply[1] == 'KeyError':
+            raise KeyError(reply[2])
+        raise RuntimeError("Shared storage {} failed: {}: {}".format(method, reply[1], reply[2]))
+
+    def _set_epoch(self, epoch):
+        if epoch != self._epoch:
+            self._cache.clear()
+            self._epoch = epoch
+
+    def _cache_bin(self, bin, version):
+        self._cache[bin.name] = (bin, version)
+        self._cache.move_to_end(bin.name)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _lookup(self, names):
+        """Bins for names (None where missing), refreshed from the server"""
+        sent = [self._cache.get(name) for name in names]
+        items = [(name, cached[0].created, cached[1]) if cached else (name, None, None)
+                 for name, cached in zip(names, sent)]
+        epoch, results = self._call('lookup', self._epoch, items)
+        if epoch != self._epoch:
+            self._set_epoch(epoch)
+            sent = [None] * len(names)
+
+        bins = []
+        for name, cached, result in zip(names, sent, results):
+            if result is None:
+                self._cache.pop(name, None)
+                bins.append(None)
+                continue
+            kind, version = result[0], result[1]
+            current = self._cache.get(name)
+            if kind == 'full':
+                self.cache_misses += 1
+                bin = Bin.load(result[2])
+            elif current is not None and cached is not None and current[0] is cached[0]:
+                # Another greenlet may have applied part of this delta already
+                bin = current[0]
+                if kind == 'same':
+                    self.cache_hits += 1
+                else:
+                    self.cache_deltas += 1
+                    missing = version - current[1]
+                    for data in reversed(result[2][:max(missing, 0)]):
+                        bin.add(Request.load(data))
+                version = max(version, current[1])
+            else:
+                # Cache entry replaced meanwhile; fetch this one in full
+                self._cache.pop(name, None)
+                bins.extend(self._lookup([name]))
+                continue
+            self._cache_bin(bin, version)
+            bins.append(bin)
+        return bins
+
+    def create_bin(self, private=False, custom_name=None, owner_email=None) -> Bin:
+        epoch, data, version = self._call('create_bin', private, custom_name, owner_email)
+        self._set_epoch(epoch)
+        bin = Bin.load(data)
+        self._cache_bin(bin, version)
+        return bin
+
+    def create_request(self, bin, request):
+        return self.create_requests([(bin, request)])[0]
+
+    def create_requests(self, items):
+        """Send a batch of (bin, request) pairs in one round trip
+
+        Returns each item's bin request count (None for bins that no longer
+        exist). Cached bins pick the requests up on their next lookup.
+        """
+        payload = []
+        for bin, request in items:
+            if not isinstance(request, Request):
+                request = Request(request)
+            payload.append((bin.name, bin.created, request.dump()))
+        return self._call('create_requests', payload)
+
+    def lookup_bin(self, name) -> Bin:
+        bin = self._lookup([name])[0]
+        if bin is None:
+            raise KeyError("Bin not found")
+        return bin
+
+    def lookup_bin_meta(self, name) -> Bin:
+        """The bin and its request count; no requests are sent or cached"""
+        fields, count = self._call('lookup_meta', name)
+        bin = Bin.__new__(Bin)
+        for field in Bin.fields:
+            setattr(bin, field, fields.get(field))
+        bin.color = tuple(bin.color) if bin.color else bin.color
+        bin.requests = []
+        bin.request_count = count
+        return bin
+
+    def get_requests(self, name, offset=0, limit=None):
+        """A page of a bin's requests, newest first"""
+        limit = config.MAX_REQUESTS if limit is None else limit
+        return [Request.load(data) for data in self._call('requests', name, offset, limit)]
+
+    def get_bins_by_owner(self, owner_email, limit=None):
+        """Retrieve bins owned by a specific user, most recent first"""
+        try:
+            names = self._call('bins_by_owner', owner_email, limit)
+            return [bin for bin in self._lookup(names) if bin is not None] if names else []
+        except Exception as e:
+            print(f"Error getting bins by owner: {e}")
+            return []
+
+    def list_bins_by_owner(self, owner_email, limit=None, before=None):
+        """Summaries of a user's bins, most recent first, in one round trip
+
+        ``before`` is the cursor of the last summary on the previous page.
+        """
+        try:
+            return [BinSummary(*fields) for fields in
+                    self._call('list_bins_by_owner', owner_email, limit, before)]
+        except Exception as e:
+            print(f"Error listing bins by owner: {e}")
+            return []
+
+    def count_bins(self):
+        return self._call('count_bins')
+
+    def count_requests(self):
+        return self._call('count_requests')
+
+    def avg_req_size(self):
+        return self._call('avg_req_size')
+
+    def storage_stats(self):
+        stats = self._call('storage_stats')
+        stats['client_cache'] = {
+            'bins': len(self._cache),
+            'hits': self.cache_hits,
+            'deltas': self.cache_deltas,
+            'misses': self.cache_misses,
+        }
+        return stats
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1] if len(sys.argv) > 1 else config.SHARED_STORAGE_SOCKET)
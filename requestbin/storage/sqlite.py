@@ -0,0 +1,458 @@
+from __future__ import absolute_import
+
+import os
+import time
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+from itertools import groupby
+
+import gevent
+import msgpack
+
+from requestbin.models import Bin, BinSummary, Request
+
+from requestbin import config
+
+
+# Statements are module constants so every call reuses the connection's
+# prepared statement cache instead of re-parsing the SQL
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS bins (
+        name TEXT PRIMARY KEY,
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        private INTEGER NOT NULL DEFAULT 0,
+        color_r INTEGER,
+        color_g INTEGER,
+        color_b INTEGER,
+        secret_key BLOB,
+        favicon_uri TEXT,
+        owner_email TEXT,
+        request_count INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_bins_expires_at ON bins(expires_at);
+    -- Serves owner listings newest first, name breaking ties
+    CREATE INDEX IF NOT EXISTS idx_bins_owner ON bins(owner_email, created_at, name);
+    DROP INDEX IF EXISTS idx_bins_owner_email;
+
+    -- Request metadata (Request.dump() without the body), clustered by bin
+    CREATE TABLE IF NOT EXISTS requests (
+        bin_name TEXT NOT NULL REFERENCES bins(name) ON DELETE CASCADE,
+        request_order INTEGER NOT NULL,
+        meta BLOB NOT NULL,
+        PRIMARY KEY (bin_name, request_order)
+    ) WITHOUT ROWID;
+
+    -- Bodies live apart so listing bins never pages them in
+    CREATE TABLE IF NOT EXISTS payloads (
+        bin_name TEXT NOT NULL,
+        request_order INTEGER NOT NULL,
+        body BLOB NOT NULL,
+        PRIMARY KEY (bin_name, request_order),
+        FOREIGN KEY (bin_name, request_order)
+            REFERENCES requests(bin_name, request_order) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS stats (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO stats (key, value) VALUES ('total_requests', 0);
+"""
+
+BIN_COLUMNS = ("name, created_at, private, color_r, color_g, color_b, "
+               "secret_key, favicon_uri, owner_email")
+
+INSERT_BIN = """
+    INSERT INTO bins (name, created_at, expires_at, private, color_r, color_g,
+                      color_b, secret_key, favicon_uri, owner_email)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+BUMP_REQUEST_COUNT = """
+    UPDATE bins SET request_count = request_count + ?
+    WHERE name = ? AND expires_at > ?
+"""
+SELECT_REQUEST_COUNT = "SELECT request_count FROM bins WHERE name = ?"
+INSERT_REQUEST = "INSERT INTO requests (bin_name, request_order, meta) VALUES (?, ?, ?)"
+INSERT_PAYLOAD = "INSERT INTO payloads (bin_name, request_order, body) VALUES (?, ?, ?)"
+TRIM_REQUESTS = "DELETE FROM requests WHERE bin_name = ? AND request_order < ?"
+ADD_TOTAL_REQUESTS = "UPDATE stats SET value = value + ? WHERE key = 'total_requests'"
+SELECT_BIN = "SELECT " + BIN_COLUMNS + " FROM bins WHERE name = ? AND expires_at > ?"
+SELECT_BIN_META = ("SELECT " + BIN_COLUMNS + ", request_count "
+                   "FROM bins WHERE name = ? AND expires_at > ?")
+SELECT_BIN_LIVE = "SELECT 1 FROM bins WHERE name = ? AND expires_at > ?"
+SELECT_REQUESTS = """
+    SELECT r.meta, p.body
+    FROM requests r JOIN payloads p USING (bin_name, request_order)
+    WHERE r.bin_name = ?
+    ORDER BY r.request_order DESC
+    LIMIT ? OFFSET ?
+"""
+# The owner's newest bins, each followed by its requests newest first; a
+# bin without requests comes back as one row with a NULL meta
+SELECT_OWNER_BINS = """
+    SELECT b.*, r.meta, p.body
+    FROM (SELECT {} FROM bins
+          WHERE owner_email = ? AND expires_at > ?
+          ORDER BY created_at DESC, name DESC LIMIT ?) b
+    LEFT JOIN requests r ON r.bin_name = b.name
+    LEFT JOIN payloads p USING (bin_name, request_order)
+    ORDER BY b.created_at DESC, b.name DESC, r.request_order DESC
+""".format(BIN_COLUMNS)
+# The newest request's metadata gives the last activity; no bodies are read
+OWNER_SUMMARIES = """
+    SELECT name, color_r, color_g, color_b, private, MIN(request_count, ?), created_at,
+           (SELECT meta FROM requests WHERE bin_name = bins.name
+            ORDER BY request_order DESC LIMIT 1)
+    FROM bins
+    WHERE owner_email = ? AND expires_at > ? {}
+    ORDER BY created_at DESC, name DESC
+    LIMIT ?
+"""
+SELECT_OWNER_SUMMARIES = OWNER_SUMMARIES.format("")
+SELECT_OWNER_SUMMARIES_BEFORE = OWNER_SUMMARIES.format("AND (created_at, name) < (?, ?)")
+DELETE_EXPIRED_BINS = "DELETE FROM bins WHERE expires_at <= ?"
+DELETE_EXPIRED_BIN = "DELETE FROM bins WHERE name = ? AND expires_at <= ?"
+
+
+def _split_request(request):
+    """Serialize a Request as (metadata, body)"""
+    state = request.__getstate__()
+    body = state.pop('body') or b''
+    return msgpack.packb(state, use_bin_type=True), body
+
+
+def _load_request(meta, body=b''):
+    request = Request.load(meta)
+    request.body = bytes(body)
+    return request
+
+
+def _load_bin(row):
+    bin = Bin.__new__(Bin)
+    (bin.name, bin.created, private, r, g, b,
+     secret_key, bin.favicon_uri, bin.owner_email) = row
+    bin.private = bool(private)
+    bin.color = (r, g, b)
+    bin.secret_key = bytes(secret_key) if secret_key else None
+    return bin
+
+
+class SQLiteStorage():
+    """Embedded SQLite storage backend for RequestBin
+
+    Every worker on the host opens the same database file in WAL mode, so
+    readers never block the writer and bins survive restarts with no extra
+    service to run. Request metadata and bodies are kept in separate tables:
+    lookup_bin joins them, get_bins_by_owner reads metadata only and
+    lookup_bin_meta reads the bins row alone.
+    """
+    path = config.SQLITE_PATH
+    busy_timeout = config.SQLITE_BUSY_TIMEOUT
+    cleanup_interval = config.CLEANUP_INTERVAL
+
+    def __init__(self, bin_ttl):
+        self.bin_ttl = bin_ttl
+        self._conn = None
+        self._pid = None
+        self._reaper = None
+        # One connection per process; greenlets and threads take turns on it
+        self._lock = threading.RLock()
+        self._create_tables()
+
+    def _connection(self):
+        """The process's connection, reopened after a fork"""
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False,
+                                   cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Durable across application crashes; a power loss can only drop
+            # the last transactions, never corrupt the file
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @contextmanager
+    def _transaction(self, write=False):
+        """Run statements in one transaction on the process's connection
+
+        Writers take the database lock up front (BEGIN IMMEDIATE) so two
+        processes never deadlock upgrading a read lock; readers get a
+        consistent snapshot of bins and their requests.
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.execute("COMMIT")
+
+    def _create_tables(self):
+        """Create necessary database tables if they don't exist"""
+        try:
+            with self._lock:
+                self._connection().executescript(SCHEMA)
+        except Exception as e:
+            print(f"Error creating tables: {e}")
+            traceback.print_exc()
+            raise
+
+    def do_start(self):
+        """Start the expiry greenlet (once per process)"""
+        if self._reaper is None or self._reaper.dead or self._pid != os.getpid():
+            self._reaper = gevent.spawn(self._cleanup_loop)
+
+    def _cleanup_loop(self):
+        while True:
+            gevent.sleep(self.cleanup_interval)
+            try:
+                self._cleanup_expired_bins()
+            except Exception as e:
+                print(f"Error expiring bins: {e}")
+
+    def _cleanup_expired_bins(self, now=None):
+        """Remove expired bins (and by cascade their requests); reads already
+        skip them, so this only reclaims space"""
+        with self._transaction(write=True) as conn:
+            return conn.execute(DELETE_EXPIRED_BINS,
+                                (time.time() if now is None else now,)).rowcount
+
+    def create_bin(self, private=False, custom_name=None, owner_email=None) -> Bin:
+        """Create a new bin"""
+        self.do_start()
+        bin = Bin(private, custom_name, owner_email)
+        try:
+            with self._transaction(write=True) as conn:
+                if custom_name:
+                    # An expired bin may still hold the name until the
+                    # cleanup reaches it; its requests go with it
+                    conn.execute(DELETE_EXPIRED_BIN, (bin.name, time.time()))
+                conn.execute(INSERT_BIN, (
+                    bin.name,
+                    bin.created,
+                    bin.created + self.bin_ttl,
+                    bin.private,
+                    bin.color[0],
+                    bin.color[1],
+                    bin.color[2],
+                    bin.secret_key,
+                    bin.favicon_uri,
+                    owner_email
+                ))
+            return bin
+        except Exception as e:
+            print(f"Error creating bin: {e}")
+            traceback.print_exc()
+            raise
+
+    def create_request(self, bin: Bin, request):
+        """Add a request to a bin"""
+        return self.create_requests([(bin, request)])[0]
+
+    def create_requests(self, items):
+        """Add a batch of (bin, request) pairs in one transaction
+
+        Metadata and payload rows go in with one executemany each; the
+        request_count bump and the MAX_REQUESTS trim run once per bin for the
+        whole batch. Returns each item's bin request count (None for bins
+        that no longer exist).
+        """
+        requests = []
+        added = {}
+        for bin, request in items:
+            if not isinstance(request, Request):
+                request = Request(request)
+            requests.append((bin.name, _split_request(request)))
+            added[bin.name] = added.get(bin.name, 0) + 1
+
+        try:
+            with self._transaction(write=True) as conn:
+                # The write lock is held, so each bin's block of
+                # request_order values is ours alone
+                now = time.time()
+                totals = {}
+                for name, count in added.items():
+                    if conn.execute(BUMP_REQUEST_COUNT, (count, name, now)).rowcount:
+                        totals[name] = conn.execute(SELECT_REQUEST_COUNT, (name,)).fetchone()[0]
+
+                next_order = {name: totals[name] - added[name] for name in totals}
+                metas, bodies, counts = [], [], []
+                for name, (meta, body) in requests:
+                    if name not in totals:
+                        counts.append(None)
+                        continue
+                    order = next_order[name]
+                    next_order[name] += 1
+                    metas.append((name, order, meta))
+                    bodies.append((name, order, body))
+                    counts.append(min(order + 1, config.MAX_REQUESTS))
+
+                if metas:
+                    conn.executemany(INSERT_REQUEST, metas)
+                    conn.executemany(INSERT_PAYLOAD, bodies)
+                    # Keep only the last MAX_REQUESTS of each bin touched
+                    conn.executemany(TRIM_REQUESTS, [
+                        (name, total - config.MAX_REQUESTS) for name, total in totals.items()
+                        if total > config.MAX_REQUESTS])
+                    conn.execute(ADD_TOTAL_REQUESTS, (len(metas),))
+            return counts
+        except Exception as e:
+            print(f"Error creating requests: {e}")
+            traceback.print_exc()
+            raise
+
+    def lookup_bin(self, name):
+        """Retrieve a bin by name with all its requests"""
+        try:
+            with self._transaction() as conn:
+                row = conn.execute(SELECT_BIN, (name, time.time())).fetchone()
+                if row is None:
+                    raise KeyError("Bin not found")
+                bin = _load_bin(row)
+                bin.requests = [_load_request(meta, body) for meta, body in
+                                conn.execute(SELECT_REQUESTS, (name, config.MAX_REQUESTS, 0))]
+            return bin
+        except KeyError:
+            raise
+        except Exception as e:
+            print(f"Error looking up bin: {e}")
+            traceback.print_exc()
+            raise KeyError("Bin not found")
+
+    def lookup_bin_meta(self, name):
+        """Retrieve a bin by name without its requests
+
+        request_count comes from the bins row, which counts every request
+        ever added; only the newest MAX_REQUESTS are kept.
+        """
+        try:
+            with self._transaction() as conn:
+                row = conn.execute(SELECT_BIN_META, (name, time.time())).fetchone()
+        except Exception as e:
+            print(f"Error looking up bin: {e}")
+            traceback.print_exc()
+            raise KeyError("Bin not found")
+        if row is None:
+            raise KeyError("Bin not found")
+        bin = _load_bin(row[:-1])
+        bin.requests = []
+        bin.request_count = min(row[-1], config.MAX_REQUESTS)
+        return bin
+
+    def get_requests(self, name, offset=0, limit=None):
+        """A page of a bin's requests, newest first"""
+        limit = config.MAX_REQUESTS if limit is None else limit
+        try:
+            with self._transaction() as conn:
+                if conn.execute(SELECT_BIN_LIVE, (name, time.time())).fetchone() is None:
+                    raise KeyError("Bin not found")
+                return [_load_request(meta, body) for meta, body in
+                        conn.execute(SELECT_REQUESTS, (name, limit, offset))]
+        except KeyError:
+            raise
+        except Exception as e:
+            print(f"Error reading requests: {e}")
+            traceback.print_exc()
+            raise KeyError("Bin not found")
+
+    def get_bins_by_owner(self, owner_email, limit=None):
+        """Retrieve bins owned by a specific user, most recent first, with
+        their requests
+
+        One query joins the bins to their requests and payloads. Listings
+        that only need names and counts should use list_bins_by_owner.
+        """
+        try:
+            with self._transaction() as conn:
+                rows = conn.execute(SELECT_OWNER_BINS, (owner_email, time.time(),
+                                                        -1 if limit is None else limit))
+                bins = []
+                for _, group in groupby(rows, key=lambda row: row[0]):
+                    group = list(group)
+                    bin = _load_bin(group[0][:-2])
+                    bin.requests = [_load_request(meta, body) for *_, meta, body in group
+                                    if meta is not None]
+                    bins.append(bin)
+            return bins
+        except Exception as e:
+            print(f"Error getting bins by owner: {e}")
+            traceback.print_exc()
+            return []
+
+    def list_bins_by_owner(self, owner_email, limit=None, before=None):
+        """Summaries of a user's bins, most recent first, in one query
+
+        ``before`` is the cursor of the last summary on the previous page.
+        """
+        args = [config.MAX_REQUESTS, owner_email, time.time()]
+        if before:
+            args.extend(before)
+        args.append(-1 if limit is None else limit)
+        try:
+            with self._transaction() as conn:
+                rows = conn.execute(SELECT_OWNER_SUMMARIES_BEFORE if before
+                                    else SELECT_OWNER_SUMMARIES, args).fetchall()
+        except Exception as e:
+            print(f"Error listing bins by owner: {e}")
+            traceback.print_exc()
+            return []
+        return [BinSummary(name, (r, g, b), private, count, created,
+                           Request.load(meta).time if meta else None)
+                for name, r, g, b, private, count, created, meta in rows]
+
+    def count_bins(self):
+        """Count total number of active bins"""
+        try:
+            with self._transaction() as conn:
+                return conn.execute("SELECT COUNT(*) FROM bins WHERE expires_at > ?",
+                                    (time.time(),)).fetchone()[0]
+        except Exception as e:
+            print(f"Error counting bins: {e}")
+            return 0
+
+    def count_requests(self):
+        """Count total number of requests"""
+        try:
+            with self._transaction() as conn:
+                row = conn.execute("SELECT value FROM stats WHERE key = 'total_requests'").fetchone()
+            return int(row[0]) if row else 0
+        except Exception as e:
+            print(f"Error counting requests: {e}")
+            return 0
+
+    def avg_req_size(self):
+        """Calculate average request size in KB"""
+        try:
+            with self._transaction() as conn:
+                row = conn.execute("""
+                    SELECT AVG(LENGTH(r.meta) + LENGTH(p.body)) / 1024.0
+                    FROM requests r JOIN payloads p USING (bin_name, request_order)
+                """).fetchone()
+            return row[0] if row and row[0] else 0
+        except Exception as e:
+            print(f"Error calculating average request size: {e}")
+            return 0
+
+    def storage_stats(self):
+        """Database file size and page usage"""
+        with self._transaction() as conn:
+            page_size, = conn.execute("PRAGMA page_size").fetchone()
+            pages, = conn.execute("PRAGMA page_count").fetchone()
+            free, = conn.execute("PRAGMA freelist_count").fetchone()
+        return {
+            'path': self.path,
+            'bytes_used': (pages - free) * page_size,
+            'file_bytes': pages * page_size,
+        }
+
+    def __del__(self):
+        """Close the database connection on deletion"""
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
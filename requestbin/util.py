@@ -1,6 +1,8 @@
+import os
 import time
 import random
 import base64
+import threading
 
 def random_byte(gradient=None, floor=0):
     factor = gradient or 1
@@ -14,11 +16,39 @@ def solid16x16gif_datauri(r,g,b):
 def random_color():
     return random_byte(10, 5), random_byte(10, 5), random_byte(10, 5)
 
-def baseN(num,b,numerals="0123456789abcdefghijklmnopqrstuvwxyz"): 
-    return ((num == 0) and  "0" ) or (baseN(num // b, b).lstrip("0") + numerals[num % b])
+# Crockford base32, lowercase: sorts in the same order as the encoded value
+ID_ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+ID_TIME_CHARS = 10
+# Two characters per lookup halves the encoding loop
+_ID_PAIRS = [a + b for a in ID_ALPHABET for b in ID_ALPHABET]
 
-def tinyid(size=6):
-    id = '%s%s' % (
-        baseN(abs(hash(time.time())), 36), 
-        baseN(abs(hash(time.time())), 36))
-    return id[0:size]
+_id_lock = threading.Lock()
+_id_state = {}
+
+def ulid(size=26):
+    """Time-ordered, k-sortable ID (ULID layout in lowercase Crockford base32)
+
+    The first 10 characters are the millisecond timestamp and the rest are
+    random. IDs of the same size made by this process never repeat and sort
+    in creation order: within one millisecond the random part is incremented
+    instead of drawn again.
+    """
+    bits = 5 * (size - ID_TIME_CHARS)
+    with _id_lock:
+        now = int(time.time() * 1000)
+        last, rand = _id_state.get(size, (0, 0))
+        if now <= last:
+            # Same millisecond (or the clock stepped back)
+            now, rand = last, rand + 1
+            if rand >> bits:
+                now, rand = now + 1, 0
+        else:
+            rand = int.from_bytes(os.urandom(10), 'big') >> (80 - bits)
+        _id_state[size] = (now, rand)
+    value = (now << bits) | rand
+    even = size - size % 2
+    id = ''.join([_ID_PAIRS[(value >> shift) & 1023]
+                  for shift in range(5 * even - 10, -1, -10)])
+    if size % 2:
+        id = ID_ALPHABET[(value >> 5 * even) & 31] + id
+    return id
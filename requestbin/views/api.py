@@ -5,6 +5,7 @@ from flask import session, make_response, request, render_template
 from flask_login import current_user, login_required
 from requestbin import app
 from requestbin.database import db
+from requestbin.views.main import ingest_queue
 
 class BytesEncoder(json.JSONEncoder):
     def default(self, o):
@@ -44,7 +45,7 @@ def bins():
 @app.endpoint('api.bin')
 def bin(name):
     try:
-        bin = db.lookup_bin(name)
+        bin = db.lookup_bin_meta(name)
     except KeyError:
         return _response({'error': "Bin not found"}, 404)
 
@@ -53,22 +54,50 @@ def bin(name):
 
 @app.endpoint('api.requests')
 def requests(bin):
+    """Requests newest first, paged with the ``offset`` and ``limit`` args"""
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(limit, 0)
     try:
-        bin = db.lookup_bin(bin)
+        page = db.get_requests(bin, offset, limit)
     except KeyError:
         return _response({'error': "Bin not found"}, 404)
 
-    return _response([r.to_dict() for r in bin.requests])
+    return _response([r.to_dict() for r in page])
+
+
+@app.endpoint('api.tail')
+def tail(bin):
+    """Long-poll for requests newer than the ``after`` cursor
+
+    Without ``after``, waits for requests arriving from now on. Needs a
+    backend that can tail (RedisStreamsStorage).
+    """
+    if not hasattr(db, 'tail_requests'):
+        return _response({'error': "Tailing is not supported by this storage backend"}, 501)
+    try:
+        db.lookup_bin_meta(bin)
+    except KeyError:
+        return _response({'error': "Bin not found"}, 404)
+
+    after = request.args.get('after') or db.last_cursor(bin)
+    timeout = min(request.args.get('timeout', db.tail_timeout, type=float), db.tail_timeout)
+    cursor, request_count, requests = db.tail_requests(bin, after, timeout=max(timeout, 0))
+    return _response({
+        'cursor': cursor,
+        'request_count': request_count,
+        'requests': [r.to_dict() for r in requests]})
 
 
 @app.endpoint('api.request')
 def request_(bin, name):
     try:
-        bin = db.lookup_bin(bin)
+        requests = db.get_requests(bin)
     except KeyError:
         return _response({'error': "Bin not found"}, 404)
 
-    for req in bin.requests:
+    for req in requests:
         if req.id == name:
             return _response(req.to_dict())
 
@@ -80,7 +109,10 @@ def stats():
     stats = {
         'bin_count': db.count_bins(),
         'request_count': db.count_requests(),
-        'avg_req_size_kb': db.avg_req_size(), }
+        'avg_req_size_kb': db.avg_req_size(),
+        'ingest': ingest_queue.stats(), }
+    if hasattr(db, 'storage_stats'):
+        stats['storage'] = db.storage_stats()
     resp = make_response(json.dumps(stats), 200)
     resp.headers['Content-Type'] = 'application/json'
     return resp
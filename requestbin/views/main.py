@@ -1,11 +1,80 @@
 import urllib
 
+import gevent
 from flask import (flash, make_response, redirect, render_template, request, 
                    session, url_for)
 from flask_login import current_user
 
 from requestbin import app, config, socketio
 from requestbin.database import db
+from requestbin.ingest import IngestQueue, IngestQueueFull
+from requestbin.models import Request
+
+
+def notify_bin_updated(bin, request_count):
+    """Emit WebSocket event for real-time update once a request is stored"""
+    if bin.name in _tailing:
+        # The room's watcher emits for requests stored by any worker
+        return
+    socketio.emit('bin_updated', {
+        'bin_name': bin.name,
+        'request_count': request_count if request_count is not None else bin.request_count
+    }, room=bin.name)
+
+
+# Bin name -> greenlet tailing it for this worker's WebSocket clients
+_bin_watchers = {}
+# Bins whose watcher is tailing right now; updates to any other bin, or to
+# one whose watcher is backing off after an error, are emitted directly
+_tailing = set()
+# Seconds a watcher waits before retrying after an error, doubling up to
+# the second value
+WATCH_RETRY_DELAY = (1, 30)
+
+
+def watch_bin(name):
+    """Emit bin_updated to a bin's room for new requests stored by any
+    worker, for backends that can tail (RedisStreamsStorage)"""
+    if hasattr(db, 'tail_requests') and name not in _bin_watchers:
+        _bin_watchers[name] = gevent.spawn(_watch_bin, name)
+
+
+def _has_watchers(name):
+    return next(socketio.server.manager.get_participants('/', name), None) is not None
+
+
+def _watch_bin(name):
+    cursor, delay = None, WATCH_RETRY_DELAY[0]
+    try:
+        # Runs until the room empties
+        while _has_watchers(name):
+            try:
+                if cursor is None:
+                    cursor = db.last_cursor(name)
+                _tailing.add(name)
+                while _has_watchers(name):
+                    cursor, request_count, requests = db.tail_requests(name, cursor)
+                    delay = WATCH_RETRY_DELAY[0]
+                    if requests:
+                        socketio.emit('bin_updated', {
+                            'bin_name': name,
+                            'request_count': request_count
+                        }, room=name)
+            except Exception as e:
+                # Resumes from the same cursor, so nothing stored meanwhile
+                # is missed
+                _tailing.discard(name)
+                print(f"Error watching bin {name}, retrying in {delay}s: {e}")
+                gevent.sleep(delay)
+                delay = min(delay * 2, WATCH_RETRY_DELAY[1])
+    finally:
+        _tailing.discard(name)
+        _bin_watchers.pop(name, None)
+
+
+ingest_queue = IngestQueue(db.create_request,
+                           write_many=getattr(db, 'create_requests', None),
+                           on_commit=notify_bin_updated)
 
 
 def update_recent_bins(name):
@@ -35,11 +104,8 @@ def expand_recent_bins():
     # Only show history for authenticated users
     if current_user.is_authenticated:
         try:
-            user_bins = db.get_bins_by_owner(current_user.email)
-            # Sort by created time, most recent first
-            user_bins.sort(key=lambda x: x.created, reverse=True)
-            # Limit to 10 most recent
-            recent = user_bins[:10]
+            # Summaries of the 10 most recent, newest first; no requests
+            recent = db.list_bins_by_owner(current_user.email, limit=10)
         except Exception as e:
             print(f"Error fetching user bins: {e}")   
             recent = []
@@ -55,7 +121,7 @@ def _get_session_recent_bins():
     recent = []
     for name in session["recent"][:]:  # Create a copy to safely modify during iteration
         try:
-            recent.append(db.lookup_bin(name))
+            recent.append(db.lookup_bin_meta(name))
         except (KeyError, Exception) as e:
             # Remove bins that can't be found or cause errors (e.g., backend switch)
             try:
@@ -73,11 +139,13 @@ def home():
 
 @app.endpoint("views.bin")
 def bin(name):
+    inspect = request.query_string.decode() == "inspect"
     try:
-        bin = db.lookup_bin(name)
+        # Only the inspect page renders requests; ingest needs the bin alone
+        bin = db.lookup_bin(name) if inspect else db.lookup_bin_meta(name)
     except KeyError:
         return "Bin Not found\n", 404
-    if request.query_string.decode() == "inspect":
+    if inspect:
         # Require authentication to view inspect page
         if not current_user.is_authenticated:
             flash("Please login to view bin details.", "warning")
@@ -90,12 +158,11 @@ def bin(name):
             max_requests=config.MAX_REQUESTS, bin_ttl_hours=config.BIN_TTL // 3600
         )
     else:
-        db.create_request(bin, request)
-        # Emit WebSocket event for real-time update
-        socketio.emit('bin_updated', {
-            'bin_name': name,
-            'request_count': len(bin.requests) if hasattr(bin, 'requests') and bin.requests else 1
-        }, room=name)
+        # Capture now; the ingest queue writes it to storage in the background
+        try:
+            ingest_queue.submit(bin, Request(request))
+        except IngestQueueFull:
+            return "Too many requests, try again later\n", 503
         resp = make_response("ok\n")
         return resp
 
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Benchmark for Bin.add with large MAX_REQUESTS
+Times adding requests to a full bin through the RequestBuffer ring buffer
+against the previous list insert(0)/pop() implementation
+
+Usage:
+    python scripts/benchmarks/bench_bin_add.py [count]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault('STORAGE_BACKEND', 'requestbin.storage.memory.MemoryStorage')
+
+from requestbin.models import Bin, Request
+
+
+def list_add(requests, request, max_requests):
+    """The Bin.add body RequestBuffer replaced, kept here for comparison"""
+    requests.insert(0, request)
+    if len(requests) > max_requests:
+        for _ in range(max_requests, len(requests)):
+            requests.pop(max_requests)
+    return request
+
+
+def run_list(max_requests, count):
+    requests = []
+    request = Request()
+    started = time.perf_counter()
+    for _ in range(count):
+        list_add(requests, request, max_requests)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def run_buffer(max_requests, count):
+    Bin.max_requests = max_requests
+    bin = Bin()
+    request = Request()
+    started = time.perf_counter()
+    for _ in range(count):
+        bin.add(request)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print("=" * 70)
+    print("BIN.ADD BENCHMARK")
+    print("=" * 70)
+    print(f"Requests added per case: {count}\n")
+    for max_requests in (20, 200, 2000, 20000):
+        old = run_list(max_requests, count)
+        new = run_buffer(max_requests, count)
+        print(f"  MAX_REQUESTS={max_requests:<6} list: {old:6.2f} us/add   "
+              f"ring buffer: {new:6.2f} us/add")
+
+
+if __name__ == "__main__":
+    main()
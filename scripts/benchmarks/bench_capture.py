@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+CPU benchmark for request capture
+Times building a stored Request from a Flask request with lazy capture
+(LAZY_CAPTURE=true) against eager parsing of headers, query and form data
+
+Usage:
+    python scripts/benchmarks/bench_capture.py [count]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault('STORAGE_BACKEND', 'requestbin.storage.memory.MemoryStorage')
+
+from flask import Request as FlaskRequest
+from werkzeug.test import EnvironBuilder
+
+from requestbin import WSGIRawBody
+from requestbin.models import Request
+
+PAYLOADS = {
+    'json': dict(data=b'{"event": "ping", "data": {"id": 42, "ok": true}}',
+                 content_type='application/json'),
+    'form': dict(data={'event': 'ping', 'id': '42', 'token': 'x' * 64}),
+}
+
+
+def make_environ(kind):
+    environ = EnvironBuilder(
+        path='/bench', method='POST', query_string={'source': 'bench', 'v': '2'},
+        headers={'User-Agent': 'bench/1.0', 'X-Request-Id': '1',
+                 'X-Signature': 'sha256=' + '0' * 64},
+        **PAYLOADS[kind]).get_environ()
+    WSGIRawBody(None).capture(environ)
+    body = environ['wsgi.input'].read()
+    return environ, body
+
+
+def run(kind, lazy, count):
+    from io import BytesIO
+    Request.lazy = lazy
+    template, body = make_environ(kind)
+    elapsed = 0.0
+    for _ in range(count):
+        environ = dict(template)
+        environ['wsgi.input'] = BytesIO(body)
+        started = time.perf_counter()
+        Request(FlaskRequest(environ))
+        elapsed += time.perf_counter() - started
+    return elapsed / count * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print("=" * 70)
+    print("REQUEST CAPTURE BENCHMARK")
+    print("=" * 70)
+    print(f"Requests per case: {count}\n")
+    for kind in PAYLOADS:
+        eager = run(kind, False, count)
+        lazy = run(kind, True, count)
+        print(f"  {kind:5} eager: {eager:7.1f} us/request   lazy: {lazy:7.1f} us/request "
+              f"({(eager - lazy) / eager * 100:.0f}% less)")
+
+
+if __name__ == "__main__":
+    main()
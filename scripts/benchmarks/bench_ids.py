@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Microbenchmark for ID generation
+Times util.ulid() against the previous tinyid() (recursive baseN over
+hash(time.time())) and counts the duplicates each produces in a tight loop
+
+Usage:
+    python scripts/benchmarks/bench_ids.py [count]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault('STORAGE_BACKEND', 'requestbin.storage.memory.MemoryStorage')
+
+from requestbin.util import ulid
+
+
+def baseN(num, b, numerals="0123456789abcdefghijklmnopqrstuvwxyz"):
+    return ((num == 0) and "0") or (baseN(num // b, b).lstrip("0") + numerals[num % b])
+
+
+def tinyid(size=6):
+    """The generator ulid() replaced, kept here for comparison"""
+    id = '%s%s' % (
+        baseN(abs(hash(time.time())), 36),
+        baseN(abs(hash(time.time())), 36))
+    return id[0:size]
+
+
+def run(generate, count):
+    started = time.perf_counter()
+    ids = [generate() for _ in range(count)]
+    elapsed = time.perf_counter() - started
+    return elapsed / count * 1e6, count - len(set(ids))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print("=" * 70)
+    print("ID GENERATION BENCHMARK")
+    print("=" * 70)
+    print(f"IDs per case: {count}\n")
+    cases = [
+        ('tinyid(6)  request', lambda: tinyid(6)),
+        ('tinyid(8)  bin', lambda: tinyid(8)),
+        ('ulid()     request', ulid),
+        ('ulid(16)   bin', lambda: ulid(16)),
+    ]
+    for label, generate in cases:
+        per_id, duplicates = run(generate, count)
+        print(f"  {label:20} {per_id:6.2f} us/id   {duplicates:7} duplicates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Ingest latency benchmark for PostgreSQLStorage
+Times each create_request call (one statement per captured request) into
+a bin that fills past MAX_REQUESTS, so the trim runs on every write, and
+into fresh bins, then each create_requests batch. Reports p50, p99 and max
+in milliseconds. Uses the usual POSTGRES_* settings
+
+Usage:
+    python scripts/benchmarks/bench_pg_ingest_latency.py [requests]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.postgresql.PostgreSQLStorage'
+
+from flask import Request as FlaskRequest
+from werkzeug.test import EnvironBuilder
+
+from requestbin import WSGIRawBody, config
+from requestbin.models import Request
+from requestbin.storage.postgresql import PostgreSQLStorage
+
+BATCH = 100
+
+
+def make_request(i):
+    environ = EnvironBuilder(
+        path='/bench', method='POST', query_string={'source': 'bench'},
+        data=('{"event": "ping", "seq": %d, "data": "%s"}' % (i, 'x' * 400)).encode(),
+        content_type='application/json',
+        headers={'User-Agent': 'bench/1.0', 'X-Request-Id': str(i)}).get_environ()
+    WSGIRawBody(None).capture(environ)
+    return Request(FlaskRequest(environ))
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def timed(calls):
+    samples = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    requests = [make_request(i) for i in range(count)]
+    storage = PostgreSQLStorage(bin_ttl=3600)
+
+    full = storage.create_bin()
+    fresh = [storage.create_bin() for _ in range(count)]
+    batches = [requests[i:i + BATCH] for i in range(0, count, BATCH)]
+    batch_bin = storage.create_bin()
+    cases = [
+        ('full bin', timed(lambda r=r: storage.create_request(full, r) for r in requests)),
+        ('fresh bins', timed(lambda b=b, r=r: storage.create_request(b, r)
+                             for b, r in zip(fresh, requests))),
+        (f'batch of {BATCH}', timed(lambda b=b: storage.create_requests([(batch_bin, r) for r in b])
+                                    for b in batches)),
+    ]
+
+    print("=" * 70)
+    print("POSTGRESQL INGEST LATENCY BENCHMARK")
+    print("=" * 70)
+    print(f"Requests per case: {count}   requests per bin: {config.MAX_REQUESTS}   "
+          f"server: {config.POSTGRES_HOST}:{config.POSTGRES_PORT}\n")
+    print(f"  {'case':14} {'calls':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, samples in cases:
+        print(f"  {name:14} {len(samples):7} {percentile(samples, 50):9.3f} "
+              f"{percentile(samples, 99):9.3f} {max(samples):9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Memory benchmark for stored requests
+Compares bytes per stored request for the compact __slots__ Request model
+against the previous __dict__-based layout (headers dict, query dict,
+list-of-lists form data, separate body and raw copies)
+
+Usage:
+    python scripts/benchmarks/bench_request_memory.py [count] [body_size]
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault('STORAGE_BACKEND', 'requestbin.storage.memory.MemoryStorage')
+
+from flask import Request as FlaskRequest
+from werkzeug.test import EnvironBuilder
+
+from requestbin import WSGIRawBody
+from requestbin.models import Request
+
+
+class LegacyRequest(object):
+    """The pre-__slots__ layout, kept here only for comparison"""
+
+    def __init__(self, input):
+        self.id = 'abcdef'
+        self.url = input.url
+        self.time = 0.0
+        self.remote_addr = input.headers.get('X-Forwarded-For', input.remote_addr)
+        self.method = input.method
+        self.headers = dict(input.headers)
+        self.query_string = input.args.to_dict(flat=True)
+        self.form_data = [[k, input.values[k]] for k in input.form]
+        self.body = input.environ['raw']
+        self.path = input.path
+        self.content_type = self.headers.get("Content-Type", "")
+        self.raw = self.body.decode('utf-8')
+        self.content_length = len(self.raw)
+
+
+def make_input(i, body_size):
+    body = ('{"event": "ping", "seq": %d, "data": "%s"}' % (i, 'x' * body_size)).encode()
+    environ = EnvironBuilder(
+        path='/bench', method='POST', query_string={'source': 'bench'},
+        data=body, content_type='application/json',
+        headers={'User-Agent': 'bench/1.0', 'X-Request-Id': str(i),
+                 'X-Signature': 'sha256=%064d' % i}).get_environ()
+    WSGIRawBody(None).capture(environ)
+    return FlaskRequest(environ)
+
+
+def measure(factory, count, body_size):
+    inputs = [make_input(i, body_size) for i in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    stored = [factory(input) for input in inputs]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del stored
+    return (after - before) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    body_size = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+
+    print("=" * 70)
+    print("REQUEST MEMORY BENCHMARK")
+    print("=" * 70)
+    print(f"Requests: {count}, body size: ~{body_size} bytes")
+
+    legacy = measure(LegacyRequest, count, body_size)
+    compact = measure(Request, count, body_size)
+
+    print(f"\n  Legacy __dict__ layout:  {legacy:10.0f} bytes/request")
+    print(f"  Compact __slots__ model: {compact:10.0f} bytes/request")
+    print(f"  Saved:                   {legacy - compact:10.0f} bytes/request "
+          f"({(legacy - compact) / legacy * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Lookup benchmark for SharedMemoryStorage
+Times lookup_bin for a full bin when the worker's cached copy is current,
+when one request arrived since the last lookup (delta) and with no cached
+copy (full transfer and decode)
+
+Usage:
+    python scripts/benchmarks/bench_shared_lookup.py [lookups] [requests_per_bin]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault('STORAGE_BACKEND', 'requestbin.storage.memory.MemoryStorage')
+
+from flask import Request as FlaskRequest
+from werkzeug.test import EnvironBuilder
+
+from requestbin import WSGIRawBody
+from requestbin.models import Request
+from requestbin.storage.shared import SharedMemoryStorage
+
+
+def make_request(i):
+    environ = EnvironBuilder(
+        path='/bench', method='POST', query_string={'source': 'bench'},
+        data=('{"event": "ping", "seq": %d, "data": "%s"}' % (i, 'x' * 400)).encode(),
+        content_type='application/json',
+        headers={'User-Agent': 'bench/1.0', 'X-Request-Id': str(i)}).get_environ()
+    WSGIRawBody(None).capture(environ)
+    return Request(FlaskRequest(environ))
+
+
+def timed(count, before, lookup):
+    elapsed = 0.0
+    for _ in range(count):
+        before()
+        started = time.perf_counter()
+        lookup()
+        elapsed += time.perf_counter() - started
+    return elapsed / count * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    per_bin = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    storage = SharedMemoryStorage(bin_ttl=3600)
+    storage.socket_path = os.path.join(tempfile.mkdtemp(), 'storage.sock')
+    try:
+        bin = storage.create_bin()
+        requests = [make_request(i) for i in range(per_bin)]
+        storage.create_requests([(bin, r) for r in requests])
+        lookup = lambda: storage.lookup_bin(bin.name)
+        lookup()
+
+        print("=" * 70)
+        print("SHARED STORAGE LOOKUP BENCHMARK")
+        print("=" * 70)
+        print(f"Lookups per case: {count}   requests in bin: {per_bin}\n")
+        cases = [
+            ('cached, unchanged', lambda: None),
+            ('cached, 1 new request', lambda: storage.create_request(bin, requests[0])),
+            ('no cache (full)', storage._cache.clear),
+        ]
+        for label, before in cases:
+            print(f"  {label:24} {timed(count, before, lookup):8.1f} us/lookup")
+    finally:
+        if storage._server is not None:
+            storage._server.terminate()
+            storage._server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Restart benchmark for MemoryStorage snapshots
+Fills a MemoryStorage with captured requests, writes a snapshot and times
+loading it back into a fresh storage, as a restarted worker would
+
+Usage:
+    python scripts/benchmarks/bench_snapshot.py [requests] [requests_per_bin]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault('STORAGE_BACKEND', 'requestbin.storage.memory.MemoryStorage')
+
+from flask import Request as FlaskRequest
+from werkzeug.test import EnvironBuilder
+
+from requestbin import WSGIRawBody
+from requestbin.models import Bin, Request
+from requestbin.storage.memory import MemoryStorage
+
+
+def make_request(i):
+    environ = EnvironBuilder(
+        path='/bench', method='POST', query_string={'source': 'bench'},
+        data=('{"event": "ping", "seq": %d, "data": "%s"}' % (i, 'x' * 400)).encode(),
+        content_type='application/json',
+        headers={'User-Agent': 'bench/1.0', 'X-Request-Id': str(i),
+                 'X-Signature': 'sha256=%064d' % i}).get_environ()
+    WSGIRawBody(None).capture(environ)
+    return Request(FlaskRequest(environ))
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    per_bin = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    Bin.max_requests = per_bin
+
+    print("=" * 70)
+    print("MEMORY SNAPSHOT RESTART BENCHMARK")
+    print("=" * 70)
+
+    storage = MemoryStorage(bin_ttl=3600)
+    templates = [make_request(i) for i in range(per_bin)]
+    bin = None
+    for i in range(total):
+        if i % per_bin == 0:
+            bin = storage.create_bin()
+        storage.create_request(bin, templates[i % per_bin])
+    print(f"Bins: {len(storage.bins)}   requests: {total}\n")
+
+    path = os.path.join(tempfile.mkdtemp(), 'requestbin.snapshot')
+    try:
+        started = time.perf_counter()
+        storage.save_snapshot(path)
+        saved = time.perf_counter() - started
+        size = os.path.getsize(path)
+
+        restarted = MemoryStorage(bin_ttl=3600)
+        started = time.perf_counter()
+        loaded = restarted.load_snapshot(path)
+        elapsed = time.perf_counter() - started
+        assert loaded == len(storage.bins)
+        assert sum(b.request_count for b in restarted.bins.values()) == total
+
+        print(f"  save: {saved:6.2f} s   {size / 1024 / 1024:6.1f} MiB")
+        print(f"  load: {elapsed:6.2f} s   {total / elapsed:,.0f} requests/s")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
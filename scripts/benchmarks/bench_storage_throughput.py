@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Throughput benchmark across storage backends
+Times single create_request calls, batched create_requests (for backends
+that have it) and lookup_bin of a full bin on each backend. Memory, SQLite,
+segment log and shared memory run by default; name redis or postgresql to
+include them (they use the usual REDIS_*/POSTGRES_* settings)
+
+Usage:
+    python scripts/benchmarks/bench_storage_throughput.py [requests] [backend ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+os.environ.setdefault('STORAGE_BACKEND', 'requestbin.storage.memory.MemoryStorage')
+
+from flask import Request as FlaskRequest
+from werkzeug.test import EnvironBuilder
+
+from requestbin import WSGIRawBody, config
+from requestbin.models import Request
+
+BACKENDS = {
+    'memory': 'requestbin.storage.memory.MemoryStorage',
+    'sqlite': 'requestbin.storage.sqlite.SQLiteStorage',
+    'segmentlog': 'requestbin.storage.segmentlog.SegmentLogStorage',
+    'shared': 'requestbin.storage.shared.SharedMemoryStorage',
+    'redis': 'requestbin.storage.redis.RedisStorage',
+    'postgresql': 'requestbin.storage.postgresql.PostgreSQLStorage',
+}
+BATCH = 100
+
+
+def make_request(i):
+    environ = EnvironBuilder(
+        path='/bench', method='POST', query_string={'source': 'bench'},
+        data=('{"event": "ping", "seq": %d, "data": "%s"}' % (i, 'x' * 400)).encode(),
+        content_type='application/json',
+        headers={'User-Agent': 'bench/1.0', 'X-Request-Id': str(i)}).get_environ()
+    WSGIRawBody(None).capture(environ)
+    return Request(FlaskRequest(environ))
+
+
+def open_storage(name, workdir):
+    module, klass = BACKENDS[name].rsplit('.', 1)
+    klass = getattr(__import__(module, fromlist=[klass]), klass)
+    if name == 'sqlite':
+        klass.path = os.path.join(workdir, 'bench.sqlite3')
+    elif name == 'segmentlog':
+        klass.path = os.path.join(workdir, 'segments')
+    elif name == 'shared':
+        klass.socket_path = os.path.join(workdir, 'storage.sock')
+    return klass(bin_ttl=3600)
+
+
+def close_storage(storage):
+    server = getattr(storage, '_server', None)
+    if server is not None:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def rate(count, fn):
+    started = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - started)
+
+
+def run(storage, requests):
+    results = {}
+    bin = storage.create_bin()
+
+    def single():
+        for request in requests:
+            storage.create_request(bin, request)
+    results['single'] = rate(len(requests), single)
+
+    create_requests = getattr(storage, 'create_requests', None)
+    if create_requests is not None:
+        bin = storage.create_bin()
+
+        def batched():
+            for i in range(0, len(requests), BATCH):
+                create_requests([(bin, r) for r in requests[i:i + BATCH]])
+        results['batched'] = rate(len(requests), batched)
+
+    lookups = max(1, len(requests) // config.MAX_REQUESTS)
+
+    def lookup():
+        for _ in range(lookups):
+            storage.lookup_bin(bin.name)
+    results['lookup'] = rate(lookups, lookup)
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    names = sys.argv[2:] or ['memory', 'sqlite', 'segmentlog', 'shared']
+    requests = [make_request(i) for i in range(count)]
+    workdir = tempfile.mkdtemp()
+
+    print("=" * 70)
+    print("STORAGE BACKEND THROUGHPUT BENCHMARK")
+    print("=" * 70)
+    print(f"Requests per case: {count}   batch size: {BATCH}   "
+          f"requests per bin: {config.MAX_REQUESTS}\n")
+    print(f"  {'backend':12} {'single/s':>12} {'batched/s':>12} {'lookups/s':>12}")
+    for name in names:
+        try:
+            storage = open_storage(name, workdir)
+        except Exception as e:
+            print(f"  {name:12} skipped: {e}")
+            continue
+        try:
+            results = run(storage, requests)
+        finally:
+            close_storage(storage)
+        batched = f"{results['batched']:12,.0f}" if 'batched' in results else f"{'-':>12}"
+        print(f"  {name:12} {results['single']:12,.0f} {batched} {results['lookup']:12,.1f}")
+
+
+if __name__ == "__main__":
+    main()
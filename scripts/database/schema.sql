@@ -44,8 +44,10 @@ CREATE TABLE IF NOT EXISTS bins (
     secret_key BYTEA,
     favicon_uri TEXT,
     request_count INTEGER DEFAULT 0,
-    owner_email VARCHAR(255) REFERENCES users(email) ON DELETE SET NULL
+    owner_email VARCHAR(255) REFERENCES users(email) ON DELETE SET NULL,
+    last_request_at TIMESTAMP
 );
+ALTER TABLE bins ADD COLUMN IF NOT EXISTS last_request_at TIMESTAMP;
 
 -- Create index on expires_at for efficient cleanup
 CREATE INDEX IF NOT EXISTS idx_bins_expires_at ON bins(expires_at);
@@ -53,20 +55,23 @@ CREATE INDEX IF NOT EXISTS idx_bins_expires_at ON bins(expires_at);
 -- Create index on name for fast lookups
 CREATE INDEX IF NOT EXISTS idx_bins_name ON bins(name);
 
--- Create index on owner_email for efficient user bin lookups
-CREATE INDEX IF NOT EXISTS idx_bins_owner_email ON bins(owner_email);
+-- Create index for user bin listings: newest first, keyset paged
+CREATE INDEX IF NOT EXISTS idx_bins_owner_created ON bins(owner_email, created_at, name);
+DROP INDEX IF EXISTS idx_bins_owner_email;
 
 -- Create requests table to store request data
 CREATE TABLE IF NOT EXISTS requests (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL PRIMARY KEY,
     bin_name VARCHAR(255) NOT NULL REFERENCES bins(name) ON DELETE CASCADE,
     request_data BYTEA NOT NULL,
     created_at TIMESTAMP NOT NULL DEFAULT NOW(),
     request_order INTEGER NOT NULL
 );
 
--- Create composite index for efficient bin request lookups
-CREATE INDEX IF NOT EXISTS idx_requests_bin_name ON requests(bin_name, request_order DESC);
+-- Create composite index for efficient bin request lookups; requests are
+-- ordered by id, newest first, and trimmed as a range of it
+CREATE INDEX IF NOT EXISTS idx_requests_bin_id ON requests(bin_name, id DESC);
+DROP INDEX IF EXISTS idx_requests_bin_name;
 
 -- Create index on created_at for cleanup and analytics
 CREATE INDEX IF NOT EXISTS idx_requests_created_at ON requests(created_at);
@@ -87,6 +92,64 @@ INSERT INTO stats (key, value)
 VALUES ('total_bins', 0)
 ON CONFLICT (key) DO NOTHING;
 
+-- Store a batch of captured requests in one statement: bump each bin's
+-- request_count, insert the rows, trim each bin to the newest `keep` and bump
+-- total_requests. Returns each bin's first new request_order. Also created by
+-- PostgreSQLStorage at startup, which also widens an older 32-bit requests.id.
+CREATE OR REPLACE FUNCTION add_requests(
+    names TEXT[], payloads BYTEA[], positions INTEGER[], keep INTEGER
+) RETURNS TABLE (bin TEXT, first_order BIGINT) AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    WITH data AS (
+        SELECT * FROM unnest(names, payloads, positions) AS d (name, request_data, position)
+    ),
+    added AS (
+        SELECT name, COUNT(*) AS added FROM data GROUP BY name
+    ),
+    locked AS (
+        SELECT bins.name FROM bins JOIN added ON bins.name = added.name
+        ORDER BY bins.name
+        FOR UPDATE OF bins
+    ),
+    bumped AS (
+        UPDATE bins SET request_count = bins.request_count + added.added,
+                        last_request_at = NOW()
+        FROM added, locked
+        WHERE bins.name = added.name AND locked.name = added.name
+        RETURNING bins.name, bins.request_count AS total, added.added
+    ),
+    inserted AS (
+        INSERT INTO requests (bin_name, request_data, request_order)
+        SELECT data.name, data.request_data, bumped.total - bumped.added + data.position
+        FROM data JOIN bumped ON data.name = bumped.name
+        WHERE data.position >= bumped.added - keep
+    ),
+    cutoff AS (
+        -- Newest stored row past the ones to keep, found by walking the
+        -- (bin_name, id DESC) index
+        SELECT bumped.name, oldest.id FROM bumped
+        CROSS JOIN LATERAL (
+            SELECT requests.id FROM requests
+            WHERE requests.bin_name = bumped.name
+            ORDER BY requests.id DESC
+            OFFSET keep - LEAST(bumped.added, keep) LIMIT 1
+        ) AS oldest
+    ),
+    trimmed AS (
+        DELETE FROM requests USING cutoff
+        WHERE requests.bin_name = cutoff.name AND requests.id <= cutoff.id
+    ),
+    counted AS (
+        UPDATE stats SET value = value + (SELECT COALESCE(SUM(added), 0) FROM bumped)
+        WHERE key = 'total_requests'
+    )
+    SELECT bumped.name::TEXT, bumped.total - bumped.added FROM bumped;
+END;
+$$ LANGUAGE plpgsql
+SET plan_cache_mode = force_generic_plan;
+
 -- Note: Admin user creation is handled by init_postgres_schema.py
 -- which reads ADMIN_EMAIL and ADMIN_PASSWORD from environment variables
 
@@ -22,6 +22,16 @@ TEST_MODULES = [
     ('Workflow & Integration', 'test_workflow.py'),
     ('WebSocket Functionality', 'test_websocket.py'),
     ('UI/UX Features', 'test_ui_features.py'),
+    ('Request Body Capture', 'test_raw_body.py'),
+    ('Ingest Queue', 'test_ingest.py'),
+    ('Request & Bin Models', 'test_models.py'),
+    ('ID Generation', 'test_ids.py'),
+    ('Memory Storage', 'test_memory_storage.py'),
+    ('Redis Storage', 'test_redis_storage.py'),
+    ('Shared Memory Storage', 'test_shared_storage.py'),
+    ('SQLite Storage', 'test_sqlite_storage.py'),
+    ('Segment Log Storage', 'test_segment_log_storage.py'),
+    ('PostgreSQL Storage', 'test_postgresql_storage.py'),
 ]
 
 
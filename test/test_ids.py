@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Test time-ordered ID generation (util.ulid)
+Tests format, ordering and uniqueness under many concurrent greenlets
+"""
+
+import os
+import sys
+
+os.environ['REALM'] = 'local'
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.memory.MemoryStorage'
+
+import gevent
+
+from requestbin import app, db
+from requestbin.util import ulid, ID_ALPHABET
+
+
+def test_format():
+    """IDs have the requested size and use the sortable alphabet"""
+    print("\n1. ID format:")
+    try:
+        for size in (26, 16, 15):
+            id = ulid(size)
+            assert len(id) == size and set(id) <= set(ID_ALPHABET), id
+        assert len(db.create_bin().name) == 16
+        print("  ✓ Request IDs are 26 characters, bin names 16")
+        return True
+    except Exception as e:
+        print(f"  ✗ ID format - {e}")
+        return False
+
+
+def test_ordering():
+    """IDs sort in the order they were generated"""
+    print("\n2. Time ordering:")
+    try:
+        for size in (26, 16):
+            ids = [ulid(size) for _ in range(10000)]
+            assert ids == sorted(ids) and len(set(ids)) == len(ids)
+        first = ulid()
+        gevent.sleep(0.002)
+        assert ulid() > first
+        print("  ✓ 10000 IDs per size sorted in creation order")
+        return True
+    except Exception as e:
+        print(f"  ✗ Ordering - {e}")
+        return False
+
+
+def test_concurrent_uniqueness():
+    """No collisions across many greenlets generating at once"""
+    print("\n3. Concurrent uniqueness:")
+    try:
+        def generate(count):
+            ids = []
+            for i in range(count):
+                ids.append(ulid())
+                if i % 50 == 0:
+                    gevent.sleep(0)
+            return ids
+
+        jobs = [gevent.spawn(generate, 500) for _ in range(200)]
+        gevent.joinall(jobs, timeout=30)
+        ids = [id for job in jobs for id in job.value]
+        assert len(ids) == 100000 and len(set(ids)) == len(ids)
+        for job in jobs:
+            assert job.value == sorted(job.value)
+        print(f"  ✓ {len(ids)} IDs from 200 greenlets, no duplicates")
+        return True
+    except Exception as e:
+        print(f"  ✗ Concurrent uniqueness - {e}")
+        return False
+
+
+def test_concurrent_requests():
+    """Requests captured concurrently can each be looked up by ID"""
+    print("\n4. Concurrent request capture:")
+    try:
+        bin = db.create_bin()
+
+        def post(i):
+            with app.test_client() as client:
+                return client.post(f'/{bin.name}', data={'n': str(i)}).status_code
+
+        jobs = [gevent.spawn(post, i) for i in range(50)]
+        gevent.joinall(jobs, timeout=30)
+        assert all(job.value == 200 for job in jobs)
+        requests = db.lookup_bin(bin.name).requests
+        ids = [r.id for r in requests]
+        assert len(set(ids)) == len(ids) == 50
+        with app.test_client() as client:
+            for id in ids[:5]:
+                response = client.get(f'/api/v1/bins/{bin.name}/requests/{id}')
+                assert response.status_code == 200
+                assert response.get_json()['id'] == id
+            page = client.get(f'/api/v1/bins/{bin.name}/requests?offset=5&limit=10').get_json()
+            assert [r['id'] for r in page] == ids[5:15]
+            assert client.get(f'/api/v1/bins/{bin.name}').get_json()['request_count'] == 50
+        print("  ✓ 50 concurrent requests stored with distinct IDs")
+        print("  ✓ Request pages and counts served by the API")
+        return True
+    except Exception as e:
+        print(f"  ✗ Concurrent capture - {e}")
+        return False
+
+
+def main():
+    print("=" * 60)
+    print("ID GENERATION TESTS")
+    print("=" * 60)
+
+    results = [
+        test_format(),
+        test_ordering(),
+        test_concurrent_uniqueness(),
+        test_concurrent_requests(),
+    ]
+
+    print("\n" + "=" * 60)
+    if all(results):
+        print("✅ ALL ID GENERATION TESTS PASSED")
+        return 0
+    print("❌ SOME ID GENERATION TESTS FAILED")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
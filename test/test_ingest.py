@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+Test the write-behind ingest queue
+Tests acknowledgement modes, backpressure and draining on shutdown
+"""
+
+import os
+import sys
+
+os.environ['REALM'] = 'local'
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.memory.MemoryStorage'
+
+import gevent
+
+from requestbin import app, db
+from requestbin.ingest import IngestQueue, IngestQueueFull
+
+
+class SlowWriter(object):
+    """Stands in for a storage backend with noticeable latency"""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.written = []
+
+    def __call__(self, bin, request):
+        gevent.sleep(self.delay)
+        self.written.append(request)
+        return len(self.written)
+
+
+def test_commit_mode():
+    """Commit mode waits for storage and returns the request count"""
+    print("\n1. Commit acknowledgement:")
+    try:
+        notified = []
+        writer = SlowWriter()
+        queue = IngestQueue(writer, on_commit=lambda bin, count: notified.append(count),
+                            ack='commit', maxsize=10, workers=2)
+        assert queue.submit(None, 'a') == 1
+        assert queue.submit(None, 'b') == 2
+        assert notified == [1, 2]
+        assert queue.stats()['committed'] == 2
+        print("  ✓ Requests committed before acknowledgement")
+        return True
+    except Exception as e:
+        print(f"  ✗ Commit mode - {e}")
+        return False
+
+
+def test_enqueue_mode_backpressure():
+    """Enqueue mode rejects requests once the queue stays full"""
+    print("\n2. Enqueue acknowledgement and backpressure:")
+    try:
+        writer = SlowWriter(delay=0.5)
+        queue = IngestQueue(writer, ack='enqueue', maxsize=2, workers=1,
+                            enqueue_timeout=0.05)
+        rejected = 0
+        for i in range(6):
+            try:
+                assert queue.submit(None, i) is None
+            except IngestQueueFull:
+                rejected += 1
+        stats = queue.stats()
+        assert rejected > 0 and stats['rejected'] == rejected
+        assert stats['max_depth'] <= 2
+        print(f"  ✓ {rejected} requests rejected under backpressure")
+
+        queue.stop(timeout=5)
+        assert len(writer.written) == stats['enqueued']
+        print("  ✓ Queued requests drained on stop")
+        return True
+    except Exception as e:
+        print(f"  ✗ Enqueue mode - {e}")
+        return False
+
+
+def test_immediate_mode_drops():
+    """Immediate mode never blocks and counts dropped requests"""
+    print("\n3. Immediate acknowledgement:")
+    try:
+        writer = SlowWriter(delay=0.5)
+        queue = IngestQueue(writer, ack='immediate', maxsize=1, workers=1)
+        for i in range(5):
+            assert queue.submit(None, i) is None
+        assert queue.stats()['dropped'] > 0
+        print(f"  ✓ {queue.stats()['dropped']} requests dropped without blocking")
+        queue.stop(timeout=5)
+        return True
+    except Exception as e:
+        print(f"  ✗ Immediate mode - {e}")
+        return False
+
+
+def test_batched_writes():
+    """Concurrent submissions are grouped into write_many calls"""
+    print("\n4. Group commit:")
+    try:
+        batches = []
+
+        def write_many(items):
+            gevent.sleep(0.01)
+            batches.append(len(items))
+            return [i for i, _ in enumerate(items)]
+
+        queue = IngestQueue(SlowWriter(), write_many=write_many, ack='commit',
+                            maxsize=100, workers=1, batch_size=20, batch_window=0.01)
+        jobs = [gevent.spawn(queue.submit, None, i) for i in range(50)]
+        gevent.joinall(jobs, timeout=5)
+        assert all(job.successful() for job in jobs)
+        assert sum(batches) == 50 and max(batches) > 1
+        assert queue.stats()['batches'] == len(batches)
+        print(f"  ✓ 50 requests written in {len(batches)} batches")
+        return True
+    except Exception as e:
+        print(f"  ✗ Group commit - {e}")
+        return False
+
+
+def test_bin_post_through_queue():
+    """Bin POSTs go through the view's ingest queue"""
+    print("\n5. Bin POST via ingest queue:")
+    try:
+        from requestbin.views.main import ingest_queue
+        bin = db.create_bin()
+        before = ingest_queue.stats()['committed']
+        with app.test_client() as client:
+            response = client.post(f'/{bin.name}', data={'hello': 'world'})
+            assert response.status_code == 200
+            stats = client.get('/api/v1/stats').get_json()
+        assert ingest_queue.stats()['committed'] == before + 1
+        assert 'ingest' in stats
+        assert db.lookup_bin(bin.name).request_count == 1
+        print("  ✓ Request stored and reported in /api/v1/stats")
+        return True
+    except Exception as e:
+        print(f"  ✗ Bin POST - {e}")
+        return False
+
+
+def main():
+    print("=" * 60)
+    print("INGEST QUEUE TESTS")
+    print("=" * 60)
+
+    results = [
+        test_commit_mode(),
+        test_enqueue_mode_backpressure(),
+        test_immediate_mode_drops(),
+        test_batched_writes(),
+        test_bin_post_through_queue(),
+    ]
+
+    print("\n" + "=" * 60)
+    if all(results):
+        print("✅ ALL INGEST QUEUE TESTS PASSED")
+        return 0
+    print("❌ SOME INGEST QUEUE TESTS FAILED")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
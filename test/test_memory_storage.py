@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+"""
+Test the in-memory storage backend
+Tests heap-based bin expiry, the reaper greenlet, lazy expiry on lookup, the
+owner index, byte-budget eviction, snapshots, and metadata lookups with
+paged request reads
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+os.environ['REALM'] = 'local'
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.memory.MemoryStorage'
+
+import gevent
+
+from requestbin.models import Request
+from requestbin.storage.memory import MemoryStorage
+
+
+def test_expiry_heap():
+    """Only bins past their TTL are removed, oldest first"""
+    print("\n1. Expiry heap:")
+    try:
+        storage = MemoryStorage(bin_ttl=100)
+        bins = [storage.create_bin() for _ in range(5)]
+        now = time.time()
+        for i, bin in enumerate(bins):
+            bin.created = now - 200 + i * 50
+        storage._expiry = [(bin.created + 100, bin.name) for bin in bins]
+
+        assert storage._expire_bins(now) == 3
+        assert set(storage.bins) == {bins[3].name, bins[4].name}
+        assert len(storage._expiry) == 2
+        print("  ✓ Expired bins removed, live bins kept")
+
+        # A custom-named bin created again keeps its new expiry
+        first = storage.create_bin(custom_name='hooks')
+        storage._expiry.append((now - 1, 'hooks'))
+        storage._expiry.sort()
+        storage._expire_bins(now)
+        assert storage.lookup_bin('hooks') is first
+        print("  ✓ Stale heap entries skipped")
+        return True
+    except Exception as e:
+        print(f"  ✗ Expiry heap - {e}")
+        return False
+
+
+def test_lazy_expiry_on_lookup():
+    """lookup_bin never returns an expired bin"""
+    print("\n2. Lazy expiry:")
+    try:
+        storage = MemoryStorage(bin_ttl=100)
+        bin = storage.create_bin()
+        bin.created -= 101
+        try:
+            storage.lookup_bin(bin.name)
+            raise AssertionError("expired bin returned")
+        except KeyError:
+            pass
+        assert bin.name not in storage.bins
+        assert storage.count_bins() == 0
+        print("  ✓ Expired bin raises KeyError before the reaper runs")
+        return True
+    except Exception as e:
+        print(f"  ✗ Lazy expiry - {e}")
+        return False
+
+
+def test_reaper_greenlet():
+    """The background greenlet expires bins on its own"""
+    print("\n3. Reaper greenlet:")
+    try:
+        storage = MemoryStorage(bin_ttl=0.05)
+        storage.cleanup_interval = 0.02
+        for _ in range(10):
+            storage.create_bin()
+        assert storage._reaper is not None
+        gevent.sleep(0.2)
+        assert not storage.bins and not storage._expiry
+        print("  ✓ Bins reaped without any lookups")
+        return True
+    except Exception as e:
+        print(f"  ✗ Reaper greenlet - {e}")
+        return False
+
+
+def test_owner_index():
+    """Owner lookups touch only that owner's bins and follow expiry"""
+    print("\n4. Owner index:")
+    try:
+        storage = MemoryStorage(bin_ttl=100)
+        mine = [storage.create_bin(owner_email='me@example.com') for _ in range(12)]
+        storage.create_bin(owner_email='other@example.com')
+        storage.create_bin()
+
+        bins = storage.get_bins_by_owner('me@example.com')
+        assert bins == mine[::-1]
+        assert storage.get_bins_by_owner('me@example.com', limit=10) == mine[::-1][:10]
+        assert storage.get_bins_by_owner('nobody@example.com') == []
+        print("  ✓ Owned bins returned newest first, limit respected")
+
+        request = make_request(10)
+        storage.create_request(mine[-1], request)
+        first = storage.list_bins_by_owner('me@example.com', limit=5)
+        rest = storage.list_bins_by_owner('me@example.com', before=first[-1].cursor)
+        assert [b.name for b in first + rest] == [b.name for b in mine[::-1]]
+        assert first[0].request_count == 1 and first[1].request_count == 0
+        assert first[0].last_activity == request.time and first[0].created == mine[-1].created
+        assert first[1].last_activity == first[1].created
+        print("  ✓ Summaries paged by cursor with counts and last activity")
+
+        cutoff = mine[5].created
+        storage._expire_bins(now=cutoff + 100)
+        live = [b for b in mine if b.created > cutoff]
+        assert len(storage._owners['me@example.com']) == len(live)
+        assert storage.get_bins_by_owner('me@example.com') == live[::-1]
+        print("  ✓ Expired bins removed from the index")
+        return True
+    except Exception as e:
+        print(f"  ✗ Owner index - {e}")
+        return False
+
+
+def make_request(size):
+    request = Request()
+    request.id, request.body = 'r', b'x' * size
+    return request
+
+
+def fill(policy, budget=None):
+    """Three bins of different sizes, the largest touched first"""
+    storage = MemoryStorage(bin_ttl=100)
+    storage.eviction_policy = policy
+    bins = [storage.create_bin() for _ in range(3)]
+    for bin, size in zip(bins, (20000, 60000, 10000)):
+        storage.create_request(bin, make_request(size))
+    storage.lookup_bin(bins[0].name)
+    storage.memory_budget = budget or storage.bytes_used - 1
+    return storage, bins
+
+
+def test_memory_budget():
+    """Bins are evicted by policy once the byte budget is exceeded"""
+    print("\n5. Memory budget:")
+    try:
+        storage, bins = fill('lru', budget=10**9)
+        assert storage.bytes_used == sum(b.size for b in bins)
+        bin = bins[0]
+        for _ in range(bin.max_requests + 5):
+            storage.create_request(bin, make_request(100))
+        assert bin.request_count == bin.max_requests
+        assert storage.bytes_used == sum(b.size for b in bins)
+        print("  ✓ Footprint tracked through adds and ring buffer evictions")
+
+        expected = {'lru': 1, 'oldest': 0, 'largest': 1}
+        for policy, victim in expected.items():
+            storage, bins = fill(policy)
+            storage.create_request(bins[2], make_request(10))
+            assert bins[victim].name not in storage.bins, policy
+            assert len(storage.bins) == 2 and storage.evictions == 1
+            assert storage.bytes_used <= storage.memory_budget
+            assert storage.bytes_used == sum(b.size for b in storage.bins.values())
+        print("  ✓ lru, oldest and largest policies evict the expected bin")
+
+        stats = storage.storage_stats()
+        assert stats['evictions'] == 1 and stats['evicted_bytes'] == bins[1].size
+        print("  ✓ Eviction counters reported")
+        return True
+    except Exception as e:
+        print(f"  ✗ Memory budget - {e}")
+        return False
+
+
+def test_snapshot():
+    """Bins survive a save and load into a fresh storage"""
+    print("\n6. Snapshots:")
+    try:
+        path = os.path.join(tempfile.mkdtemp(), 'requestbin.snapshot')
+        storage = MemoryStorage(bin_ttl=100)
+        bins = [storage.create_bin(owner_email='me@example.com') for _ in range(5)]
+        for i, bin in enumerate(bins):
+            for _ in range(i):
+                storage.create_request(bin, make_request(100))
+        expired = storage.create_bin()
+        expired.created -= 101
+
+        assert storage.save_snapshot(path) == 5
+        assert storage.save_snapshot(path) is None
+        assert os.listdir(os.path.dirname(path)) == ['requestbin.snapshot']
+        print("  ✓ Live bins written atomically, unchanged storage skipped")
+
+        restored = MemoryStorage(bin_ttl=100)
+        assert restored.load_snapshot(path) == 5
+        assert list(restored.bins) == [b.name for b in bins]
+        assert [b.request_count for b in restored.bins.values()] == [0, 1, 2, 3, 4]
+        assert restored.bytes_used == storage.bytes_used - expired.size
+        assert restored.request_count == storage.request_count
+        assert [b.name for b in restored.get_bins_by_owner('me@example.com')] == \
+            [b.name for b in reversed(bins)]
+        print("  ✓ Bins, requests, counters and owner index restored")
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(data[:-10])
+        partial = MemoryStorage(bin_ttl=100)
+        assert partial.load_snapshot(path) == 4
+        print("  ✓ Truncated snapshot loads every complete bin")
+        return True
+    except Exception as e:
+        print(f"  ✗ Snapshots - {e}")
+        return False
+
+
+def test_meta_and_pages():
+    """lookup_bin_meta counts requests; get_requests pages newest first"""
+    print("\n7. Metadata lookups and pages:")
+    try:
+        storage = MemoryStorage(bin_ttl=100)
+        bin = storage.create_bin()
+        for n in range(5):
+            request = make_request(10)
+            request.id = str(n)
+            storage.create_request(bin, request)
+
+        meta = storage.lookup_bin_meta(bin.name)
+        assert meta.name == bin.name and meta.request_count == 5
+        assert meta.to_dict()['request_count'] == 5
+        print("  ✓ Metadata lookup reports the request count")
+
+        assert [r.id for r in storage.get_requests(bin.name)] == ['4', '3', '2', '1', '0']
+        assert [r.id for r in storage.get_requests(bin.name, offset=1, limit=2)] == ['3', '2']
+        assert storage.get_requests(bin.name, offset=5) == []
+        for call in (storage.lookup_bin_meta, storage.get_requests):
+            try:
+                call('missing')
+                raise AssertionError(f"{call.__name__} found a missing bin")
+            except KeyError:
+                pass
+        print("  ✓ Pages sliced newest first, KeyError for missing bins")
+        return True
+    except Exception as e:
+        print(f"  ✗ Metadata lookups and pages - {e}")
+        return False
+
+
+def main():
+    print("=" * 60)
+    print("MEMORY STORAGE TESTS")
+    print("=" * 60)
+
+    results = [
+        test_expiry_heap(),
+        test_lazy_expiry_on_lookup(),
+        test_reaper_greenlet(),
+        test_owner_index(),
+        test_memory_budget(),
+        test_snapshot(),
+        test_meta_and_pages(),
+    ]
+
+    print("\n" + "=" * 60)
+    if all(results):
+        print("✅ ALL MEMORY STORAGE TESTS PASSED")
+        return 0
+    print("❌ SOME MEMORY STORAGE TESTS FAILED")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""
+Test the Request and Bin models
+Tests lazy capture, serialization round trips and loading older records
+"""
+
+import os
+import sys
+import pickle
+from io import BytesIO
+
+os.environ['REALM'] = 'local'
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.memory.MemoryStorage'
+
+import msgpack
+
+from requestbin import app, db, config
+from requestbin.models import Bin, Request, RequestBuffer
+
+
+def capture(lazy, **post):
+    """POST to a fresh bin and return the stored request"""
+    Request.lazy = lazy
+    bin = db.create_bin()
+    with app.test_client() as client:
+        client.post(f'/{bin.name}?a=1&a=2&b=', **post)
+    return db.lookup_bin(bin.name).requests[0]
+
+
+def test_lazy_matches_eager():
+    """Lazily parsed fields match eager parsing"""
+    print("\n1. Lazy vs eager capture:")
+    try:
+        cases = [
+            dict(data={'x': 'y', 'z': 'w'}),
+            dict(data=b'{"event": "ping"}', content_type='application/json',
+                 headers={'X-Forwarded-For': '10.0.0.1'}),
+            dict(data={'big': 'q' * 20000, 'tail': 'end'}),
+        ]
+        for post in cases:
+            lazy = capture(True, **post).to_dict()
+            eager = capture(False, **post).to_dict()
+            for key in ('method', 'headers', 'query_string', 'form_data',
+                        'raw', 'content_type', 'content_length', 'remote_addr'):
+                assert lazy[key] == eager[key], f"{key} differs"
+            # Each capture goes to its own bin, so compare past the bin name
+            assert lazy['url'].split('?')[1] == eager['url'].split('?')[1]
+        print(f"  ✓ {len(cases)} payload types parse identically")
+        return True
+    except Exception as e:
+        print(f"  ✗ Lazy capture - {e}")
+        return False
+    finally:
+        Request.lazy = True
+
+
+def test_lazy_fields_are_deferred():
+    """Nothing is parsed until first access"""
+    print("\n2. Deferred parsing:")
+    try:
+        request = capture(True, data={'x': 'y'})
+        assert request._headers is None and request._form_data is None
+        assert request.form_data == (('x', 'y'),)
+        assert request._form_data is not None
+        print("  ✓ Form data parsed on first access and memoized")
+        return True
+    except Exception as e:
+        print(f"  ✗ Deferred parsing - {e}")
+        return False
+
+
+def test_round_trips():
+    """dump()/load() and pickle keep every field"""
+    print("\n3. Serialization round trips:")
+    try:
+        request = capture(True, data={'x': 'y', 'f': (BytesIO(b'data'), 'f.txt')})
+        for codec, loaded in (('msgpack', Request.load(request.dump())),
+                              ('pickle', pickle.loads(pickle.dumps(request)))):
+            assert loaded.to_dict() == request.to_dict(), codec
+            print(f"  ✓ {codec} round trip")
+
+        bin = db.lookup_bin(db.create_bin(private=True).name)
+        bin.add(request)
+        loaded = Bin.load(bin.dump())
+        assert loaded.to_dict() == bin.to_dict()
+        assert loaded.secret_key == bin.secret_key
+        assert isinstance(loaded.color, tuple)
+        print("  ✓ Bin round trip")
+        return True
+    except Exception as e:
+        print(f"  ✗ Round trips - {e}")
+        return False
+
+
+def test_legacy_records():
+    """Records written before __slots__ and lazy capture still load"""
+    print("\n4. Legacy records:")
+    try:
+        legacy = {
+            'id': 'abc123', 'url': 'http://localhost/bin?q=1', 'time': 1700000000.0,
+            'remote_addr': '127.0.0.1', 'method': 'POST',
+            'headers': {'Content-Type': 'application/x-www-form-urlencoded'},
+            'query_string': {'q': '1'}, 'form_data': [['k', 'v']],
+            'body': b'', 'raw': 'k=v', 'path': '/bin',
+            'content_length': 3, 'content_type': 'application/x-www-form-urlencoded',
+        }
+        request = Request.load(msgpack.packb(legacy))
+        assert request.body == b'k=v' and request.raw == 'k=v'
+        assert request.form_data == (('k', 'v'),)
+        assert request.url == legacy['url'] and request.query_string == {'q': '1'}
+        assert request.headers == legacy['headers']
+        assert Request.load(request.dump()).to_dict() == request.to_dict()
+        print("  ✓ Legacy msgpack record loads and re-dumps")
+        return True
+    except Exception as e:
+        print(f"  ✗ Legacy records - {e}")
+        return False
+
+
+def test_binary_body():
+    """Binary payloads are stored once and decoded on demand"""
+    print("\n5. Binary bodies:")
+    try:
+        payload = bytes(range(256)) * 4
+        request = capture(True, data=payload, content_type='application/x-protobuf')
+        assert request.body == payload
+        assert request.raw == "".join(chr(x) for x in payload)
+        assert request.raw is request.raw
+        state = request.__getstate__()
+        assert 'raw' not in state and state['body'] == payload
+        assert Request.load(request.dump()).body == payload
+        print("  ✓ Body persisted once, text view cached")
+
+        request.body, request._raw = "caf\u00e9".encode('utf-8')[:-1], None
+        assert request.raw == "caf"
+        print("  ✓ UTF-8 body capped mid-character decodes cleanly")
+        return True
+    except Exception as e:
+        print(f"  ✗ Binary bodies - {e}")
+        return False
+
+
+def test_request_buffer():
+    """Bins keep the newest max_requests requests in a ring buffer"""
+    print("\n6. Request ring buffer:")
+    try:
+        buffer = RequestBuffer(3)
+        evicted = [buffer.append(n) for n in range(5)]
+        assert evicted == [None, None, None, 0, 1]
+        assert list(buffer) == [4, 3, 2] and buffer[0] == 4 and buffer[-1] == 2
+        assert buffer[1:] == [3, 2] and list(reversed(buffer)) == [2, 3, 4]
+        assert buffer.resize(2) == [2] and list(buffer) == [4, 3]
+        print("  ✓ Newest-first iteration, indexing, slicing and eviction")
+
+        Bin.max_requests = 5
+        bin = Bin()
+        added = [bin.add(capture(True, data={'n': str(n)})) for n in range(8)]
+        assert bin.request_count == 5
+        assert list(bin.requests) == added[::-1][:5]
+        Bin.max_requests = 2
+        bin.add(added[0])
+        assert bin.request_count == 2
+        loaded = Bin.load(bin.dump())
+        assert [r.id for r in loaded.requests] == [added[0].id, added[7].id]
+        print("  ✓ Bin.add trims to max_requests, including when it shrinks")
+        return True
+    except Exception as e:
+        print(f"  ✗ Request buffer - {e}")
+        return False
+    finally:
+        Bin.max_requests = config.MAX_REQUESTS
+
+
+def main():
+    print("=" * 60)
+    print("MODEL TESTS")
+    print("=" * 60)
+
+    results = [
+        test_lazy_matches_eager(),
+        test_lazy_fields_are_deferred(),
+        test_round_trips(),
+        test_legacy_records(),
+        test_binary_body(),
+        test_request_buffer(),
+    ]
+
+    print("\n" + "=" * 60)
+    if all(results):
+        print("✅ ALL MODEL TESTS PASSED")
+        return 0
+    print("❌ SOME MODEL TESTS FAILED")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+"""
+Test the PostgreSQL storage backend
+Tests the single-statement request insert: per-item counts, trimming to
+MAX_REQUESTS and the global counter, id ordering with many greenlets
+writing to one bin at once, metadata lookups with paged request reads, the
+leader-elected expiry reaper and cursor-paged owner summaries
+
+Needs a PostgreSQL server reachable with the POSTGRES_* settings; the tests
+are skipped when none is. Bins are created with random names and expire on
+their own.
+"""
+
+# As under gunicorn's gevent worker; the connection pool's lock must yield
+from gevent import monkey
+monkey.patch_all()
+
+import os
+import sys
+
+import gevent
+import gevent.socket
+import psycopg2.extensions
+
+os.environ['REALM'] = 'local'
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.memory.MemoryStorage'
+
+from requestbin import config
+from requestbin.models import Bin, Request
+from requestbin.storage.postgresql import PostgreSQLStorage
+
+
+def make_request(n):
+    request = Request()
+    request.id, request.body = str(n), b'n=%d' % n
+    return request
+
+
+def gevent_wait(conn):
+    """psycopg2 wait callback that yields to other greenlets on I/O"""
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+        elif state == psycopg2.extensions.POLL_READ:
+            gevent.socket.wait_read(conn.fileno())
+        elif state == psycopg2.extensions.POLL_WRITE:
+            gevent.socket.wait_write(conn.fileno())
+
+
+def count_rows(storage, bin):
+    conn = storage._get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM requests WHERE bin_name = %s", (bin.name,))
+            return cursor.fetchone()[0]
+    finally:
+        conn.rollback()
+        storage._put_connection(conn)
+
+
+def test_batch_insert(storage):
+    """A batch is stored by one add_requests() call"""
+    print("\n1. Single-statement insert:")
+    max_requests = config.MAX_REQUESTS
+    try:
+        config.MAX_REQUESTS = Bin.max_requests = 5
+        bin, other = storage.create_bin(), storage.create_bin()
+        total = storage.count_requests()
+        counts = storage.create_requests(
+            [(bin, make_request(n)) for n in range(8)] + [(other, make_request(8)), (Bin(), make_request(9))])
+        assert counts == [1, 2, 3, 4, 5, 5, 5, 5, 1, None], counts
+        assert storage.count_requests() == total + 9
+        print("  ✓ Counts returned per item, None for unknown bins")
+
+        assert [r.id for r in storage.lookup_bin(bin.name).requests] == ['7', '6', '5', '4', '3']
+        assert count_rows(storage, bin) == 5
+        print("  ✓ Rows past MAX_REQUESTS never written")
+
+        for n in range(10, 13):
+            assert storage.create_request(bin, make_request(n)) == 5
+        assert [r.id for r in storage.lookup_bin(bin.name).requests] == ['12', '11', '10', '7', '6']
+        assert count_rows(storage, bin) == 5
+        assert storage.create_request(other, make_request(13)) == 2
+        print("  ✓ Single requests appended and the oldest trimmed")
+        return True
+    except Exception as e:
+        print(f"  ✗ Single-statement insert - {e}")
+        return False
+    finally:
+        config.MAX_REQUESTS = Bin.max_requests = max_requests
+
+
+def test_concurrent_writers():
+    """Many greenlets writing to one bin keep it ordered and trimmed"""
+    print("\n2. Concurrent writers:")
+    max_requests = config.MAX_REQUESTS
+    # Several pools, like several workers, so writers really overlap
+    storages = [PostgreSQLStorage(bin_ttl=3600) for _ in range(4)]
+    psycopg2.extensions.set_wait_callback(gevent_wait)
+    try:
+        config.MAX_REQUESTS = Bin.max_requests = 10
+        bin = storages[0].create_bin()
+
+        def writer(storage, n):
+            counts = []
+            for i in range(10):
+                if i % 3:
+                    counts.append(storage.create_request(bin, make_request(n * 100 + i)))
+                else:
+                    counts.extend(storage.create_requests(
+                        [(bin, make_request(n * 100 + i)), (bin, make_request(n * 100 + 50 + i))]))
+            return counts
+
+        writers = [gevent.spawn(writer, storages[n % len(storages)], n) for n in range(24)]
+        gevent.joinall(writers, raise_error=True)
+        written = sum(len(w.value) for w in writers)
+        assert all(count and 1 <= count <= 10 for w in writers for count in w.value)
+        assert storages[0].lookup_bin(bin.name).request_count == 10
+        print(f"  ✓ {written} requests from {len(writers)} greenlets, no errors or deadlocks")
+
+        storages[0].create_request(bin, make_request(9999))
+        conn = storages[0]._get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT request_order FROM requests WHERE bin_name = %s ORDER BY id DESC
+                """, (bin.name,))
+                orders = [order for order, in cursor.fetchall()]
+                cursor.execute("SELECT request_count FROM bins WHERE name = %s", (bin.name,))
+                total, = cursor.fetchone()
+        finally:
+            conn.rollback()
+            storages[0]._put_connection(conn)
+        assert total == written + 1, (total, written)
+        assert orders == list(range(total - 1, total - 11, -1)), orders
+        print("  ✓ Newest MAX_REQUESTS rows kept, id order matches write order")
+        return True
+    except Exception as e:
+        print(f"  ✗ Concurrent writers - {e}")
+        return False
+    finally:
+        psycopg2.extensions.set_wait_callback(None)
+        config.MAX_REQUESTS = Bin.max_requests = max_requests
+
+
+def test_meta_and_pages(storage):
+    """lookup_bin_meta reads the bins row; get_requests one page"""
+    print("\n3. Metadata lookups and pages:")
+    max_requests = config.MAX_REQUESTS
+    try:
+        config.MAX_REQUESTS = Bin.max_requests = 5
+        bin, empty = storage.create_bin(private=True), storage.create_bin()
+        storage.create_requests([(bin, make_request(n)) for n in range(8)])
+
+        meta = storage.lookup_bin_meta(bin.name)
+        assert meta.request_count == 5 and meta.requests == []
+        assert (meta.secret_key, meta.color) == (bin.secret_key, bin.color)
+        assert storage.lookup_bin_meta(empty.name).request_count == 0
+        print("  ✓ Count capped at MAX_REQUESTS, no request rows read")
+
+        assert [r.id for r in storage.get_requests(bin.name, offset=1, limit=3)] == ['6', '5', '4']
+        assert [r.id for r in storage.get_requests(bin.name)] == ['7', '6', '5', '4', '3']
+        assert storage.get_requests(empty.name) == []
+        for call in (storage.lookup_bin_meta, storage.get_requests):
+            try:
+                call('missing-' + bin.name)
+                raise AssertionError(f"{call.__name__} found a missing bin")
+            except KeyError:
+                pass
+        print("  ✓ Pages newest first, [] for empty bins, KeyError for missing ones")
+        return True
+    except Exception as e:
+        print(f"  ✗ Metadata lookups and pages - {e}")
+        return False
+    finally:
+        config.MAX_REQUESTS = Bin.max_requests = max_requests
+
+
+def expire(storage, bins):
+    conn = storage._get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE bins SET expires_at = NOW() - INTERVAL '1 minute' "
+                           "WHERE name = ANY(%s)", ([bin.name for bin in bins],))
+        conn.commit()
+    finally:
+        storage._put_connection(conn)
+
+
+def test_reaper(storage):
+    """Reads skip expired bins; one leader deletes them in batches"""
+    print("\n4. Expiry reaper:")
+    first, second = PostgreSQLStorage(bin_ttl=3600), PostgreSQLStorage(bin_ttl=3600)
+    try:
+        bins = [storage.create_bin() for _ in range(5)]
+        storage.create_request(bins[0], make_request(1))
+        storage.create_request(bins[1], make_request(2))
+        bins_before = storage.count_bins()
+        expire(storage, bins)
+        for call in (storage.lookup_bin, storage.lookup_bin_meta):
+            try:
+                call(bins[0].name)
+                raise AssertionError(f"{call.__name__} returned an expired bin")
+            except KeyError:
+                pass
+        assert storage.count_bins() == bins_before - 5
+        assert count_rows(storage, bins[0]) == 1
+        print("  ✓ Reads filter expired bins without deleting them")
+
+        reused = storage.create_bin(custom_name=bins[1].name)
+        assert storage.lookup_bin(reused.name).requests == [] and count_rows(storage, reused) == 0
+        expire(storage, [reused])
+        print("  ✓ An expired custom name can be taken again before the reaper runs")
+
+        assert first._lead() and first._lead()
+        assert not second._lead()
+        print("  ✓ Advisory lock elects a single reaper")
+
+        first.reaper_batch = 2
+        assert first._reap() >= 5
+        assert first.reaper_batches >= 3 and first.reaped_bins >= 5
+        assert count_rows(storage, bins[0]) == 0
+        stats = first.storage_stats()['reaper']
+        assert stats['leader'] and stats['lag_seconds'] == 0 and stats['last_sweep']
+        print("  ✓ Expired bins and their requests deleted in batches, lag reported")
+
+        first._resign()
+        assert second._lead() and not first._lead()
+        print("  ✓ Leadership passes on when the leader lets go")
+        return True
+    except Exception as e:
+        print(f"  ✗ Expiry reaper - {e}")
+        return False
+    finally:
+        first._resign()
+        second._resign()
+
+
+def add_user(storage, email):
+    """A users row for the owner_email foreign key, where the schema has one"""
+    conn = storage._get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('users')")
+            if cursor.fetchone()[0]:
+                cursor.execute("INSERT INTO users (email, password_hash) VALUES (%s, 'x')", (email,))
+        conn.commit()
+    finally:
+        storage._put_connection(conn)
+
+
+def remove_user(storage, email):
+    conn = storage._get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM bins WHERE owner_email = %s", (email,))
+            cursor.execute("SELECT to_regclass('users')")
+            if cursor.fetchone()[0]:
+                cursor.execute("DELETE FROM users WHERE email = %s", (email,))
+        conn.commit()
+    finally:
+        storage._put_connection(conn)
+
+
+def test_owner_summaries(storage):
+    """list_bins_by_owner pages the owner's bins rows by cursor"""
+    print("\n5. Owner summaries:")
+    email = f'owner-{os.urandom(4).hex()}@example.com'
+    max_requests = config.MAX_REQUESTS
+    try:
+        config.MAX_REQUESTS = Bin.max_requests = 5
+        add_user(storage, email)
+        owned = [storage.create_bin(owner_email=email) for _ in range(7)]
+        storage.create_bin()
+        storage.create_requests([(owned[0], make_request(n)) for n in range(8)])
+
+        first = storage.list_bins_by_owner(email, limit=4)
+        rest = storage.list_bins_by_owner(email, limit=4, before=first[-1].cursor)
+        assert [b.name for b in first + rest] == [b.name for b in reversed(owned)]
+        assert storage.list_bins_by_owner(email, before=rest[-1].cursor) == []
+        print("  ✓ Newest first, paged by (created, name) cursor")
+
+        assert rest[-1].request_count == 5 and rest[-1].last_activity >= rest[-1].created
+        assert first[0].request_count == 0 and first[0].last_activity == first[0].created
+        assert first[0].color == owned[-1].color and not first[0].private
+        assert [b.name for b in storage.get_bins_by_owner(email, limit=2)] == [b.name for b in first[:2]]
+        assert [r.id for r in storage.get_bins_by_owner(email)[-1].requests] == ['7', '6', '5', '4', '3']
+        print("  ✓ Counts capped at MAX_REQUESTS, last activity from the newest request")
+        return True
+    except Exception as e:
+        print(f"  ✗ Owner summaries - {e}")
+        return False
+    finally:
+        config.MAX_REQUESTS = Bin.max_requests = max_requests
+        remove_user(storage, email)
+
+
+def main():
+    print("=" * 60)
+    print("POSTGRESQL STORAGE TESTS")
+    print("=" * 60)
+
+    try:
+        storage = PostgreSQLStorage(bin_ttl=3600)
+    except Exception as e:
+        print(f"\n⚠️  PostgreSQL not available, skipping ({e})")
+        return 0
+
+    results = [
+        test_batch_insert(storage),
+        test_concurrent_writers(),
+        test_meta_and_pages(storage),
+        test_reaper(storage),
+        test_owner_summaries(storage),
+    ]
+
+    print("\n" + "=" * 60)
+    if all(results):
+        print("✅ ALL POSTGRESQL STORAGE TESTS PASSED")
+        return 0
+    print("❌ SOME POSTGRESQL STORAGE TESTS FAILED")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Test streaming, size-capped body capture (WSGIRawBody)
+Tests large bodies, chunked uploads, form parsing from the spooled stream
+and that only form bodies are spooled
+"""
+
+import os
+import sys
+from io import BytesIO
+
+os.environ['REALM'] = 'local'
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.memory.MemoryStorage'
+
+from requestbin import app, db, config, WSGIRawBody
+
+
+def test_large_body_is_capped():
+    """Only MAX_RAW_SIZE bytes of a large body are kept"""
+    print("\n1. Large body capture:")
+    try:
+        bin = db.create_bin()
+        payload = b"x" * (config.MAX_RAW_SIZE * 5)
+        with app.test_client() as client:
+            response = client.post(f'/{bin.name}', data=payload,
+                                   content_type='application/octet-stream')
+        assert response.status_code == 200
+        request = db.lookup_bin(bin.name).requests[0]
+        assert len(request.body) == config.MAX_RAW_SIZE
+        assert len(request.raw) == config.MAX_RAW_SIZE
+        assert request.content_length == len(payload)
+        print(f"  ✓ Stored {len(request.body)} of {request.content_length} bytes")
+        return True
+    except Exception as e:
+        print(f"  ✗ Large body capture - {e}")
+        return False
+
+
+def test_form_parsing_uses_full_body():
+    """Form fields beyond MAX_RAW_SIZE are still parsed"""
+    print("\n2. Form parsing from spooled stream:")
+    try:
+        bin = db.create_bin()
+        filler = "a" * (config.MAX_RAW_SIZE * 2)
+        with app.test_client() as client:
+            client.post(f'/{bin.name}', data={'filler': filler, 'last': 'field'})
+        request = db.lookup_bin(bin.name).requests[0]
+        fields = dict(request.form_data)
+        assert fields.get('last') == 'field'
+        assert len(request.raw) == config.MAX_RAW_SIZE
+        print("  ✓ Trailing form field parsed")
+        return True
+    except Exception as e:
+        print(f"  ✗ Form parsing - {e}")
+        return False
+
+
+def test_chunked_without_content_length():
+    """Chunked bodies without CONTENT_LENGTH are read to EOF"""
+    print("\n3. Chunked transfer encoding:")
+    try:
+        payload = b"chunk=" + b"x" * 150000
+        environ = {
+            'wsgi.input': BytesIO(payload),
+            'HTTP_TRANSFER_ENCODING': 'chunked',
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        }
+        WSGIRawBody(None).capture(environ)
+        assert environ['raw.length'] == len(payload)
+        assert environ['raw'] == payload[:config.MAX_RAW_SIZE]
+        assert environ['wsgi.input'].read() == payload
+        print("  ✓ Chunked form body captured and re-streamed")
+
+        environ = {'wsgi.input': BytesIO(b"never read")}
+        WSGIRawBody(None).capture(environ)
+        assert environ['raw'] == b"" and environ['raw.length'] == 0
+        print("  ✓ Body without length or chunking is left unread")
+        return True
+    except Exception as e:
+        print(f"  ✗ Chunked capture - {e}")
+        return False
+
+
+def test_digest():
+    """Optional digest covers the whole body"""
+    print("\n4. Body digest:")
+    try:
+        import hashlib
+        payload = b"digest me" * 5000
+        middleware = WSGIRawBody(None)
+        middleware.digest = 'sha256'
+        environ = {'wsgi.input': BytesIO(payload), 'CONTENT_LENGTH': str(len(payload))}
+        middleware.capture(environ)
+        assert environ['raw.digest'] == hashlib.sha256(payload).hexdigest()
+        print("  ✓ sha256 digest of full body recorded")
+        return True
+    except Exception as e:
+        print(f"  ✗ Body digest - {e}")
+        return False
+
+
+def test_only_forms_are_spooled():
+    """Non-form bodies are counted and hashed, not copied"""
+    print("\n5. Spooling only forms:")
+    try:
+        payload = b"\x00binary" * 50000
+        environ = {'wsgi.input': BytesIO(payload), 'CONTENT_LENGTH': str(len(payload)),
+                   'CONTENT_TYPE': 'application/octet-stream'}
+        WSGIRawBody(None).capture(environ)
+        assert environ['raw.length'] == len(payload)
+        assert environ['raw'] == payload[:config.MAX_RAW_SIZE]
+        assert isinstance(environ['wsgi.input'], BytesIO)
+        assert environ['wsgi.input'].read() == b"" and environ['wsgi.input_terminated']
+        print("  ✓ Large binary body counted without a spooled copy")
+
+        environ = {'wsgi.input': BytesIO(b'{"a": 1}'), 'CONTENT_LENGTH': '8',
+                   'CONTENT_TYPE': 'application/json'}
+        WSGIRawBody(None).capture(environ)
+        assert environ['wsgi.input'].read() == b'{"a": 1}'
+        print("  ✓ A body that fits in the head is still readable")
+        return True
+    except Exception as e:
+        print(f"  ✗ Spooling only forms - {e}")
+        return False
+
+
+def main():
+    print("=" * 60)
+    print("RAW BODY CAPTURE TESTS")
+    print("=" * 60)
+
+    results = [
+        test_large_body_is_capped(),
+        test_form_parsing_uses_full_body(),
+        test_chunked_without_content_length(),
+        test_digest(),
+        test_only_forms_are_spooled(),
+    ]
+
+    print("\n" + "=" * 60)
+    if all(results):
+        print("✅ ALL RAW BODY TESTS PASSED")
+        return 0
+    print("❌ SOME RAW BODY TESTS FAILED")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
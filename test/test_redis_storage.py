@@ -0,0 +1,451 @@
+#!/usr/bin/env python
+"""
+Test the Redis storage backend
+Tests the owner index used by get_bins_by_owner, the per-request list
+layout, pipelined batches, connection pool metrics, the bin registry and
+counters behind the stats, the Redis Streams backend, the hash-tagged
+key layout used on a Redis Cluster, and metadata lookups with paged
+request reads
+
+Needs a Redis server at REDIS_HOST:REDIS_PORT (localhost:6379 by default);
+the tests are skipped when none is reachable. Keys are written under a
+throwaway prefix and removed afterwards.
+"""
+
+import os
+import sys
+import time
+import threading
+from unittest import mock
+
+import redis
+from redis.crc import key_slot
+
+os.environ['REALM'] = 'local'
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.memory.MemoryStorage'
+
+from requestbin import config
+from requestbin.models import Bin, Request
+from requestbin.storage.redis import RedisStorage, RedisStreamsStorage
+from requestbin.util import ulid
+
+
+def make_storage(bin_ttl=3600, klass=RedisStorage):
+    storage = klass(bin_ttl)
+    storage.prefix = 'requestbin-test-{}'.format(ulid(16))
+    return storage
+
+
+def make_request(n):
+    request = Request()
+    request.id, request.body = str(n), b'n=%d' % n
+    return request
+
+
+def cleanup(storage):
+    keys = storage.redis.keys('{}*'.format(storage.prefix))
+    if keys:
+        storage.redis.delete(*keys)
+
+
+def test_owner_index(storage):
+    """Owner lookups read only that owner's bins, newest first"""
+    print("\n1. Owner index:")
+    try:
+        mine = [storage.create_bin(owner_email='me@example.com') for _ in range(12)]
+        storage.create_bin(owner_email='other@example.com')
+        storage.create_bin()
+
+        bins = storage.get_bins_by_owner('me@example.com')
+        assert [b.name for b in bins] == [b.name for b in reversed(mine)]
+        recent = storage.get_bins_by_owner('me@example.com', limit=10)
+        assert [b.name for b in recent] == [b.name for b in reversed(mine)][:10]
+        assert storage.count_bins() == 14
+        print("  ✓ 12 owned bins returned newest first, limit respected")
+
+        # Own prefix, so the request counters later tests check stay as they are
+        listing = make_storage()
+        try:
+            owned = [listing.create_bin(owner_email='me@example.com') for _ in range(8)]
+            before = time.time()
+            listing.create_request(owned[0], make_request(1))
+            first = listing.list_bins_by_owner('me@example.com', limit=5)
+            rest = listing.list_bins_by_owner('me@example.com', before=first[-1].cursor)
+            assert [b.name for b in first + rest] == [b.name for b in reversed(owned)]
+            assert rest[-1].request_count == 1 and rest[-1].last_activity >= before
+            assert first[0].request_count == 0 and first[0].last_activity == owned[-1].created
+            assert first[0].color == owned[-1].color
+            print("  ✓ Summaries paged by cursor, request counts and last activity")
+
+            # Bins created in the same instant are paged by name
+            with mock.patch('time.time', return_value=time.time()):
+                tied = [listing.create_bin(owner_email='tied@example.com') for _ in range(5)]
+            pages = [listing.list_bins_by_owner('tied@example.com', limit=2)]
+            while pages[-1]:
+                pages.append(listing.list_bins_by_owner('tied@example.com', limit=2,
+                                                        before=pages[-1][-1].cursor))
+            assert [b.name for page in pages for b in page] == sorted((b.name for b in tied), reverse=True)
+            print("  ✓ Bins created together neither skipped nor repeated")
+
+            listing.create_bin(private=True, custom_name='hook', owner_email='alice@example.com')
+            taken = listing.create_bin(custom_name='hook', owner_email='mallory@example.com')
+            assert listing.list_bins_by_owner('alice@example.com') == []
+            assert listing.get_bins_by_owner('alice@example.com') == []
+            assert [b.name for b in listing.list_bins_by_owner('mallory@example.com')] == [taken.name]
+            # An index entry left behind by a racing writer is skipped and pruned
+            listing.redis.zadd(listing._owner_key('alice@example.com'), {'hook': taken.created})
+            assert listing.list_bins_by_owner('alice@example.com') == []
+            listing.redis.zadd(listing._owner_key('alice@example.com'), {'hook': taken.created})
+            assert listing.get_bins_by_owner('alice@example.com') == []
+            assert listing.redis.zcard(listing._owner_key('alice@example.com')) == 0
+            print("  ✓ A reused custom name leaves its previous owner's index")
+        finally:
+            cleanup(listing)
+
+        storage.redis.delete(storage._key(mine[-1].name))
+        bins = storage.get_bins_by_owner('me@example.com')
+        assert mine[-1].name not in [b.name for b in bins]
+        assert storage.redis.zcard(storage._owner_key('me@example.com')) == 11
+        print("  ✓ Deleted bins pruned from the index")
+        return True
+    except Exception as e:
+        print(f"  ✗ Owner index - {e}")
+        return False
+
+
+def test_owner_index_expiry(storage):
+    """Index entries past the bin TTL are dropped"""
+    print("\n2. Owner index expiry:")
+    try:
+        storage.bin_ttl = 1
+        storage.create_bin(owner_email='ttl@example.com')
+        time.sleep(1.1)
+        assert storage.get_bins_by_owner('ttl@example.com') == []
+        assert storage.redis.zcard(storage._owner_key('ttl@example.com')) == 0
+        print("  ✓ Expired bins removed from the index")
+        return True
+    except Exception as e:
+        print(f"  ✗ Owner index expiry - {e}")
+        return False
+
+
+def test_request_list(storage):
+    """Requests are pushed one at a time onto a capped list"""
+    print("\n3. Request list layout:")
+    max_requests = config.MAX_REQUESTS
+    try:
+        config.MAX_REQUESTS = 3
+        storage.bin_ttl = 3600
+        bin = storage.create_bin()
+        # Two workers holding stale copies of the bin lose nothing
+        first, second = storage.lookup_bin(bin.name), storage.lookup_bin(bin.name)
+        assert storage.create_request(first, make_request(1)) == 1
+        assert storage.create_request(second, make_request(2)) == 2
+        assert [r.id for r in storage.lookup_bin(bin.name).requests] == ['2', '1']
+        print("  ✓ Concurrent writers to one bin both kept")
+
+        for n in range(3, 6):
+            storage.create_request(bin, make_request(n))
+        loaded = storage.lookup_bin(bin.name)
+        assert [r.id for r in loaded.requests] == ['5', '4', '3']
+        assert loaded.color == bin.color and loaded.requests[0].body == b'n=5'
+        assert storage.redis.llen(storage._requests_key(bin.name)) == 3
+        assert storage.redis.ttl(storage._requests_key(bin.name)) > 0
+        print("  ✓ List capped at MAX_REQUESTS and expiring with the bin")
+
+        assert storage.create_request(Bin(), make_request(6)) is None
+        assert storage.count_requests() == 5
+        print("  ✓ Requests for unknown bins dropped")
+        return True
+    except Exception as e:
+        print(f"  ✗ Request list layout - {e}")
+        return False
+    finally:
+        config.MAX_REQUESTS = max_requests
+
+
+def test_legacy_bins(storage):
+    """Bins stored as one Bin.dump() string are read and converted"""
+    print("\n4. Legacy bins:")
+    try:
+        bin = Bin(owner_email='legacy@example.com')
+        bin.add(make_request(1))
+        key = storage._key(bin.name)
+        storage.redis.set(key, bin.dump())
+        storage.redis.expire(key, 3600)
+        storage.redis.zadd(storage._owner_key('legacy@example.com'), {bin.name: bin.created})
+
+        assert [r.id for r in storage.lookup_bin(bin.name).requests] == ['1']
+        assert [b.name for b in storage.get_bins_by_owner('legacy@example.com')] == [bin.name]
+        print("  ✓ Legacy bins readable")
+
+        assert storage.create_request(bin, make_request(2)) == 2
+        assert storage.redis.type(key) == b'hash' and storage.redis.ttl(key) > 0
+        assert [r.id for r in storage.lookup_bin(bin.name).requests] == ['2', '1']
+        print("  ✓ Converted on their next request")
+
+        unindexed = Bin(owner_email='unindexed@example.com')
+        storage.redis.set(storage._key(unindexed.name), unindexed.dump(), ex=3600)
+        assert storage.list_bins_by_owner('unindexed@example.com') == []
+        assert storage.create_request(unindexed, make_request(3)) == 1
+        owner_key = storage._owner_key('unindexed@example.com')
+        assert [b.name for b in storage.list_bins_by_owner('unindexed@example.com')] == [unindexed.name]
+        assert [b.name for b in storage.get_bins_by_owner('unindexed@example.com')] == [unindexed.name]
+        assert 3500 < storage.redis.ttl(owner_key) <= 3600
+        print("  ✓ Conversion adds the bin to its owner's index")
+        return True
+    except Exception as e:
+        print(f"  ✗ Legacy bins - {e}")
+        return False
+
+
+def test_pipelined_batches(storage):
+    """Batches are pushed in one pipeline and survive a script flush"""
+    print("\n5. Pipelined batches:")
+    try:
+        first, second = storage.create_bin(), storage.create_bin()
+        counts = storage.create_requests([(first, make_request(1)), (second, make_request(2)),
+                                          (first, make_request(3)), (Bin(), make_request(4))])
+        assert counts == [1, 1, 2, None], counts
+        assert [r.id for r in storage.lookup_bin(first.name).requests] == ['3', '1']
+        print("  ✓ Counts returned per item from one batch")
+
+        storage.redis.script_flush()
+        assert storage.create_request(second, make_request(5)) == 2
+        print("  ✓ Script reloaded after the server lost it")
+        return True
+    except Exception as e:
+        print(f"  ✗ Pipelined batches - {e}")
+        return False
+
+
+def test_pool_metrics(storage):
+    """Pool checkouts, waits and saturation are reported"""
+    print("\n6. Connection pool metrics:")
+    try:
+        stats = storage.storage_stats()['pool']
+        assert stats['checkouts'] > 0 and stats['in_use'] == 0 and stats['peak_in_use'] >= 1
+        assert stats['max_connections'] == storage.pool.max_connections
+        print(f"  ✓ {stats['checkouts']} checkouts, avg wait {stats['avg_wait_ms']:.3f} ms")
+
+        pool = type(storage.pool)(max_connections=1, timeout=0.05,
+                                  connection_class=storage.pool.connection_class,
+                                  **storage.pool.connection_kwargs)
+        held = pool.get_connection()
+        try:
+            pool.get_connection()
+        except redis.ConnectionError:
+            pass
+        else:
+            raise AssertionError("exhausted pool handed out a connection")
+        stats = pool.stats()
+        assert stats['saturation'] == 1.0 and stats['timeouts'] == 1
+        pool.release(held)
+        assert pool.stats()['in_use'] == 0
+        print("  ✓ Saturation and wait timeouts counted")
+        return True
+    except Exception as e:
+        print(f"  ✗ Connection pool metrics - {e}")
+        return False
+
+
+def test_registry_and_counters():
+    """Stats come from the bin registry and counters, never a KEYS scan"""
+    print("\n7. Bin registry and counters:")
+    storage = make_storage(bin_ttl=1)
+    try:
+        def no_keys(*args, **kwargs):
+            raise AssertionError("KEYS scan")
+        storage.redis.keys = no_keys
+
+        storage.create_bin(owner_email='stats@example.com')
+        storage.bin_ttl = 3600
+        bins = [storage.create_bin(owner_email='stats@example.com') for _ in range(2)]
+        assert storage.count_bins() == 3
+        time.sleep(1.1)
+        assert storage.count_bins() == 2
+        assert storage.redis.zcard(storage._bins_key()) == 2
+        print("  ✓ Expired bins dropped from the registry as they are counted")
+
+        requests = [make_request(n) for n in range(4)]
+        storage.create_requests([(bins[n % 2], r) for n, r in enumerate(requests)])
+        size = sum(len(r.dump()) for r in requests) / len(requests) / 1024
+        assert storage.count_requests() == 4
+        assert abs(storage.avg_req_size() - size) < 1e-9
+        assert len(storage.get_bins_by_owner('stats@example.com')) == 2
+        print("  ✓ Request and byte counters kept at write time")
+        return True
+    except Exception as e:
+        print(f"  ✗ Bin registry and counters - {e}")
+        return False
+    finally:
+        del storage.redis.keys
+        cleanup(storage)
+
+
+def test_streams():
+    """Streams keep each bin's requests with paging and blocking tails"""
+    print("\n8. Redis Streams backend:")
+    storage = make_storage(klass=RedisStreamsStorage)
+    max_requests = config.MAX_REQUESTS
+    try:
+        config.MAX_REQUESTS = 5
+        bin = storage.create_bin(owner_email='streams@example.com')
+        counts = storage.create_requests([(bin, make_request(n)) for n in range(8)])
+        assert counts == [1, 2, 3, 4, 5, 5, 5, 5], counts
+        loaded = storage.lookup_bin(bin.name)
+        assert [r.id for r in loaded.requests] == ['7', '6', '5', '4', '3']
+        assert storage.get_bins_by_owner('streams@example.com')[0].request_count == 5
+        assert storage.create_request(Bin(), make_request(9)) is None
+        print("  ✓ Requests appended to a capped stream")
+
+        first = storage.read_requests(bin.name, count=3)
+        second = storage.read_requests(bin.name, before=first[-1][0], count=3)
+        assert [r.id for _, r in first + second] == ['7', '6', '5', '4', '3', '2']
+        print("  ✓ Pages read back by cursor")
+
+        cursor = storage.last_cursor(bin.name)
+        assert storage.tail_requests(bin.name, cursor, timeout=0.1) == (cursor, None, [])
+        writer = threading.Timer(0.2, storage.create_request, (bin, make_request(10)))
+        writer.start()
+        cursor, count, requests = storage.tail_requests(bin.name, cursor, timeout=5)
+        writer.join()
+        assert [r.id for r in requests] == ['10'] and count == 5
+        assert storage.tail_requests(bin.name, cursor, timeout=0.1)[2] == []
+        print("  ✓ Blocking tail returns new requests as they arrive")
+
+        legacy = Bin()
+        legacy.add(make_request(11))
+        legacy.add(make_request(12))
+        storage.redis.set(storage._key(legacy.name), legacy.dump(), ex=3600)
+        assert storage.create_request(legacy, make_request(13)) == 3
+        assert storage.redis.type(storage._requests_key(legacy.name)) == b'stream'
+        assert [r.id for r in storage.lookup_bin(legacy.name).requests] == ['13', '12', '11']
+        assert storage.redis.xlen(storage._requests_key(legacy.name)) == 3
+        print("  ✓ Legacy bins converted to a stream before the first write")
+        return True
+    except Exception as e:
+        print(f"  ✗ Redis Streams backend - {e}")
+        return False
+    finally:
+        config.MAX_REQUESTS = max_requests
+        cleanup(storage)
+
+
+def test_cluster_layout():
+    """Cluster keys keep each bin in one slot and shard the counters"""
+    print("\n9. Cluster key layout:")
+    # Tagged keys work unchanged on a single node, which is all we need
+    # to check where they land
+    storage = make_storage()
+    storage.cluster, storage.cluster_shards = True, 8
+    try:
+        bins = [storage.create_bin(owner_email='cluster@example.com') for _ in range(12)]
+        for bin in bins:
+            tag = storage._tag(bin.name)
+            slots = {key_slot(key.encode()) for key in (
+                storage._key(bin.name), storage._requests_key(bin.name),
+                storage._request_count_key(tag), storage._bins_key(tag))}
+            assert len(slots) == 1, slots
+        assert len({storage._tag(bin.name) for bin in bins}) > 1
+        print("  ✓ A bin's keys and its shard's counters share one slot")
+
+        counts = storage.create_requests([(bin, make_request(n)) for n, bin in enumerate(bins)])
+        assert counts == [1] * len(bins), counts
+        counters = [storage.redis.get(storage._request_count_key(tag)) for tag in storage._tags()]
+        assert len([c for c in counters if c]) > 1
+        assert storage.count_requests() == len(bins) and storage.count_bins() == len(bins)
+        assert storage.avg_req_size() > 0
+        print("  ✓ Counters and registry sharded, summed on read")
+
+        listed = storage.get_bins_by_owner('cluster@example.com')
+        assert [b.name for b in listed] == [b.name for b in reversed(bins)]
+        assert all(b.request_count == 1 for b in listed)
+        print("  ✓ Owner listing reads bins across shards")
+        return True
+    except Exception as e:
+        print(f"  ✗ Cluster key layout - {e}")
+        return False
+    finally:
+        cleanup(storage)
+
+
+def test_meta_and_pages():
+    """lookup_bin_meta reads the bin hash and a length; get_requests one page"""
+    print("\n10. Metadata lookups and pages:")
+    storages = [make_storage(), make_storage(klass=RedisStreamsStorage)]
+    max_requests = config.MAX_REQUESTS
+    try:
+        config.MAX_REQUESTS = 5
+        for storage in storages:
+            bin = storage.create_bin(private=True)
+            storage.create_requests([(bin, make_request(n)) for n in range(8)])
+            meta = storage.lookup_bin_meta(bin.name)
+            assert meta.request_count == 5 and meta.requests == []
+            assert (meta.secret_key, meta.color) == (bin.secret_key, bin.color)
+            page = storage.get_requests(bin.name, offset=1, limit=3)
+            assert [r.id for r in page] == ['6', '5', '4'], [r.id for r in page]
+            assert [r.id for r in storage.get_requests(bin.name)] == ['7', '6', '5', '4', '3']
+            for call in (storage.lookup_bin_meta, storage.get_requests):
+                try:
+                    call('missing')
+                    raise AssertionError(f"{call.__name__} found a missing bin")
+                except KeyError:
+                    pass
+        print("  ✓ Count capped at MAX_REQUESTS, pages newest first (lists and streams)")
+
+        storage = storages[0]
+        legacy = Bin()
+        legacy.add(make_request(1))
+        storage.redis.set(storage._key(legacy.name), legacy.dump(), ex=3600)
+        assert storage.lookup_bin_meta(legacy.name).request_count == 1
+        assert [r.id for r in storage.get_requests(legacy.name)] == ['1']
+        print("  ✓ Legacy bins read through lookup_bin")
+        return True
+    except Exception as e:
+        print(f"  ✗ Metadata lookups and pages - {e}")
+        return False
+    finally:
+        config.MAX_REQUESTS = max_requests
+        for storage in storages:
+            cleanup(storage)
+
+
+def main():
+    print("=" * 60)
+    print("REDIS STORAGE TESTS")
+    print("=" * 60)
+
+    storage = make_storage()
+    try:
+        storage.redis.ping()
+    except Exception as e:
+        print(f"\n⚠️  Redis not available, skipping ({e})")
+        return 0
+
+    try:
+        results = [
+            test_owner_index(storage),
+            test_owner_index_expiry(storage),
+            test_request_list(storage),
+            test_legacy_bins(storage),
+            test_pipelined_batches(storage),
+            test_pool_metrics(storage),
+            test_registry_and_counters(),
+            test_streams(),
+            test_cluster_layout(),
+            test_meta_and_pages(),
+        ]
+    finally:
+        cleanup(storage)
+
+    print("\n" + "=" * 60)
+    if all(results):
+        print("✅ ALL REDIS STORAGE TESTS PASSED")
+        return 0
+    print("❌ SOME REDIS STORAGE TESTS FAILED")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+"""
+Test the append-only segment log storage backend
+Tests appends and mapped reads, rebuilding the index from disk, segment
+rollover, whole-file expiry, and metadata lookups with paged request reads
+"""
+
+import os
+import sys
+import glob
+import time
+import tempfile
+
+os.environ['REALM'] = 'local'
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.memory.MemoryStorage'
+
+from requestbin import config
+from requestbin.models import Bin, Request
+from requestbin.storage.segmentlog import SegmentLogStorage
+
+
+def make_storage(path, bin_ttl=3600):
+    SegmentLogStorage.path = path
+    return SegmentLogStorage(bin_ttl=bin_ttl)
+
+
+def make_request(n):
+    request = Request()
+    request.id, request.body = str(n), b'n=%d' % n
+    return request
+
+
+def segment_files(path):
+    return glob.glob(os.path.join(path, 'shard-*', '*.log'))
+
+
+def test_append_and_read():
+    """Requests are appended to segments and read back newest first"""
+    print("\n1. Append and read:")
+    max_requests = config.MAX_REQUESTS
+    try:
+        Bin.max_requests = 5
+        path = tempfile.mkdtemp()
+        storage = make_storage(path)
+        bins = [storage.create_bin(owner_email='log@example.com') for _ in range(4)]
+        for n in range(8):
+            assert storage.create_request(bins[0], make_request(n)) == min(n + 1, 5)
+        storage.create_request(bins[1], make_request(100))
+
+        loaded = storage.lookup_bin(bins[0].name)
+        assert [r.id for r in loaded.requests] == ['7', '6', '5', '4', '3']
+        assert loaded.requests[0].body == b'n=7' and loaded.color == bins[0].color
+        assert storage.count_requests() == 9
+        print("  ✓ Requests decoded from mapped segments, trimmed to the bin size")
+
+        assert len({os.path.dirname(f) for f in segment_files(path)}) > 1
+        listed = storage.get_bins_by_owner('log@example.com', limit=3)
+        assert [b.name for b in listed] == [b.name for b in reversed(bins)][:3]
+        print("  ✓ Bins spread over shards, owner listing newest first")
+        return True
+    except Exception as e:
+        print(f"  ✗ Append and read - {e}")
+        return False
+    finally:
+        Bin.max_requests = max_requests
+
+
+def test_replay():
+    """A new storage rebuilds its index from the segments on disk"""
+    print("\n2. Replay:")
+    try:
+        path = tempfile.mkdtemp()
+        storage = make_storage(path)
+        bin = storage.create_bin(private=True, owner_email='replay@example.com')
+        for n in range(3):
+            storage.create_request(bin, make_request(n))
+
+        restarted = make_storage(path)
+        loaded = restarted.lookup_bin(bin.name)
+        assert [r.id for r in loaded.requests] == ['2', '1', '0']
+        assert loaded.secret_key == bin.secret_key and loaded.private
+        assert [b.name for b in restarted.get_bins_by_owner('replay@example.com')] == [bin.name]
+        assert restarted.create_request(loaded, make_request(3)) == 4
+        print("  ✓ Bins and requests restored, new requests appended")
+
+        # A record cut short by a crash is ignored
+        last = max(segment_files(path), key=os.path.getmtime)
+        with open(last, 'ab') as f:
+            f.write(b'\x02\x00\x10\x00\x00')
+        again = make_storage(path)
+        assert [r.id for r in again.lookup_bin(bin.name).requests] == ['3', '2', '1', '0']
+        print("  ✓ Truncated tail record skipped")
+
+        other = again.create_bin(owner_email='replay@example.com')
+        request = make_request(4)
+        again.create_request(bin, request)
+        first = again.list_bins_by_owner('replay@example.com', limit=1)
+        rest = again.list_bins_by_owner('replay@example.com', before=first[0].cursor)
+        assert [s.name for s in first + rest] == [other.name, bin.name]
+        assert (first[0].request_count, first[0].last_activity) == (0, other.created)
+        assert (rest[0].request_count, rest[0].last_activity) == (5, request.time)
+        assert rest[0].private and rest[0].color == bin.color
+        print("  ✓ Owner summaries paged by cursor")
+        return True
+    except Exception as e:
+        print(f"  ✗ Replay - {e}")
+        return False
+
+
+def test_rollover_and_expiry():
+    """Segments roll over by size and expire as whole files"""
+    print("\n3. Rollover and expiry:")
+    segment_bytes = SegmentLogStorage.segment_bytes
+    try:
+        SegmentLogStorage.segment_bytes = 1024
+        path = tempfile.mkdtemp()
+        storage = make_storage(path, bin_ttl=60)
+        bin = storage.create_bin()
+        for n in range(40):
+            storage.create_request(bin, make_request(n))
+        files = segment_files(path)
+        assert len(files) > 2, files
+        assert storage.lookup_bin(bin.name).requests[0].id == '39'
+        print(f"  ✓ {len(files)} segments written")
+
+        assert storage._expire(now=time.time() + 30) == 0
+        assert storage._expire(now=time.time() + 61 + storage.segment_seconds) == len(files)
+        assert segment_files(path) == [] and storage.count_bins() == 0
+        try:
+            storage.lookup_bin(bin.name)
+            raise AssertionError("expired bin returned")
+        except KeyError:
+            pass
+        print("  ✓ Expired segments deleted as whole files")
+        return True
+    except Exception as e:
+        print(f"  ✗ Rollover and expiry - {e}")
+        return False
+    finally:
+        SegmentLogStorage.segment_bytes = segment_bytes
+
+
+def test_meta_and_pages():
+    """lookup_bin_meta decodes no requests; get_requests decodes one page"""
+    print("\n4. Metadata lookups and pages:")
+    try:
+        storage = make_storage(tempfile.mkdtemp())
+        bin = storage.create_bin()
+        for n in range(6):
+            storage.create_request(bin, make_request(n))
+
+        meta = storage.lookup_bin_meta(bin.name)
+        assert meta.request_count == 6 and meta.requests == [] and meta.color == bin.color
+        assert storage.create_request(meta, make_request(6)) == 7
+        print("  ✓ Request count from the index, metadata bin accepted for writes")
+
+        assert [r.id for r in storage.get_requests(bin.name, offset=2, limit=3)] == ['4', '3', '2']
+        assert [r.id for r in storage.get_requests(bin.name, offset=5)] == ['1', '0']
+        try:
+            storage.get_requests('missing')
+            raise AssertionError("missing bin paged")
+        except KeyError:
+            pass
+        print("  ✓ Pages decoded newest first, KeyError for missing bins")
+        return True
+    except Exception as e:
+        print(f"  ✗ Metadata lookups and pages - {e}")
+        return False
+
+
+def main():
+    print("=" * 60)
+    print("SEGMENT LOG STORAGE TESTS")
+    print("=" * 60)
+
+    results = [
+        test_append_and_read(),
+        test_replay(),
+        test_rollover_and_expiry(),
+        test_meta_and_pages(),
+    ]
+
+    print("\n" + "=" * 60)
+    if all(results):
+        print("✅ ALL SEGMENT LOG STORAGE TESTS PASSED")
+        return 0
+    print("❌ SOME SEGMENT LOG STORAGE TESTS FAILED")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+"""
+Test the cross-process shared memory storage backend
+Tests the storage server, bins shared between processes, delta lookups,
+metadata lookups with paged request reads, the server's bin versions and
+which calls are retried
+"""
+
+import os
+import sys
+import subprocess
+import tempfile
+import time
+
+os.environ['REALM'] = 'local'
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.memory.MemoryStorage'
+
+import gevent
+from gevent import socket
+
+from requestbin.models import Request
+from requestbin.storage.memory import MemoryStorage
+from requestbin.storage import shared
+from requestbin.storage.shared import SharedMemoryStorage, StorageServer
+
+SOCKET = os.path.join(tempfile.mkdtemp(), 'storage.sock')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_storage():
+    storage = SharedMemoryStorage(bin_ttl=3600)
+    storage.socket_path = SOCKET
+    return storage
+
+
+def make_request(n):
+    request = Request()
+    request.id, request.body = str(n), b'n=%d' % n
+    return request
+
+
+def other_process(code):
+    """Run code against the shared storage from a separate worker process"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, 'test')]))
+    script = ("import test_shared_storage as t\n"
+              f"t.SOCKET = {SOCKET!r}\n"
+              "storage, make_request = t.make_storage(), t.make_request\n" + code)
+    return subprocess.run([sys.executable, '-c', script], env=env, cwd=ROOT,
+                          capture_output=True, text=True, timeout=60)
+
+
+def test_server_start(storage):
+    """The first client starts the storage server"""
+    print("\n1. Storage server:")
+    try:
+        bin = storage.create_bin(owner_email='me@example.com')
+        assert os.path.exists(SOCKET) and storage._server is not None
+        assert storage.lookup_bin(bin.name).name == bin.name
+        print(f"  ✓ Server started on {SOCKET}")
+        return bin
+    except Exception as e:
+        print(f"  ✗ Storage server - {e}")
+        return None
+
+
+def test_shared_between_processes(storage, bin):
+    """Requests written by one process are visible in another"""
+    print("\n2. Bins shared across processes:")
+    try:
+        storage.create_request(bin, make_request(0))
+        result = other_process(
+            f"bin = storage.lookup_bin('{bin.name}')\n"
+            f"storage.create_requests([(bin, make_request(1)), (bin, make_request(2))])\n"
+            f"print(storage.lookup_bin('{bin.name}').request_count)\n")
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip().endswith('3'), result.stdout
+        assert [r.id for r in storage.lookup_bin(bin.name).requests] == ['2', '1', '0']
+        assert [b.name for b in storage.get_bins_by_owner('me@example.com')] == [bin.name]
+        summary, = storage.list_bins_by_owner('me@example.com')
+        assert (summary.name, summary.request_count, summary.color) == (bin.name, 3, bin.color)
+        assert storage.list_bins_by_owner('me@example.com', before=summary.cursor) == []
+        print("  ✓ Requests from another process seen in this one")
+        return True
+    except Exception as e:
+        print(f"  ✗ Shared bins - {e}")
+        return False
+
+
+def test_delta_lookups(storage, bin):
+    """Cached bins are refreshed with only the new requests"""
+    print("\n3. Delta lookups:")
+    try:
+        cached = storage.lookup_bin(bin.name)
+        misses = storage.cache_misses
+        storage.create_request(bin, make_request(3))
+        assert storage.lookup_bin(bin.name) is cached
+        assert cached.requests[0].id == '3'
+        assert storage.cache_misses == misses and storage.cache_deltas >= 1
+        print("  ✓ New requests applied to the cached bin")
+
+        # Concurrent lookups of the same delta apply it once
+        for n in range(4, 8):
+            storage.create_request(bin, make_request(n))
+        jobs = [gevent.spawn(storage.lookup_bin, bin.name) for _ in range(20)]
+        gevent.joinall(jobs, timeout=10)
+        ids = [r.id for r in storage.lookup_bin(bin.name).requests]
+        assert ids == [str(n) for n in range(7, -1, -1)], ids
+        print("  ✓ Concurrent lookups apply each request once")
+
+        stats = storage.storage_stats()
+        assert stats['client_cache']['hits'] > 0 and stats['clients'] >= 1
+        print("  ✓ Cache counters reported")
+        return True
+    except Exception as e:
+        print(f"  ✗ Delta lookups - {e}")
+        return False
+
+
+def test_meta_and_pages(storage, bin):
+    """Metadata and pages are read from the server, bypassing the cache"""
+    print("\n4. Metadata lookups and pages:")
+    try:
+        misses = storage.cache_misses
+        meta = storage.lookup_bin_meta(bin.name)
+        assert meta.request_count == 8 and meta.requests == []
+        assert (meta.created, meta.color) == (bin.created, bin.color)
+        assert storage.create_request(meta, make_request(8)) == 9
+        print("  ✓ Request count sent without the requests")
+
+        assert [r.id for r in storage.get_requests(bin.name, offset=1, limit=3)] == ['7', '6', '5']
+        assert storage.cache_misses == misses
+        try:
+            storage.lookup_bin_meta('missing')
+            raise AssertionError("missing bin found")
+        except KeyError:
+            pass
+        print("  ✓ Pages served newest first, KeyError for missing bins")
+        return True
+    except Exception as e:
+        print(f"  ✗ Metadata lookups and pages - {e}")
+        return False
+
+
+def test_server_versions():
+    """Versions count each request once and go when their bin does"""
+    print("\n5. Server bin versions:")
+    try:
+        memory = MemoryStorage(bin_ttl=3600)
+        server = StorageServer(memory)
+        bin = memory.create_bin()
+        memory.create_request(bin, make_request(1))
+        # Never seen by the server, so its version is derived on first write
+        server.rpc_create_requests([[bin.name, bin.created, make_request(2).dump()]])
+        assert server.versions[bin.name] == 2 == bin.request_count
+        print("  ✓ A derived version counts the new request once")
+
+        server.rpc_create_bin(False, 'versioned', None)
+        assert set(server.versions) == {bin.name, 'versioned'}
+        memory._expire_bins(now=time.time() + 3600)
+        assert server.versions == {} and not memory.bins
+        print("  ✓ Expired bins dropped from the versions")
+        return True
+    except Exception as e:
+        print(f"  ✗ Server bin versions - {e}")
+        return False
+
+
+def test_retries():
+    """Only calls the server never received are sent again"""
+    print("\n6. Call retries:")
+    try:
+        client = SharedMemoryStorage(bin_ttl=3600)
+        client._pid = os.getpid()
+        connections = []
+
+        def connect():
+            ours, theirs = socket.socketpair()
+            ours.settimeout(0.2)
+            connections.append(theirs)
+            return ours
+
+        client._connect = connect
+        stale = connect()
+        connections.pop().close()
+        client._pool = [stale]
+        try:
+            client._call('ping')
+        except socket.timeout:
+            pass
+        assert len(connections) == 1
+        assert shared._recv_frame(connections[0]) is not None
+        print("  ✓ A call on a closed pooled socket is sent on a new one")
+
+        client._pool = [connect()]
+        try:
+            client._call('create_requests', [])
+            raise AssertionError("timeout swallowed")
+        except socket.timeout:
+            pass
+        assert len(connections) == 2 and client._pool == []
+        connections[1].settimeout(0.2)
+        assert shared._recv_frame(connections[1]) is not None
+        print("  ✓ A timed out call is raised, not sent again")
+        return True
+    except Exception as e:
+        print(f"  ✗ Call retries - {e}")
+        return False
+
+
+def main():
+    print("=" * 60)
+    print("SHARED STORAGE TESTS")
+    print("=" * 60)
+
+    storage = make_storage()
+    bin = test_server_start(storage)
+    try:
+        results = [
+            bin is not None,
+            bin is not None and test_shared_between_processes(storage, bin),
+            bin is not None and test_delta_lookups(storage, bin),
+            bin is not None and test_meta_and_pages(storage, bin),
+            test_server_versions(),
+            test_retries(),
+        ]
+    finally:
+        if storage._server is not None:
+            storage._server.terminate()
+            storage._server.wait(timeout=10)
+
+    print("\n" + "=" * 60)
+    if all(results):
+        print("✅ ALL SHARED STORAGE TESTS PASSED")
+        return 0
+    print("❌ SOME SHARED STORAGE TESTS FAILED")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""
+Test the embedded SQLite storage backend
+Tests WAL mode, batched writes and trimming, metadata-only listings, expiry,
+a database shared between storage instances, and metadata lookups with paged
+request reads
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+os.environ['REALM'] = 'local'
+os.environ['STORAGE_BACKEND'] = 'requestbin.storage.memory.MemoryStorage'
+
+from requestbin import config
+from requestbin.models import Bin, Request
+from requestbin.storage.sqlite import SQLiteStorage
+
+SQLiteStorage.path = os.path.join(tempfile.mkdtemp(), 'requestbin.sqlite3')
+
+
+def make_storage(bin_ttl=3600):
+    return SQLiteStorage(bin_ttl=bin_ttl)
+
+
+def make_request(n):
+    request = Request()
+    request.id, request.body = str(n), b'n=%d' % n
+    request.content_length = len(request.body)
+    return request
+
+
+def count_rows(storage, table):
+    with storage._transaction() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_schema():
+    """The database is created in WAL mode with the split tables"""
+    print("\n1. Schema:")
+    try:
+        storage = make_storage()
+        with storage._transaction() as conn:
+            mode, = conn.execute("PRAGMA journal_mode").fetchone()
+            tables = {name for name, in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert mode == 'wal', mode
+        assert {'bins', 'requests', 'payloads', 'stats'} <= tables, tables
+        print("  ✓ WAL mode with metadata and payload tables")
+        return True
+    except Exception as e:
+        print(f"  ✗ Schema - {e}")
+        return False
+
+
+def test_batched_writes():
+    """Batches are written in one go and trimmed to MAX_REQUESTS"""
+    print("\n2. Batched writes:")
+    max_requests = config.MAX_REQUESTS
+    try:
+        config.MAX_REQUESTS = Bin.max_requests = 5
+        storage = make_storage()
+        bin, other = storage.create_bin(), storage.create_bin()
+        gone = Bin()
+        counts = storage.create_requests(
+            [(bin, make_request(n)) for n in range(8)] + [(other, make_request(8)), (gone, make_request(9))])
+        assert counts == [1, 2, 3, 4, 5, 5, 5, 5, 1, None], counts
+        print("  ✓ Counts returned per item, None for unknown bins")
+
+        loaded = storage.lookup_bin(bin.name)
+        assert [r.id for r in loaded.requests] == ['7', '6', '5', '4', '3']
+        assert loaded.requests[0].body == b'n=7'
+        assert count_rows(storage, 'requests') == count_rows(storage, 'payloads') == 6
+        assert storage.count_requests() >= 9
+        print("  ✓ Oldest requests and their payloads trimmed")
+
+        assert storage.create_request(other, make_request(10)) == 2
+        assert storage.lookup_bin(other.name).requests[0].id == '10'
+        print("  ✓ Single requests appended")
+        return True
+    except Exception as e:
+        print(f"  ✗ Batched writes - {e}")
+        return False
+    finally:
+        config.MAX_REQUESTS = Bin.max_requests = max_requests
+
+
+def test_owner_listing():
+    """Listings return a user's bins newest first, with their requests"""
+    print("\n3. Owner listing:")
+    try:
+        storage = make_storage()
+        bins = [storage.create_bin(owner_email='lister@example.com') for _ in range(3)]
+        storage.create_bin(owner_email='someone@example.com')
+        storage.create_request(bins[0], make_request(1))
+
+        listed = storage.get_bins_by_owner('lister@example.com')
+        assert [b.name for b in listed] == [b.name for b in reversed(bins)]
+        assert [b.name for b in storage.get_bins_by_owner('lister@example.com', limit=2)] == \
+            [bins[2].name, bins[1].name]
+        print("  ✓ Newest first, limit honoured")
+
+        oldest = listed[-1]
+        assert oldest.request_count == 1 and oldest.color == bins[0].color
+        assert oldest.requests[0].body == b'n=1' and oldest.requests[0].content_length == 3
+        assert [b.requests for b in listed[:-1]] == [[]] * (len(listed) - 1)
+        print("  ✓ Requests listed with their bodies in one query")
+
+        request = make_request(2)
+        storage.create_request(bins[0], request)
+        first = storage.list_bins_by_owner('lister@example.com', limit=2)
+        rest = storage.list_bins_by_owner('lister@example.com', before=first[-1].cursor)
+        assert [b.name for b in first + rest] == [b.name for b in reversed(bins)]
+        assert rest[0].request_count == 2 and rest[0].last_activity == request.time
+        assert first[0].request_count == 0 and first[0].last_activity == bins[2].created
+        assert rest[0].color == bins[0].color
+        print("  ✓ Summaries in one query, paged by cursor")
+        return True
+    except Exception as e:
+        print(f"  ✗ Owner listing - {e}")
+        return False
+
+
+def test_expiry():
+    """Expired bins are hidden at once and deleted by the cleanup"""
+    print("\n4. Expiry:")
+    try:
+        storage = make_storage(bin_ttl=60)
+        bin = storage.create_bin(owner_email='expiry@example.com')
+        storage.create_request(bin, make_request(1))
+        with storage._transaction(write=True) as conn:
+            conn.execute("UPDATE bins SET expires_at = ? WHERE name = ?", (time.time() - 1, bin.name))
+
+        try:
+            storage.lookup_bin(bin.name)
+            raise AssertionError("expired bin returned")
+        except KeyError:
+            pass
+        assert storage.get_bins_by_owner('expiry@example.com') == []
+        assert storage.create_request(bin, make_request(2)) is None
+        print("  ✓ Expired bins never returned or written to")
+
+        requests = count_rows(storage, 'payloads')
+        assert storage._cleanup_expired_bins() >= 1
+        assert count_rows(storage, 'payloads') == requests - 1
+        print("  ✓ Cleanup deletes bins with their requests")
+
+        named = storage.create_bin(custom_name='reused-' + bin.name)
+        storage.create_request(named, make_request(3))
+        with storage._transaction(write=True) as conn:
+            conn.execute("UPDATE bins SET expires_at = ? WHERE name = ?", (time.time() - 1, named.name))
+        requests = count_rows(storage, 'payloads')
+        reused = storage.create_bin(custom_name=named.name)
+        assert storage.lookup_bin(reused.name).requests == []
+        assert count_rows(storage, 'payloads') == requests - 1
+        print("  ✓ An expired custom name can be taken again before the cleanup")
+        return True
+    except Exception as e:
+        print(f"  ✗ Expiry - {e}")
+        return False
+
+
+def test_shared_database():
+    """Storage instances on the same file see each other's writes"""
+    print("\n5. Shared database:")
+    try:
+        first, second = make_storage(), make_storage()
+        bin = first.create_bin()
+        second.create_request(bin, make_request(1))
+        first.create_request(bin, make_request(2))
+        assert [r.id for r in second.lookup_bin(bin.name).requests] == ['2', '1']
+        assert first.count_bins() == second.count_bins()
+        print("  ✓ Writes from one connection visible in the other")
+        return True
+    except Exception as e:
+        print(f"  ✗ Shared database - {e}")
+        return False
+
+
+def test_meta_and_pages():
+    """lookup_bin_meta reads the bins row; get_requests pages newest first"""
+    print("\n6. Metadata lookups and pages:")
+    max_requests = config.MAX_REQUESTS
+    try:
+        config.MAX_REQUESTS = Bin.max_requests = 4
+        storage = make_storage()
+        bin, empty = storage.create_bin(private=True), storage.create_bin()
+        storage.create_requests([(bin, make_request(n)) for n in range(6)])
+
+        meta = storage.lookup_bin_meta(bin.name)
+        assert meta.request_count == 4 and meta.requests == []
+        assert (meta.color, meta.secret_key) == (bin.color, bin.secret_key)
+        assert storage.lookup_bin_meta(empty.name).request_count == 0
+        print("  ✓ Count capped at MAX_REQUESTS, no requests loaded")
+
+        assert [r.id for r in storage.get_requests(bin.name)] == ['5', '4', '3', '2']
+        page = storage.get_requests(bin.name, offset=1, limit=2)
+        assert [(r.id, r.body) for r in page] == [('4', b'n=4'), ('3', b'n=3')]
+        assert storage.get_requests(empty.name) == []
+        with storage._transaction(write=True) as conn:
+            conn.execute("UPDATE bins SET expires_at = ? WHERE name = ?", (time.time() - 1, bin.name))
+        for call in (storage.lookup_bin_meta, storage.get_requests):
+            try:
+                call(bin.name)
+                raise AssertionError(f"{call.__name__} returned an expired bin")
+            except KeyError:
+                pass
+        print("  ✓ Pages with bodies, KeyError for expired bins")
+        return True
+    except Exception as e:
+        print(f"  ✗ Metadata lookups and pages - {e}")
+        return False
+    finally:
+        config.MAX_REQUESTS = Bin.max_requests = max_requests
+
+
+def main():
+    print("=" * 60)
+    print("SQLITE STORAGE TESTS")
+    print("=" * 60)
+
+    results = [
+        test_schema(),
+        test_batched_writes(),
+        test_owner_listing(),
+        test_expiry(),
+        test_shared_database(),
+        test_meta_and_pages(),
+    ]
+
+    print("\n" + "=" * 60)
+    if all(results):
+        print("✅ ALL SQLITE STORAGE TESTS PASSED")
+        return 0
+    print("❌ SOME SQLITE STORAGE TESTS FAILED")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())